@@ -1,15 +1,63 @@
+import os
+
+from libraries.classes.CampaignManifest import CampaignManifest
+from libraries.classes.PreprocessingPipeline import PreprocessingPipeline
 from libraries.utils import preprocessingUtils
 
-def run():
-    preprocessingUtils.filterWithAccuracy("data/traffic_flow_2024.csv", "data/accuracy_loops_2024.csv", 'data', 'codice_spira', "data/accurate_traffic_flow.csv", 90)
 
-    #preprocessingUtils.generateRealFlow("data/accurate_traffic_flow.csv", "data/real_traffic_flow.csv")
-    preprocessingUtils.generateRoadNamesFile("data/accurate_traffic_flow.csv", "configs/joined_lanes.net.xml", "configs/detectors.add.xml", "data/road_names.csv")
-    preprocessingUtils.fillMissingEdgeId("data/road_names.csv")
+def buildPipeline(campaign: CampaignManifest = None) -> PreprocessingPipeline:
+    '''
+    Definisce il preprocessing del dataset come DAG: le dipendenze tra i nodi seguono dai file letti e scritti.
+    generateRoadNamesFile scrive road_names_raw.csv, completato da fillMissingEdgeId in road_names.csv, così ogni file
+    è scritto da un solo nodo. generateEdgeDataFile, dailyFilter e generateEdgeDataPerHour leggono solo
+    processed_traffic_flow.csv e vengono eseguiti in parallelo.
+    :param campaign: manifest della campagna in cui registrare i nodi (vedi PreprocessingPipeline)
+    :return: (PreprocessingPipeline)
+    '''
+    pipeline = PreprocessingPipeline(campaign)
+    pipeline.addNode("filterWithAccuracy", preprocessingUtils.filterWithAccuracy,
+                     {"file_input": "data/traffic_flow_2024.csv", "file_accuracy": "data/accuracy_loops_2024.csv",
+                      "date_column": 'data', "sensor_id_column": 'codice_spira',
+                      "output_file": "data/accurate_traffic_flow.csv", "accepted_percentage": 90},
+                     inputs=["data/traffic_flow_2024.csv", "data/accuracy_loops_2024.csv"],
+                     outputs=["data/accurate_traffic_flow.csv"])
+
+    #pipeline.addNode("generateRealFlow", preprocessingUtils.generateRealFlow, ...)
+    pipeline.addNode("generateRoadNamesFile", preprocessingUtils.generateRoadNamesFile,
+                     {"inputFile": "data/accurate_traffic_flow.csv", "sumoNetFile": "configs/joined_lanes.net.xml",
+                      "detectorFilePath": "configs/detectors.add.xml", "roadNamesFilePath": "data/road_names_raw.csv"},
+                     inputs=["data/accurate_traffic_flow.csv", "configs/joined_lanes.net.xml"],
+                     outputs=["configs/detectors.add.xml", "data/road_names_raw.csv"])
+    pipeline.addNode("fillMissingEdgeId", preprocessingUtils.fillMissingEdgeId,
+                     {"roadnameFile": "data/road_names_raw.csv", "outputFile": "data/road_names.csv"},
+                     inputs=["data/road_names_raw.csv"], outputs=["data/road_names.csv"])
+
+    pipeline.addNode("linkEdgeID", preprocessingUtils.linkEdgeID,
+                     {"inputFile": "data/accurate_traffic_flow.csv", "roadNamesFile": "data/road_names.csv",
+                      "outputFile": "data/processed_traffic_flow.csv"},
+                     inputs=["data/accurate_traffic_flow.csv", "data/road_names.csv"],
+                     outputs=["data/processed_traffic_flow.csv"])
+
+    pipeline.addNode("generateEdgeDataFile", preprocessingUtils.generateEdgeDataFile,
+                     {"input_file": "data/processed_traffic_flow.csv", "outputFile": "configs/edgedata.xml",
+                      "date": '01/02/2024', "time_slot": '07:00-08:00'},
+                     inputs=["data/processed_traffic_flow.csv"], outputs=["configs/edgedata.xml"])
+    pipeline.addNode("dailyFilter", preprocessingUtils.dailyFilter,
+                     {"inputFilePath": "data/processed_traffic_flow.csv", "date": "01/02/2024"},
+                     inputs=["data/processed_traffic_flow.csv"], outputs=["data/daily_flow_01-02-2024.csv"])
+    pipeline.addNode("generateEdgeDataPerHour", preprocessingUtils.generateEdgeDataPerHour,
+                     {"inputFile": "data/processed_traffic_flow.csv", "outputDir": "configs/TestData_UnMese",
+                      "startData": "01/02/2024", "endData": "02/03/2024"},
+                     inputs=["data/processed_traffic_flow.csv"], outputs=["configs/TestData_UnMese"])
+    return pipeline
 
-    #ATTENZIONE: impiega molto tempo per eseguire!!!
-    #preprocessingUtils1.linkEdgeID("data/accurate_traffic_flow.csv", "data/road_names.csv", "data/processed_traffic_flow.csv")
 
-    preprocessingUtils.generateEdgeDataFile("data/processed_traffic_flow.csv", "configs/edgedata.xml", date='01/02/2024', time_slot='07:00-08:00')
-    preprocessingUtils.dailyFilter("data/processed_traffic_flow.csv", "01/02/2024")
-    preprocessingUtils.generateEdgeDataPerHour("data/processed_traffic_flow.csv", "configs/TestData_UnMese", "01/02/2024", "02/03/2024")
\ No newline at end of file
+def run(campaign: CampaignManifest = None, workers: int = os.cpu_count()) -> dict:
+    '''
+    Esegue il preprocessing del dataset. Con il manifest della campagna vengono rieseguiti solo i nodi i cui file di
+    input (o argomenti) sono cambiati o i cui output sono stati modificati.
+    :param campaign: manifest della campagna (vedi CampaignManifest), se None tutti i nodi vengono eseguiti
+    :param workers: numero massimo di nodi eseguiti in parallelo
+    :return: (dict) stato di ogni nodo (vedi PreprocessingPipeline.run)
+    '''
+    return buildPipeline(campaign).run(workers=workers)
@@ -0,0 +1,178 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from libraries.utils import networkUtils
+
+# fasi della campagna registrate per ogni scenario orario, nell'ordine in cui vengono eseguite
+CAMPAIGN_STAGES = ("preprocessing", "edgedata", "sampleRoutes", "sampledRoutes", "simulation", "export")
+# scenario usato per le fasi condivise da tutta la campagna (preprocessing, pool di route candidate)
+CAMPAIGN_SCOPE = "*"
+DONE = "done"
+FAILED = "failed"
+
+
+class CampaignStage:
+    '''
+    Fase in esecuzione, restituita da CampaignManifest.stage: il codice della fase aggiunge ad outputs i file prodotti
+    che non erano noti prima dell'esecuzione (es. gli output di SUMO).
+    '''
+
+    def __init__(self, scenario: str, stage: str, inputs: dict, outputs: list):
+
+        self.scenario = scenario
+        self.stage = stage
+        self.inputs = inputs
+        self.outputs = list(outputs)
+
+
+class CampaignManifest:
+    '''
+    Manifest persistente della campagna di simulazione, in formato JSON-lines: una riga per ogni esecuzione di una fase
+    di uno scenario, con stato, hash degli input, firma degli output e durata. Il file viene solo esteso (mai
+    riscritto), quindi un crash lascia al più l'ultima riga incompleta, che viene ignorata alla lettura.
+    Una fase è completata se l'ultima riga registrata è "done", gli input hanno ancora lo stesso hash e gli output
+    esistono ancora con la stessa firma: alla riesecuzione si rifà solo il lavoro mancante o invalidato.
+
+    Attributi della classe:
+    path (str) --> file .jsonl del manifest, None per un manifest solo in memoria
+    records (dict) --> (scenario, fase) --> ultima riga registrata
+    '''
+
+    def __init__(self, path: str = None):
+        '''
+        :param path: file .jsonl del manifest (es. configs/scenarioCollection/campaign.jsonl), creato se non esiste.
+                     Se None le fasi vengono registrate solo in memoria e nessuna viene saltata tra un'esecuzione e l'altra
+        '''
+        self.path = path
+        self.records = {}
+        # hash già calcolati nell'esecuzione: path --> (dimensione, mtime, hash)
+        self._hashes = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        '''
+        Legge il manifest: per ogni scenario e fase resta l'ultima riga registrata
+        '''
+        with open(self.path, encoding="UTF-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # riga scritta a metà da un'esecuzione interrotta
+                    continue
+                self.records[(record["scenario"], record["stage"])] = record
+
+    def fileHash(self, path: str) -> str:
+        '''
+        Hash SHA-256 del contenuto di un file, calcolato una sola volta per esecuzione finché il file non cambia
+        :param path: path del file
+        :return: (str) hash esadecimale
+        '''
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+            cached = (stat.st_size, stat.st_mtime_ns, networkUtils.fileHash(path))
+            self._hashes[path] = cached
+        return cached[2]
+
+    @staticmethod
+    def outputSignature(path: str):
+        '''
+        :param path: file o cartella prodotta da una fase
+        :return: [dimensione, mtime in ns] per un file, [numero di file, dimensione totale] per una cartella,
+                 None se non esiste
+        '''
+        if os.path.isdir(path):
+            sizes = [entry.stat().st_size for entry in os.scandir(path) if entry.is_file()]
+            return [len(sizes), sum(sizes)]
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            return [stat.st_size, stat.st_mtime_ns]
+        return None
+
+    def isDone(self, scenario: str, stage: str, inputs: dict) -> bool:
+        '''
+        :param scenario: nome dello scenario (es. 01-02-2024_05-00) oppure CAMPAIGN_SCOPE
+        :param stage: una tra CAMPAIGN_STAGES
+        :param inputs: hash dei file di input e parametri della fase (valori serializzabili in JSON)
+        :return: (bool) True se la fase è già stata completata con gli stessi input e gli output sono intatti
+        '''
+        record = self.records.get((scenario, stage))
+        if record is None or record["status"] != DONE or record["inputs"] != json.loads(json.dumps(inputs)):
+            return False
+        return all(self.outputSignature(path) == signature for path, signature in record["outputs"].items())
+
+    def getRecord(self, scenario: str, stage: str) -> dict:
+        '''
+        :return: (dict) ultima riga registrata per lo scenario e la fase, None se la fase non è mai stata eseguita
+        '''
+        return self.records.get((scenario, stage))
+
+    def record(self, scenario: str, stage: str, status: str, inputs: dict, outputs: list = (), seconds: float = 0.0,
+               error: str = None):
+        '''
+        Registra l'esecuzione di una fase, aggiungendo una riga al manifest
+        :param scenario: nome dello scenario oppure CAMPAIGN_SCOPE
+        :param stage: una tra CAMPAIGN_STAGES
+        :param status: DONE oppure FAILED
+        :param inputs: hash dei file di input e parametri della fase
+        :param outputs: file o cartelle prodotte dalla fase, di cui viene salvata la firma
+        :param seconds: durata della fase
+        :param error: messaggio di errore se la fase è fallita
+        '''
+        if stage not in CAMPAIGN_STAGES:
+            raise ValueError(f"Unknown campaign stage '{stage}', expected one of {CAMPAIGN_STAGES}.")
+        record = {
+            "scenario": scenario,
+            "stage": stage,
+            "status": status,
+            "inputs": inputs,
+            "outputs": {os.path.abspath(path): self.outputSignature(path) for path in outputs},
+            "seconds": round(seconds, 3),
+            "error": error,
+            "time": datetime.now().isoformat(timespec="seconds"),
+        }
+        record = json.loads(json.dumps(record))
+        self.records[(scenario, stage)] = record
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="UTF-8") as file:
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    @contextmanager
+    def stage(self, scenario: str, stage: str, inputs: dict, outputs: list = ()):
+        '''
+        Esegue il blocco come fase della campagna, registrandola come completata o fallita (l'eccezione viene
+        rilanciata). Esempio:
+
+            if not manifest.isDone(scenario, "simulation", inputs):
+                with manifest.stage(scenario, "simulation", inputs) as running:
+                    ...
+                    running.outputs.append(path)
+
+        :return: (CampaignStage) con la lista degli output, estendibile dal blocco
+        '''
+        running = CampaignStage(scenario, stage, inputs, outputs)
+        begin = time.perf_counter()
+        try:
+            yield running
+        except BaseException as e:
+            self.record(scenario, stage, FAILED, inputs, running.outputs, time.perf_counter() - begin, repr(e))
+            raise
+        self.record(scenario, stage, DONE, inputs, running.outputs, time.perf_counter() - begin)
+
+    def getSummary(self) -> dict:
+        '''
+        :return: (dict) fase --> {"done": numero di scenari completati, "failed": numero di scenari falliti}
+        '''
+        summary = {stage: {DONE: 0, FAILED: 0} for stage in CAMPAIGN_STAGES}
+        for (_, stage), record in self.records.items():
+            summary[stage][record["status"]] += 1
+        return summary
@@ -0,0 +1,226 @@
+import math
+import os
+import xml.etree.ElementTree as ET
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import traci
+
+# variabili degli induction loop sottoscritte una sola volta all'avvio: valori dell'intervallo di aggregazione
+# in corso e dell'ultimo intervallo concluso (usati quando il campione cade sul confine di un intervallo)
+CURRENT_INTERVAL_VARIABLES = (
+    traci.constants.VAR_INTERVAL_OCCUPANCY,
+    traci.constants.VAR_INTERVAL_SPEED,
+    traci.constants.VAR_INTERVAL_NUMBER,
+)
+LAST_INTERVAL_VARIABLES = (
+    traci.constants.VAR_LAST_INTERVAL_OCCUPANCY,
+    traci.constants.VAR_LAST_INTERVAL_SPEED,
+    traci.constants.VAR_LAST_INTERVAL_NUMBER,
+)
+
+
+def isValid(value) -> bool:
+    '''
+    :param value: valore letto da TraCI
+    :return: (bool) False se il valore manca o è il valore non valido di SUMO (es. variabili non disponibili con il
+             modello mesoscopico, come il tempo di attesa accumulato dei veicoli)
+    '''
+    return value is not None and value > traci.constants.INVALID_DOUBLE_VALUE
+
+
+class DetectorMonitor:
+    '''
+    Monitoraggio degli induction loop tramite subscription.
+    La lista delle spire viene letta e sottoscritta una sola volta all'avvio; i valori vengono campionati solo ogni
+    samplingInterval secondi (allineati al periodo di aggregazione 'freq' delle spire) e salvati in array
+    preallocati, una riga per campione e una colonna per spira.
+    Con il modello mesoscopico SUMO non fornisce i valori dell'ultimo intervallo concluso: vengono sottoscritti solo
+    quelli dell'intervallo in corso e il campione che cadrebbe sul confine del periodo viene preso uno step prima,
+    quando i valori non sono ancora stati azzerati.
+
+    Attributi della classe:
+    samplingInterval (float) --> secondi simulati tra due campioni, divisore del periodo di aggregazione
+    period (float) --> periodo di aggregazione delle spire (attributo freq di detectors.add.xml)
+    detectorIDs (list) --> ID delle spire, nell'ordine delle colonne degli array
+    times (np.ndarray) --> tempo simulato di ogni campione
+    occupancy, meanSpeed, vehicleNumber (np.ndarray) --> valori dell'intervallo di aggregazione al momento del campione
+                                                        (NaN e -1 se non disponibili)
+    mesoscopic (bool) --> True se la simulazione usa il modello mesoscopico
+    sampleCount (int) --> numero di campioni raccolti
+    '''
+
+    def __init__(self, period: float, samplingInterval: Optional[float] = None, duration: float = 3600):
+        '''
+        :param period: periodo di aggregazione delle spire in secondi
+        :param samplingInterval: secondi tra due campioni. Se None coincide con il periodo di aggregazione
+        :param duration: durata prevista della simulazione, usata per dimensionare gli array
+        '''
+        samplingInterval = samplingInterval or period
+        if samplingInterval <= 0 or period % samplingInterval != 0:
+            raise ValueError(f"The sampling interval ({samplingInterval}s) must divide the detector period ({period}s).")
+        self.period = period
+        self.samplingInterval = samplingInterval
+        self.duration = duration
+        self.connection = None
+        self.mesoscopic = False
+        self.stepLength = 1.0
+        self.detectorIDs = []
+        self.sampleCount = 0
+        self.nextSample = samplingInterval
+        self.times = np.empty(0, dtype=np.float64)
+        self.occupancy = np.empty((0, 0), dtype=np.float32)
+        self.meanSpeed = np.empty((0, 0), dtype=np.float32)
+        self.vehicleNumber = np.empty((0, 0), dtype=np.int32)
+
+    @staticmethod
+    def readPeriod(detectorFile: str) -> float:
+        '''
+        Legge il periodo di aggregazione dal file additional delle spire
+        :param detectorFile: path di detectors.add.xml
+        :return: (float) freq più piccola tra quelle degli inductionLoop
+        '''
+        frequencies = [float(inductionLoop.get("freq")) for inductionLoop in ET.parse(detectorFile).getroot()
+                       .iter("inductionLoop") if inductionLoop.get("freq")]
+        if not frequencies:
+            raise ValueError(f"No inductionLoop with a 'freq' attribute in '{detectorFile}'.")
+        return min(frequencies)
+
+    @classmethod
+    def fromConfiguration(cls, configurationPath: str, samplingInterval: Optional[float] = None,
+                          duration: float = 3600):
+        '''
+        :param configurationPath: cartella con detectors.add.xml
+        :return: (DetectorMonitor) con il periodo di aggregazione delle spire della configurazione
+        '''
+        period = cls.readPeriod(os.path.join(configurationPath, "detectors.add.xml"))
+        return cls(period=period, samplingInterval=samplingInterval, duration=duration)
+
+    def start(self, connection, mesoscopic: bool = False):
+        '''
+        Legge la lista delle spire, le sottoscrive e prealloca gli array dei campioni. Va chiamato dopo traci.start.
+        :param connection: connessione TraCI della simulazione
+        :param mesoscopic: True se la simulazione usa il modello mesoscopico (vedi Simulator.setSimulationModel)
+        '''
+        self.connection = connection
+        self.mesoscopic = mesoscopic
+        self.stepLength = connection.simulation.getDeltaT()
+        self.detectorIDs = list(connection.inductionloop.getIDList())
+        # con il modello mesoscopico le variabili dell'ultimo intervallo non sono disponibili
+        variables = CURRENT_INTERVAL_VARIABLES if mesoscopic else CURRENT_INTERVAL_VARIABLES + LAST_INTERVAL_VARIABLES
+        for detectorID in self.detectorIDs:
+            connection.inductionloop.subscribe(detectorID, variables)
+
+        self.sampleCount = 0
+        # la simulazione può partire da un tempo diverso da 0 (ore concatenate, vedi Simulator.setTimeWindow)
+        self.nextSample = self.getNextSample(connection.simulation.getTime())
+        self.allocate(math.ceil(self.duration / self.samplingInterval) + 1)
+
+    def allocate(self, capacity: int):
+        '''
+        Alloca (o ingrandisce, mantenendo i campioni già raccolti) gli array dei campioni
+        :param capacity: numero massimo di campioni
+        '''
+        detectors = len(self.detectorIDs)
+        times = np.full(capacity, np.nan, dtype=np.float64)
+        occupancy = np.full((capacity, detectors), np.nan, dtype=np.float32)
+        meanSpeed = np.full((capacity, detectors), np.nan, dtype=np.float32)
+        vehicleNumber = np.full((capacity, detectors), -1, dtype=np.int32)
+        count = self.sampleCount
+        if count > 0:
+            times[:count] = self.times[:count]
+            occupancy[:count] = self.occupancy[:count]
+            meanSpeed[:count] = self.meanSpeed[:count]
+            vehicleNumber[:count] = self.vehicleNumber[:count]
+        self.times, self.occupancy, self.meanSpeed, self.vehicleNumber = times, occupancy, meanSpeed, vehicleNumber
+
+    def update(self, time: float) -> bool:
+        '''
+        Da chiamare dopo ogni simulationStep: registra un campione solo se è stato raggiunto il prossimo istante di
+        campionamento, altrimenti non fa chiamate TraCI.
+        :param time: tempo simulato corrente
+        :return: (bool) True se è stato registrato un campione
+        '''
+        if time < self.nextSample:
+            return False
+        # sul confine del periodo i valori correnti sono appena stati azzerati: si usa l'intervallo appena concluso
+        variables = LAST_INTERVAL_VARIABLES if time % self.period == 0 and not self.mesoscopic \
+            else CURRENT_INTERVAL_VARIABLES
+        self.sample(time, variables)
+        self.nextSample = self.getNextSample(time)
+        return True
+
+    def getNextSample(self, time: float) -> float:
+        '''
+        :param time: tempo simulato corrente
+        :return: (float) prossimo istante di campionamento dopo time. Con il modello mesoscopico gli istanti sul confine
+                 del periodo sono anticipati di uno step (vedi descrizione della classe)
+        '''
+        if not self.mesoscopic:
+            return (time // self.samplingInterval + 1) * self.samplingInterval
+        nextSample = ((time + self.stepLength) // self.samplingInterval + 1) * self.samplingInterval
+        if nextSample % self.period == 0:
+            nextSample -= self.stepLength
+        return nextSample
+
+    def sample(self, time: float, variables: tuple = CURRENT_INTERVAL_VARIABLES):
+        '''
+        Copia i risultati delle subscription di tutte le spire nella riga successiva degli array; i valori non
+        validi restano NaN (occupazione, velocità) e -1 (numero di veicoli)
+        :param time: tempo simulato del campione
+        :param variables: variabili di occupazione, velocità e numero di veicoli da leggere
+        '''
+        if self.sampleCount == len(self.times):
+            self.allocate(2 * len(self.times))
+        results = self.connection.inductionloop.getAllSubscriptionResults()
+        occupancyVariable, speedVariable, numberVariable = variables
+        row = self.sampleCount
+        self.times[row] = time
+        for column, detectorID in enumerate(self.detectorIDs):
+            values = results.get(detectorID)
+            if values:
+                if isValid(values.get(occupancyVariable)):
+                    self.occupancy[row, column] = values[occupancyVariable]
+                if isValid(values.get(speedVariable)):
+                    self.meanSpeed[row, column] = values[speedVariable]
+                if isValid(values.get(numberVariable)):
+                    self.vehicleNumber[row, column] = values[numberVariable]
+        self.sampleCount += 1
+
+    def getSummary(self) -> Optional[dict]:
+        '''
+        Medie su tutte le spire dell'ultimo campione, con le stesse chiavi di Simulator.getInductionLoopSummary
+        :return: (dict) oppure None se non è ancora stato raccolto alcun campione
+        '''
+        if self.sampleCount == 0:
+            return None
+        row = self.sampleCount - 1
+        vehicleNumber = self.vehicleNumber[row][self.vehicleNumber[row] >= 0]
+        return {
+            "averageIntervalOccupancy": float(np.nanmean(self.occupancy[row])),
+            "averageMeanSpeed": float(np.nanmean(self.meanSpeed[row])),
+            "averageVehicleNumber": float(vehicleNumber.mean()) if len(vehicleNumber) else float("nan"),
+        }
+
+    def toDataFrame(self) -> pd.DataFrame:
+        '''
+        :return: (pd.DataFrame) campioni in formato lungo: time, detector, occupancy, meanSpeed, vehicleNumber
+        '''
+        count = self.sampleCount
+        detectors = len(self.detectorIDs)
+        return pd.DataFrame({
+            "time": np.repeat(self.times[:count], detectors),
+            "detector": np.tile(np.array(self.detectorIDs, dtype=object), count),
+            "occupancy": self.occupancy[:count].ravel(),
+            "meanSpeed": self.meanSpeed[:count].ravel(),
+            "vehicleNumber": self.vehicleNumber[:count].ravel(),
+        })
+
+    def export(self, outputFile: str):
+        '''
+        Salva i campioni dello scenario in CSV
+        :param outputFile: path del file da scrivere (es. <cartella scenario>/detector_samples.csv)
+        '''
+        os.makedirs(os.path.dirname(os.path.abspath(outputFile)), exist_ok=True)
+        self.toDataFrame().to_csv(outputFile, index=False)
@@ -1,15 +1,102 @@
 import os
+import queue
 import re
 import sys
+import threading
 import xml.etree.ElementTree as ET
 import subprocess
+import time
+import copy
 from calendar import month
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from re import match
 import shutil
 
 import pandas as pd
-from libraries.classes.SumoSimulator import Simulator
+import hashlib
+import tempfile
+from libraries.classes.CampaignManifest import CampaignManifest, CAMPAIGN_SCOPE, DONE, FAILED
+from libraries.classes.SumoSimulator import STATE_FILE, Simulator
+from libraries.utils import exportUtils, networkUtils
+from libraries.utils.outputUtils import outputFiles
+from libraries.utils.routeSamplingUtils import RoutePool
+
+
+def getSumoToolsPath() -> str:
+    '''
+    :return: (str) percorso ai tool di SUMO (randomTrips.py, routeSampler.py): SUMO_HOME/tools se la variabile è
+             definita, altrimenti il percorso dell'installazione Windows di default
+    '''
+    if os.environ.get("SUMO_HOME"):
+        return os.path.join(os.environ["SUMO_HOME"], "tools")
+    return r"C:\Program Files (x86)\Eclipse\Sumo\tools"
+
+
+# parametri di randomTrips usati per generare le route candidate (vedi ScenarioGenerator.generateRoutes)
+RANDOM_TRIPS_ARGUMENTS = ["--fringe-factor", "10", "--random", "--min-distance", "100", "--random-factor", "200"]
+# file statici della configurazione che, se modificati, invalidano le simulazioni già eseguite
+CONFIGURATION_FILES = ("run.sumocfg", "joined_lanes.net.xml", "detectors.add.xml", "joined_tls.add.xml",
+                       "joined_vtypes.add.xml")
+
+
+def getRouteInputs(campaign: CampaignManifest, edgedata: str, poolFile: str, totalVehicles: int, minLoops: int,
+                   congestioned: bool, routeEngine: str) -> dict:
+    '''
+    :return: (dict) input della fase "sampledRoutes" di uno scenario (hash dell'edgedata, pool e parametri)
+    '''
+    return {"edgedata": campaign.fileHash(edgedata), "pool": os.path.basename(poolFile),
+            "totalVehicles": totalVehicles, "minLoops": minLoops, "congestioned": congestioned,
+            "routeEngine": routeEngine}
+
+
+def getSimulationInputs(campaign: CampaignManifest, scenarioFolder: str, configurationPath: str,
+                        settings: dict) -> dict:
+    '''
+    :param settings: parametri del simulatore che cambiano gli output (politica di avanzamento, profilo di output...)
+    :return: (dict) input della fase "simulation" di uno scenario (hash delle route e della configurazione statica)
+    '''
+    inputs = {"routes": campaign.fileHash(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"))}
+    for fileName in CONFIGURATION_FILES:
+        inputs[fileName] = campaign.fileHash(os.path.join(configurationPath, fileName))
+    inputs.update(settings)
+    return inputs
+
+
+def getChainInputs(campaign: CampaignManifest, window: dict) -> dict:
+    '''
+    :param window: finestra temporale dello scenario (vedi Planner.getTimeWindows)
+    :return: (dict) input aggiuntivi della fase "simulation" con le ore concatenate: finestra e hash dello stato
+             dell'ora precedente (None se l'ora parte da rete vuota)
+    '''
+    loadState = window["loadState"]
+    return {"window": [window["begin"], window["end"]],
+            "loadState": campaign.fileHash(loadState) if loadState and os.path.exists(loadState) else None}
+
+
+def getSimulationOutputs(scenarioFolder: str) -> list:
+    '''
+    :return: (list) output della fase "simulation" di uno scenario: file di SUMO e, con le ore concatenate, lo stato
+             salvato alla fine dell'ora
+    '''
+    outputs = list(outputFiles(scenarioFolder).values())
+    stateFile = os.path.join(scenarioFolder, STATE_FILE)
+    return outputs + [stateFile] if os.path.exists(stateFile) else outputs
+
+
+def applyTimeWindow(simulator: Simulator, window: dict = None):
+    '''
+    Imposta sul simulatore la finestra temporale dello scenario (vedi Simulator.setTimeWindow). Lo stato dell'ora
+    precedente viene caricato solo se esiste: se la rete si era svuotata prima della fine dell'ora lo stato non viene
+    salvato e l'ora parte da rete vuota.
+    :param window: finestra temporale dello scenario (vedi Planner.getTimeWindows), None per quella di default
+    '''
+    if window is None:
+        simulator.setTimeWindow()
+        return
+    loadState = window["loadState"] if window["loadState"] and os.path.exists(window["loadState"]) else None
+    simulator.setTimeWindow(window["begin"], window["end"], loadState, window["saveState"])
+
 
 class ScenarioGenerator:
     '''
@@ -19,6 +106,10 @@ class ScenarioGenerator:
     Attributi della classe:
     sumoConfiguration (str) --> Path del file di configurazione di SUMOENV
     sim (Simulator) --> istanza della classe Simulator (libraries -> classes -> SumoSimulator) che gestisce la simulazione
+    routeEngine (str) --> "inprocess" campiona le route nel processo corrente da un pool condiviso tra le ore,
+                          "routeSampler" usa lo script routeSampler.py di SUMO per ogni ora
+    poolSize (int) --> numero di trip generati da randomTrips per il pool di route candidate
+    regeneratePool (bool) --> se True rigenera il pool anche se ne esiste già uno per la stessa rete e parametri
 
     Metodi della classe:
     __init__ --> Costruttore, inizializza un'istanza della classe ScenarioGenerator
@@ -27,11 +118,25 @@ class ScenarioGenerator:
     '''
     sumoConfiguration: str
     sim: Simulator
+    routeEngine: str
+    poolSize: int
+    regeneratePool: bool
 
-    def __init__(self, sumocfg: str, sim: Simulator):
+    def __init__(self, sumocfg: str, sim: Simulator, routeEngine: str = "inprocess", poolSize: int = 3600,
+                 regeneratePool: bool = False):
 
+        if routeEngine not in ("inprocess", "routeSampler"):
+            raise ValueError(f"Unknown route engine '{routeEngine}'.")
         self.sumoConfiguration = sumocfg
         self.sim = sim
+        self.routeEngine = routeEngine
+        self.poolSize = poolSize
+        self.regeneratePool = regeneratePool
+        # opzioni di randomTrips (con la rete già caricata), create alla prima generazione e riusate per tutte le ore
+        self.randomTripsOptions = None
+        # pool di route candidate in memoria, caricato alla prima generazione e riusato per tutte le ore
+        self.routePool = None
+        self.routePoolFile = None
 
 
     #ATTENZIONE: Controllare questa funzione!!!!!!
@@ -57,7 +162,7 @@ class ScenarioGenerator:
                 '''
 
         # percorso ai tool di SUMO dove si trovano gli script Py come randomTrip.py
-        sumo_tools_path = r"C:\Program Files (x86)\Eclipse\Sumo\tools"
+        sumo_tools_path = getSumoToolsPath()
 
         # percorso relativo della rete SUMO
         sumo_path = "configs/"
@@ -70,9 +175,6 @@ class ScenarioGenerator:
         if not os.path.exists(sumo_tools_path):
             raise FileNotFoundError("sumoenv tools path does not exist.")
 
-        # path assoluto allo script randomTrip.py di SUMO
-        script1 = sumo_tools_path + "/randomTrips.py"
-
         # path assoluto al file joined_lanes.net.xml, che rappresenta la rete di SUMO
         arg1 = ""
         if sumo_path.startswith("./"):
@@ -84,11 +186,12 @@ class ScenarioGenerator:
         print(arg1)
         print(edgefile)
 
-        # esegue lo script di SUMO randomTrips.py, per generare delle route casuali per la simulazione
+        # esegue randomTrips di SUMO nel processo corrente, per generare delle route casuali per la simulazione
         '''
         randomTrips.py --> crea percorsi casuali sulla rete SUMO
         -n arg1 --> Specifica il file della rete joined_lanes.net.xml
-        -"-r", folderPath + "sampleRoutes.rou.xml" --> salva il file di output
+        -"-r", poolFile --> salva il pool di route candidate nella cache accanto alla rete (vedi getRoutePoolFile)
+        --end poolSize --> numero di trip generati (uno al secondo)
         -- random --> genera percorsi randomici
         --min-distance 100 --> imposta una distanza minima di 100 metri tra origine e destinazione
         --random-factor 200 --> Aumenta la casualità nella generazione delle rotte
@@ -97,23 +200,28 @@ class ScenarioGenerator:
         # Path dove verrà salvato il file finale .rou.xml delle route generate
         route_file_path = os.path.join(folderPath, "generatedRoutes.rou.xml")
 
-        # ATTENZIONE: il commento sotto serve a generare delle rotte casuale!!!!!!
+        if self.routeEngine == "inprocess":
+            # campiona le route del pool condiviso in base ai conteggi dell'edgefile, senza lanciare sottoprocessi
+            pool = self.getRoutePool(sumo_tools_path, arg1)
+            locations, counts = pool.readEdgeCounts(edgefile)
+            routeCounts = pool.sample(locations, counts, totalVehicles=totalVehicles, minLoops=minLoops)
+            pool.writeRoutes(routeCounts, route_file_path)
+            print("Routes Generated")
+            return os.path.abspath(folderPath)
 
-        subprocess.run(
-            ['python', script1, "-n", arg1, "-r", folderPath + "sampleRoutes.rou.xml", "--fringe-factor", "10",
-             "--random",
-             "--min-distance", "100", "--random-factor", "200"])
+        # route candidate condivise da tutte le ore (generate solo se cambiano la rete o i parametri di randomTrips)
+        poolFile = self.getRoutePoolFile(sumo_tools_path, arg1)
 
         # esegue lo script di SUMO routeSampler.py, per generare le route in base ai dati reali per la simulazione
         script2 = sumo_tools_path + "/routeSampler.py"
         if congestioned:
 
-            subprocess.run([sys.executable, script2, "-r", folderPath + "sampleRoutes.rou.xml", "--edgedata-files",
+            subprocess.run([sys.executable, script2, "-r", poolFile, "--edgedata-files",
                             edgefile, "-o", route_file_path, "--total-count",
                             str(totalVehicles), "--optimize", "full", "--min-count", str(minLoops)])
 
         else:
-            subprocess.run([sys.executable, script2, "-r", folderPath + "sampleRoutes.rou.xml", "--edgedata-files",
+            subprocess.run([sys.executable, script2, "-r", poolFile, "--edgedata-files",
                             edgefile, "-o", route_file_path, "--total-count",
                             str(totalVehicles), "--optimize", "full", "--min-count", str(minLoops)])
 
@@ -123,6 +231,75 @@ class ScenarioGenerator:
         routeFilePath = os.path.abspath(relativeRouteFile)
         return routeFilePath
 
+    def generateSampleRoutes(self, sumo_tools_path: str, netFile: str, routeFile: str, tripFile: str):
+        '''
+        Esegue randomTrips nel processo corrente invece che come sottoprocesso. La rete viene letta una sola volta
+        (networkUtils.getNetwork) e condivisa da tutte le ore, invece di essere riletta dall'XML ad ogni chiamata.
+
+        :param sumo_tools_path: percorso ai tool di SUMO
+        :param netFile: path assoluto della rete SUMO
+        :param routeFile: file delle route casuali generate (validate con duarouter)
+        :param tripFile: file dei trip intermedi
+        :return:
+        '''
+        if sumo_tools_path not in sys.path:
+            sys.path.append(sumo_tools_path)
+        import randomTrips
+
+        if self.randomTripsOptions is None or self.randomTripsOptions.netfile != netFile:
+            self.randomTripsOptions = randomTrips.get_options(
+                ["-n", netFile, "--end", str(self.poolSize)] + RANDOM_TRIPS_ARGUMENTS)
+            self.randomTripsOptions.net = networkUtils.getNetwork(netFile)
+
+        # copia delle opzioni condivise, con i file di output dell'ora corrente
+        options = copy.copy(self.randomTripsOptions)
+        options.routefile = routeFile
+        options.tripfile = tripFile
+        randomTrips.main(options)
+
+    def getRoutePoolFile(self, sumo_tools_path: str, netFile: str) -> str:
+        '''
+        Restituisce il file del pool di route candidate, salvato nella cache accanto alla rete con un nome che contiene
+        l'hash della rete e dei parametri di randomTrips. Il pool viene generato solo se non esiste (o se regeneratePool
+        è True), quindi tutte le ore e tutti i giorni usano le stesse route candidate.
+
+        :param sumo_tools_path: percorso ai tool di SUMO
+        :param netFile: path assoluto della rete SUMO
+        :return: (str) path del file .rou.xml del pool
+        '''
+        parameters = " ".join(["--end", str(self.poolSize)] + RANDOM_TRIPS_ARGUMENTS)
+        poolKey = hashlib.sha256((networkUtils.fileHash(netFile) + parameters).encode()).hexdigest()
+        poolFile = os.path.join(networkUtils.defaultCacheDir(netFile), f"routepool_{poolKey}.rou.xml")
+
+        if self.regeneratePool or not os.path.exists(poolFile):
+            os.makedirs(os.path.dirname(poolFile), exist_ok=True)
+            with tempfile.TemporaryDirectory(dir=os.path.dirname(poolFile)) as poolFolder:
+                routeFile = os.path.join(poolFolder, "sampleRoutes.rou.xml")
+                self.generateSampleRoutes(sumo_tools_path, netFile, routeFile,
+                                          os.path.join(poolFolder, "trips.trips.xml"))
+                # sostituzione atomica, così i worker paralleli non leggono mai un pool scritto a metà
+                os.replace(routeFile, poolFile)
+            self.regeneratePool = False
+            self.routePool = None
+            print(f"Route pool generated at '{poolFile}'")
+        return poolFile
+
+    def getRoutePool(self, sumo_tools_path: str, netFile: str) -> RoutePool:
+        '''
+        Restituisce il pool di route candidate caricato in memoria insieme alla matrice di incidenza.
+        Viene letto dal file del pool (vedi getRoutePoolFile) solo alla prima chiamata.
+
+        :param sumo_tools_path: percorso ai tool di SUMO
+        :param netFile: path assoluto della rete SUMO
+        :return: (RoutePool)
+        '''
+        poolFile = self.getRoutePoolFile(sumo_tools_path, netFile)
+        if self.routePool is None or self.routePoolFile != poolFile:
+            self.routePool = RoutePool.fromRouteFile(poolFile, networkUtils.loadNetworkSnapshot(netFile))
+            self.routePoolFile = poolFile
+            print(f"Route pool loaded with {len(self.routePool.routes)} candidate routes")
+        return self.routePool
+
     def setScenario(self, routeFilePath=None, absolutePath: bool = False):
 
         if not absolutePath:
@@ -136,56 +313,1051 @@ class Planner:
     simulator: Simulator
     scenarioGenerator: ScenarioGenerator
 
-    def __init__(self, simulator: Simulator):
-
+    def __init__(self, simulator: Simulator, routeEngine: str = "inprocess", poolSize: int = 3600,
+                 regeneratePool: bool = False, steppingPolicy: str = None, stepInterval: float = None,
+                 outputProfile=None, campaign: CampaignManifest = None, chainHours: bool = False,
+                 simulationModel=None):
+        '''
+        :param simulator: istanza di Simulator usata per le simulazioni
+        :param routeEngine: motore di generazione delle route (vedi ScenarioGenerator)
+        :param poolSize: numero di route candidate del pool condiviso da tutte le ore
+        :param regeneratePool: se True rigenera il pool di route candidate alla prima ora
+        :param steppingPolicy: politica di avanzamento delle simulazioni ("step", "interval" o "batch", vedi
+                               Simulator.setSteppingPolicy). Se None resta quella del simulatore
+        :param stepInterval: secondi simulati di ogni salto con la politica "interval"
+        :param outputProfile: profilo degli output degli scenari (nome di OUTPUT_PROFILES o dizionario, vedi
+                              Simulator.setOutputProfile). Se None resta quello del simulatore
+        :param campaign: manifest della campagna (vedi CampaignManifest): le fasi già completate con gli stessi input
+                         vengono saltate. Se None le fasi vengono registrate solo in memoria
+        :param chainHours: se True le ore consecutive dello stesso giorno vengono concatenate: ogni ora viene simulata
+                           nella propria fascia del giorno (3600 * ora), si ferma alla fine dell'ora salvando lo stato
+                           e l'ora successiva riparte da quello stato invece che da rete vuota (vedi getTimeWindows).
+                           Solo l'ultima ora di ogni sequenza viene eseguita fino all'uscita dell'ultimo veicolo
+        :param simulationModel: modello di simulazione degli scenari ("micro", "meso" o dizionario, vedi
+                                Simulator.setSimulationModel). Se None resta quello del simulatore
+        '''
         self.simulator = simulator
-        self.scenarioGenerator = ScenarioGenerator(sumocfg="run.sumocfg",sim=self.simulator)
+        self.chainHours = chainHours
+        self.campaign = campaign if campaign is not None else CampaignManifest()
+        if steppingPolicy is not None or stepInterval is not None:
+            self.simulator.setSteppingPolicy(steppingPolicy or simulator.steppingPolicy,
+                                             stepInterval or simulator.stepInterval)
+        if outputProfile is not None:
+            self.simulator.setOutputProfile(outputProfile)
+        if simulationModel is not None:
+            self.simulator.setSimulationModel(simulationModel)
+        self.scenarioGenerator = ScenarioGenerator(sumocfg="run.sumocfg",sim=self.simulator, routeEngine=routeEngine,
+                                                   poolSize=poolSize, regeneratePool=regeneratePool)
 
-    def generateRoutesFilesForAllHours(self, baseFolder: str, totalVehicles:int, minLoops:int, congestioned: bool, activeGui: bool):
+    @staticmethod
+    def getScenarioList(baseFolder: str) -> list:
         '''
-        Genera un file 'generatedRoutes.rou.xml' per ogni 'edgedata_dd-mm-yyyy' nella cartella baseFolder
+        Elenca i file 'edgedata_dd-mm-yyyy_hh.xml' presenti nella cartella baseFolder, in ordine cronologico di nome
 
         :param baseFolder: Cartella con tutti i file 'edgedata_*.xml
-        :param totalVhicles:numero totale di veicoli per ogni ora (ogni simulazione)
-        :param minLoop: Numero minimo di loops per veicolo
-        :param congestionated: flag per generare traffico congestionato
-        :return:
+        :return: (list) di tuple (percorso dell'edgedata, timestamp 'dd-mm-YYYY_hh-00' dello scenario)
         '''
-
-        #Legge la lista dei file 'edgedata_*.xml' nella cartella
         file_list = sorted(os.listdir(baseFolder)) #ordina tutti i file nella cartella
         file_pattern = re.compile(r"edgedata_(\d{2})-(\d{2})-(\d{4})_(\d{2})\.xml") #espressione che identifica i file con nome tipo 'edgedata_gg-mm-aaaa_hh.xml'
 
-        #itera su ogni file nella cartella e controlla se il nome corrisponde al pattern
+        scenarios = []
         for file_name in file_list:
-            match=file_pattern.match(file_name)
+            match = file_pattern.match(file_name)
             if match:
                 day, month, year, hour = match.groups() #estrae giorno, mese, anno e ora dal nome del file
                 timestamp = f"{day}-{month}-{year}_{hour}-00" #stringa che sarà il nome della sottocartella dello scenario
+                scenarios.append((os.path.join(baseFolder, file_name), timestamp))
+        return scenarios
 
-                #creazione sottocartella per la simulazione per l'ora considerata
-                scenarioFolder = os.path.join("configs/scenarioCollection", f"{timestamp}")
-                os.makedirs(scenarioFolder, exist_ok=True)
+    @staticmethod
+    def getTimeWindows(scenarios: list) -> dict:
+        '''
+        Finestre temporali delle ore concatenate: ogni ora inizia al secondo 3600 * ora; se l'ora successiva dello
+        stesso giorno è tra gli scenari si ferma alla fine dell'ora salvando lo stato, e l'ora successiva lo carica.
 
-                #percorso del file edgedata.xml corrente
-                edgedata_path = os.path.join(baseFolder, file_name)
-                shutil.copy(edgedata_path,scenarioFolder) #copia l'edgefile_*.xml nella cartella dello scenario
+        :param scenarios: scenari in ordine cronologico (vedi getScenarioList)
+        :return: (dict) timestamp --> dizionario con begin, end, loadState e saveState (vedi Simulator.setTimeWindow)
+        '''
+        def follows(timestamp: str, previous: str) -> bool:
+            # stesso giorno (dd-mm-YYYY) e ora successiva
+            return previous[:10] == timestamp[:10] and int(previous[11:13]) + 1 == int(timestamp[11:13])
 
+        timestamps = [timestamp for _, timestamp in scenarios]
+        windows = {}
+        for index, timestamp in enumerate(timestamps):
+            hour = int(timestamp[11:13])
+            previous = timestamps[index - 1] if index > 0 and follows(timestamp, timestamps[index - 1]) else None
+            chained = index + 1 < len(timestamps) and follows(timestamps[index + 1], timestamp)
+            windows[timestamp] = {
+                "begin": hour * 3600,
+                "end": (hour + 1) * 3600 if chained else None,
+                "loadState": os.path.join("configs/scenarioCollection", previous, STATE_FILE) if previous else None,
+                "saveState": os.path.join("configs/scenarioCollection", timestamp, STATE_FILE) if chained else None,
+            }
+        return windows
 
-                #generazione del Route file, usando la funzione generateRoute()
-                routeFilePath = self.scenarioGenerator.generateRoutes(
-                    edgefile=edgedata_path,
-                    folderPath = scenarioFolder,
-                    totalVehicles=totalVehicles,
-                    minLoops=minLoops,
-                    congestioned=congestioned
-                )
+    @staticmethod
+    def prepareScenarioFolder(edgedata_path: str, timestamp: str) -> str:
+        '''
+        Crea la sottocartella dello scenario in configs/scenarioCollection e vi copia l'edgedata corrispondente
 
+        :param edgedata_path: percorso del file edgedata_*.xml
+        :param timestamp: nome della sottocartella dello scenario
+        :return: (str) percorso della cartella dello scenario
+        '''
+        scenarioFolder = os.path.join("configs/scenarioCollection", f"{timestamp}")
+        os.makedirs(scenarioFolder, exist_ok=True)
+        shutil.copy(edgedata_path, scenarioFolder) #copia l'edgefile_*.xml nella cartella dello scenario
+        return scenarioFolder
+
+    def generateRoutesFilesForAllHours(self, baseFolder: str, totalVehicles:int, minLoops:int, congestioned: bool, activeGui: bool):
+        '''
+        Genera un file 'generatedRoutes.rou.xml' per ogni 'edgedata_dd-mm-yyyy' nella cartella baseFolder
+
+        :param baseFolder: Cartella con tutti i file 'edgedata_*.xml
+        :param totalVhicles:numero totale di veicoli per ogni ora (ogni simulazione)
+        :param minLoop: Numero minimo di loops per veicolo
+        :param congestionated: flag per generare traffico congestionato
+        :return:
+        '''
+
+        campaign = self.campaign
+        poolFile = self.prepareRoutePool()
+        # con reuseSession gli output di uno scenario sono completi solo quando SUMO carica lo scenario successivo:
+        # la fase "simulation" viene registrata allora (o alla chiusura della sessione)
+        pending = None
+        scenarios = self.getScenarioList(baseFolder)
+        windows = self.getTimeWindows(scenarios) if self.chainHours else {}
+
+        #itera su ogni file 'edgedata_*.xml' nella cartella
+        for edgedata_path, timestamp in scenarios:
+            #creazione sottocartella per la simulazione per l'ora considerata
+            scenarioFolder = self.prepareScenario(edgedata_path, timestamp)
+
+            #generazione del Route file, usando la funzione generateRoute(), se non è già stato generato con gli stessi input
+            routeInputs = getRouteInputs(campaign, edgedata_path, poolFile, totalVehicles, minLoops, congestioned,
+                                         self.scenarioGenerator.routeEngine)
+            routeFile = os.path.join(scenarioFolder, "generatedRoutes.rou.xml")
+            if campaign.isDone(timestamp, "sampledRoutes", routeInputs):
+                print(f"Route file già generato: {routeFile}")
+            else:
+                with campaign.stage(timestamp, "sampledRoutes", routeInputs, outputs=[routeFile]):
+                    routeFilePath = self.scenarioGenerator.generateRoutes(
+                        edgefile=edgedata_path,
+                        folderPath = scenarioFolder,
+                        totalVehicles=totalVehicles,
+                        minLoops=minLoops,
+                        congestioned=congestioned
+                    )
                 print(f"Route file generato: {routeFilePath}")
+
+            simulationInputs = getSimulationInputs(campaign, scenarioFolder, self.simulator.configurationPath,
+                                                   self.getSimulationSettings())
+            if self.chainHours:
+                # se l'ora precedente è stata rieseguita cambia anche il suo stato, quindi va rieseguita anche questa
+                simulationInputs.update(getChainInputs(campaign, windows[timestamp]))
+            if campaign.isDone(timestamp, "simulation", simulationInputs):
+                print(f"Simulazione già eseguita: {scenarioFolder}")
+                continue
+            applyTimeWindow(self.simulator, windows.get(timestamp))
+            if not self.simulator.reuseSession:
+                with campaign.stage(timestamp, "simulation", simulationInputs) as running:
+                    self.scenarioGenerator.setScenario(routeFilePath=scenarioFolder, absolutePath=False)
+                    logFilePath = os.path.join(scenarioFolder, "sumo_log.txt")
+                    self.simulator.start(activeGui=activeGui, logFilePath=logFilePath, simulationPath=scenarioFolder)
+                    running.outputs.extend(getSimulationOutputs(scenarioFolder))
+                continue
+
+            begin = time.perf_counter()
+            try:
                 self.scenarioGenerator.setScenario(routeFilePath=scenarioFolder, absolutePath=False)
-                logFilePath = os.path.join(scenarioFolder, "sumo_log.txt")
-                self.simulator.start(activeGui=activeGui, logFilePath=logFilePath)
+                self.simulator.start(activeGui=activeGui, logFilePath=os.path.join(scenarioFolder, "sumo_log.txt"),
+                                     simulationPath=scenarioFolder)
+            except BaseException as e:
+                campaign.record(timestamp, "simulation", FAILED, simulationInputs, (), time.perf_counter() - begin,
+                                repr(e))
+                raise
+            finally:
+                # il caricamento di questo scenario ha chiuso gli output del precedente
+                if pending:
+                    self.recordSessionSimulation(*pending)
+            pending = (timestamp, simulationInputs, scenarioFolder, time.perf_counter() - begin)
 
+        if pending:
+            if self.simulator.isConnected():
+                self.simulator.end()
+            self.recordSessionSimulation(*pending)
         print("\n Tutti i file sono stati creati cin successo")
 
+    def recordSessionSimulation(self, timestamp: str, inputs: dict, scenarioFolder: str, seconds: float):
+        '''
+        Registra come completata la fase "simulation" di uno scenario eseguito con reuseSession, dopo che SUMO ne ha
+        chiuso gli output (caricando lo scenario successivo o chiudendo la sessione)
+        '''
+        self.campaign.record(timestamp, "simulation", DONE, inputs, getSimulationOutputs(scenarioFolder), seconds)
+
+    def prepareScenario(self, edgedata_path: str, timestamp: str) -> str:
+        '''
+        Fase "edgedata" della campagna: crea la cartella dello scenario e vi copia l'edgedata, se non è già presente
+        con lo stesso contenuto
+
+        :param edgedata_path: percorso del file edgedata_*.xml
+        :param timestamp: nome della sottocartella dello scenario
+        :return: (str) percorso della cartella dello scenario
+        '''
+        scenarioFolder = os.path.join("configs/scenarioCollection", f"{timestamp}")
+        inputs = {"edgedata": self.campaign.fileHash(edgedata_path)}
+        if not self.campaign.isDone(timestamp, "edgedata", inputs):
+            with self.campaign.stage(timestamp, "edgedata", inputs,
+                                     outputs=[os.path.join(scenarioFolder, os.path.basename(edgedata_path))]):
+                self.prepareScenarioFolder(edgedata_path, timestamp)
+        return scenarioFolder
+
+    def prepareRoutePool(self) -> str:
+        '''
+        Fase "sampleRoutes" della campagna: prepara il pool di route candidate condiviso da tutti gli scenari
+        (vedi ScenarioGenerator.getRoutePoolFile), registrandolo nel manifest
+        :return: (str) path del file del pool
+        '''
+        netFile = os.path.abspath("configs/joined_lanes.net.xml")
+        inputs = {"network": self.campaign.fileHash(netFile), "poolSize": self.scenarioGenerator.poolSize,
+                  "arguments": RANDOM_TRIPS_ARGUMENTS}
+        record = self.campaign.getRecord(CAMPAIGN_SCOPE, "sampleRoutes")
+        if not self.scenarioGenerator.regeneratePool and self.campaign.isDone(CAMPAIGN_SCOPE, "sampleRoutes", inputs):
+            return next(iter(record["outputs"]))
+        with self.campaign.stage(CAMPAIGN_SCOPE, "sampleRoutes", inputs) as running:
+            poolFile = self.scenarioGenerator.getRoutePoolFile(getSumoToolsPath(), netFile)
+            running.outputs.append(poolFile)
+        return poolFile
+
+    def getSimulationSettings(self) -> dict:
+        '''
+        :return: (dict) parametri del simulatore che cambiano gli output, parte degli input della fase "simulation"
+        '''
+        return {"steppingPolicy": self.simulator.steppingPolicy, "stepInterval": self.simulator.stepInterval,
+                "collectionMode": self.simulator.collectionMode, "outputProfile": self.simulator.outputProfile,
+                "simulationModel": self.simulator.simulationModel, "adaptiveTLS": self.simulator.adaptiveTLS,
+                "tlsCooldown": self.simulator.tlsCooldown,
+                "detectorSamplingInterval": self.simulator.detectorSamplingInterval}
+
+    @staticmethod
+    def getScenarioFolders(collectionFolder: str = "configs/scenarioCollection") -> list:
+        '''
+        Elenca le cartelle 'dd-mm-YYYY_hh-mm' della collezione che contengono già il file delle route
+
+        :param collectionFolder: cartella con le cartelle degli scenari
+        :return: (list) percorsi delle cartelle degli scenari, in ordine di nome
+        '''
+        folder_pattern = re.compile(r"\d{2}-\d{2}-\d{4}_\d{2}-\d{2}$")
+        return [os.path.join(collectionFolder, name) for name in sorted(os.listdir(collectionFolder))
+                if folder_pattern.match(name)
+                and os.path.exists(os.path.join(collectionFolder, name, "generatedRoutes.rou.xml"))]
+
+    def runScenariosBatch(self, scenarioFolders: list = None, workers: int = os.cpu_count(),
+                          engine: str = "sumo", outputProfile=None) -> list:
+        '''
+        Esegue in batch (senza TraCI) gli scenari con le route già generate, su un pool limitato di worker.
+        Da usare quando non serve il controllo adattivo dei TLS: tutti gli output sono scritti direttamente da SUMO.
+
+        :param scenarioFolders: cartelle degli scenari, se None tutte quelle di configs/scenarioCollection
+        :param workers: numero massimo di simulazioni contemporanee
+        :param engine: "sumo" (processo separato) oppure "libsumo" (nel processo del worker)
+        :param outputProfile: profilo degli output di questa esecuzione, se None quello del simulatore
+        :return: (list) dei risultati di runBatchScenario
+        '''
+        if scenarioFolders is None:
+            scenarioFolders = self.getScenarioFolders()
+        if outputProfile is not None:
+            self.simulator.setOutputProfile(outputProfile)
+
+        # gli scenari già simulati con gli stessi input vengono saltati
+        settings = {"steppingPolicy": "batch", "outputProfile": self.simulator.outputProfile,
+                    "simulationModel": self.simulator.simulationModel}
+        inputs = {folder: getSimulationInputs(self.campaign, folder, self.simulator.configurationPath, settings)
+                  for folder in scenarioFolders}
+        pending = [folder for folder in scenarioFolders
+                   if not self.campaign.isDone(os.path.basename(os.path.normpath(folder)), "simulation", inputs[folder])]
+        print(f"Scenari da simulare: {len(pending)} (già eseguiti: {len(scenarioFolders) - len(pending)})")
+
+        runner = BatchRunner(configurationPath=self.simulator.configurationPath, workers=workers, engine=engine,
+                             outputProfile=self.simulator.outputProfile,
+                             simulationModel=self.simulator.simulationModel)
+        results = runner.run(pending)
+        for folder, result in zip(pending, results):
+            status = DONE if result["exitCode"] == 0 else FAILED
+            self.campaign.record(result["scenario"], "simulation", status, inputs[folder],
+                                 outputFiles(folder).values() if status == DONE else (), result["seconds"],
+                                 (result["stderr"].strip() or None) if status == FAILED else None)
+        return results
+
+    def generateRoutesFilesForAllHoursParallel(self, baseFolder: str, totalVehicles: int, minLoops: int,
+                                               congestioned: bool, workers: int = os.cpu_count(),
+                                               basePort: int = None) -> list:
+        '''
+        Come generateRoutesFilesForAllHours, ma distribuisce gli scenari orari su un pool di processi.
+        Ogni worker avvia la propria istanza di SUMO (senza GUI) con una connessione TraCI etichettata e una porta
+        dedicata, e riceve la cartella dello scenario da riga di comando invece che da os.environ.
+
+        :param baseFolder: Cartella con tutti i file 'edgedata_*.xml
+        :param totalVehicles: numero totale di veicoli per ogni ora (ogni simulazione)
+        :param minLoops: Numero minimo di loops per veicolo
+        :param congestioned: flag per generare traffico congestionato
+        :param workers: numero di processi (istanze di SUMO) in parallelo
+        :param basePort: se specificata, lo scenario i-esimo usa la porta basePort + i, altrimenti una porta libera
+        :return: (list) dei tempi per scenario (vedi runScenario)
+        '''
+        # il pool di route candidate viene preparato una sola volta, prima di avviare i worker
+        poolFile = self.prepareRoutePool()
+
+        # le fasi già completate con gli stessi input vengono saltate: ai worker vanno solo le fasi mancanti
+        campaign = self.campaign
+        scenarios = []
+        scenarioList = self.getScenarioList(baseFolder)
+        windows = self.getTimeWindows(scenarioList) if self.chainHours else {}
+        # giorni con un'ora da rieseguire: con le ore concatenate vanno rieseguite anche tutte le ore successive
+        changedDays = set()
+        for edgedata_path, timestamp in scenarioList:
+            scenarioFolder = self.prepareScenario(edgedata_path, timestamp)
+            routeInputs = getRouteInputs(campaign, edgedata_path, poolFile, totalVehicles, minLoops, congestioned,
+                                         self.scenarioGenerator.routeEngine)
+            generateRoutes = not campaign.isDone(timestamp, "sampledRoutes", routeInputs)
+            simulationInputs = getSimulationInputs(campaign, scenarioFolder, self.simulator.configurationPath,
+                                                   self.getSimulationSettings())
+            if self.chainHours:
+                simulationInputs.update(getChainInputs(campaign, windows[timestamp]))
+            simulate = generateRoutes or timestamp[:10] in changedDays or \
+                not campaign.isDone(timestamp, "simulation", simulationInputs)
+            if simulate:
+                if self.chainHours:
+                    changedDays.add(timestamp[:10])
+                scenarios.append({"edgedata": edgedata_path, "timestamp": timestamp, "scenarioFolder": scenarioFolder,
+                                  "routeInputs": routeInputs, "generateRoutes": generateRoutes,
+                                  "window": windows.get(timestamp)})
+        print(f"Scenari da eseguire: {len(scenarios)}")
+
+        runner = ParallelRunner(configurationPath=self.simulator.configurationPath, workers=workers, basePort=basePort,
+                                routeEngine=self.scenarioGenerator.routeEngine,
+                                poolSize=self.scenarioGenerator.poolSize,
+                                steppingPolicy=self.simulator.steppingPolicy,
+                                stepInterval=self.simulator.stepInterval,
+                                outputProfile=self.simulator.outputProfile,
+                                reuseSession=self.simulator.reuseSession, chainHours=self.chainHours,
+                                simulationModel=self.simulator.simulationModel,
+                                adaptiveTLS=self.simulator.adaptiveTLS,
+                                collectionMode=self.simulator.collectionMode,
+                                tlsCooldown=self.simulator.tlsCooldown,
+                                detectorSamplingInterval=self.simulator.detectorSamplingInterval,
+                                backend=self.simulator.backend, batchEngine=self.simulator.batchEngine)
+        results = runner.run(baseFolder, totalVehicles=totalVehicles, minLoops=minLoops, congestioned=congestioned,
+                             scenarios=scenarios)
+        self.recordParallelResults(scenarios, results)
+        return results
+
+    def recordParallelResults(self, scenarios: list, results: list):
+        '''
+        Registra nel manifest della campagna le fasi eseguite dai worker del ParallelRunner
+        :param scenarios: scenari passati a ParallelRunner.run
+        :param results: risultati di runScenario, nello stesso ordine
+        '''
+        for scenario, result in zip(scenarios, results):
+            timestamp, scenarioFolder = scenario["timestamp"], scenario["scenarioFolder"]
+            if scenario["generateRoutes"]:
+                routesFailed = result["error"] and result["failedStage"] == "sampledRoutes"
+                self.campaign.record(timestamp, "sampledRoutes", FAILED if routesFailed else DONE,
+                                     scenario["routeInputs"],
+                                     () if routesFailed else [os.path.join(scenarioFolder, "generatedRoutes.rou.xml")],
+                                     result["routesSeconds"], result["error"] if routesFailed else None)
+                if routesFailed:
+                    continue
+            simulationInputs = getSimulationInputs(self.campaign, scenarioFolder, self.simulator.configurationPath,
+                                                   self.getSimulationSettings())
+            if scenario.get("window"):
+                simulationInputs.update(getChainInputs(self.campaign, scenario["window"]))
+            if result["error"]:
+                self.campaign.record(timestamp, "simulation", FAILED, simulationInputs, (),
+                                     result["simulationSeconds"], result["error"])
+            else:
+                self.campaign.record(timestamp, "simulation", DONE, simulationInputs,
+                                     getSimulationOutputs(scenarioFolder), result["simulationSeconds"])
 
+    def generateRoutesFilesForAllHoursPipelined(self, baseFolder: str, totalVehicles: int, minLoops: int,
+                                                congestioned: bool, workers: dict = None, queueSize: int = 2,
+                                                outputFolder: str = None) -> dict:
+        '''
+        Come generateRoutesFilesForAllHours, ma le fasi di ogni scenario orario sono eseguite come pipeline (vedi
+        PipelineRunner): mentre l'ora h viene simulata, le route dell'ora h+1 vengono già campionate.
+
+        :param baseFolder: Cartella con tutti i file 'edgedata_*.xml
+        :param totalVehicles: numero totale di veicoli per ogni ora (ogni simulazione)
+        :param minLoops: Numero minimo di loops per veicolo
+        :param congestioned: flag per generare traffico congestionato
+        :param workers: fase --> numero di worker (vedi PIPELINE_STAGES), le fasi non indicate usano PIPELINE_WORKERS
+        :param queueSize: numero massimo di scenari in attesa tra una fase e la successiva
+        :param outputFolder: cartella del dataset Parquet in cui esportare gli output, se None nessuna esportazione
+        :return: (dict) vedi PipelineRunner.run
+        '''
+        runner = PipelineRunner(self, workers=workers, queueSize=queueSize, outputFolder=outputFolder)
+        return runner.run(baseFolder, totalVehicles=totalVehicles, minLoops=minLoops, congestioned=congestioned)
+
+
+def runScenario(task: dict, simulator: Simulator = None) -> dict:
+    '''
+    Worker del ParallelRunner: genera le route ed esegue la simulazione di un singolo scenario orario.
+    Viene eseguito in un processo separato, quindi crea il proprio Simulator e la propria connessione TraCI.
+
+    :param task: dizionario con edgedata, timestamp, configurationPath, port, parametri di generazione delle route e,
+                 opzionalmente, scenarioFolder già preparata, generateRoutes (False se le route sono già aggiornate) e
+                 window (finestra temporale con le ore concatenate, vedi Planner.getTimeWindows)
+    :param simulator: Simulator con una sessione aperta da riusare (vedi runScenarioSession), se None ne viene creato
+                      uno per lo scenario
+    :return: (dict) timestamp dello scenario, tempi di generazione route/simulazione/totale in secondi, eventuale errore
+             e fase in cui si è verificato (failedStage)
+    '''
+    result = {"scenario": task["timestamp"], "routesSeconds": 0.0, "simulationSeconds": 0.0, "error": None,
+              "failedStage": None}
+    begin = time.perf_counter()
+    try:
+        result["failedStage"] = "sampledRoutes"
+        scenarioFolder = task.get("scenarioFolder") or Planner.prepareScenarioFolder(task["edgedata"],
+                                                                                   task["timestamp"])
+        logFilePath = os.path.join(scenarioFolder, "sumo_log.txt")
+        if simulator is None:
+            simulator = Simulator(configurationPath=task["configurationPath"], logFile=logFilePath,
+                                  label=task["timestamp"], port=task["port"], steppingPolicy=task["steppingPolicy"],
+                                  stepInterval=task["stepInterval"], outputProfile=task["outputProfile"],
+                                  simulationModel=task["simulationModel"], adaptiveTLS=task["adaptiveTLS"],
+                                  collectionMode=task["collectionMode"], tlsCooldown=task["tlsCooldown"],
+                                  detectorSamplingInterval=task["detectorSamplingInterval"], backend=task["backend"],
+                                  batchEngine=task["batchEngine"])
+        scenarioGenerator = ScenarioGenerator(sumocfg="run.sumocfg", sim=simulator, routeEngine=task["routeEngine"],
+                                              poolSize=task["poolSize"])
+
+        if task.get("generateRoutes", True):
+            scenarioGenerator.generateRoutes(
+                edgefile=task["edgedata"],
+                folderPath=scenarioFolder,
+                totalVehicles=task["totalVehicles"],
+                minLoops=task["minLoops"],
+                congestioned=task["congestioned"]
+            )
+        result["routesSeconds"] = time.perf_counter() - begin
+
+        result["failedStage"] = "simulation"
+        simulationBegin = time.perf_counter()
+        applyTimeWindow(simulator, task.get("window"))
+        simulator.start(activeGui=False, logFilePath=logFilePath, simulationPath=scenarioFolder)
+        result["simulationSeconds"] = time.perf_counter() - simulationBegin
+        result["startupSeconds"] = simulator.startupSeconds
+        result["failedStage"] = None
+    except Exception as e:
+        result["error"] = repr(e)
+    result["totalSeconds"] = time.perf_counter() - begin
+    return result
+
+
+def runScenarioSession(tasks: list) -> list:
+    '''
+    Worker del ParallelRunner con reuseSession: esegue in ordine gli scenari assegnati al worker con una sola istanza
+    di SUMO, ricaricata con il nuovo scenario (traci.load) invece di essere riavviata. La sessione viene chiusa alla
+    fine, così anche gli output dell'ultimo scenario sono completi quando il worker restituisce i risultati.
+    Con le ore concatenate il blocco è un giorno intero: ogni ora carica lo stato salvato dall'ora precedente.
+
+    :param tasks: scenari del worker (vedi runScenario), tutti con gli stessi parametri del simulatore
+    :return: (list) dei risultati di runScenario, nello stesso ordine
+    '''
+    first = tasks[0]
+    simulator = Simulator(configurationPath=first["configurationPath"], logFile=None, label=first["timestamp"],
+                          port=first["port"], steppingPolicy=first["steppingPolicy"],
+                          stepInterval=first["stepInterval"], outputProfile=first["outputProfile"], reuseSession=True,
+                          simulationModel=first["simulationModel"], adaptiveTLS=first["adaptiveTLS"],
+                          collectionMode=first["collectionMode"], tlsCooldown=first["tlsCooldown"],
+                          detectorSamplingInterval=first["detectorSamplingInterval"], backend=first["backend"],
+                          batchEngine=first["batchEngine"])
+    results = [runScenario(task, simulator) for task in tasks]
+    if simulator.isConnected():
+        simulator.end()
+    return results
+
+
+class ParallelRunner:
+    '''
+    Esegue gli scenari orari in parallelo su un pool di processi, ognuno con un'istanza isolata di SUMO.
+
+    Attributi della classe:
+    configurationPath (str) --> cartella con run.sumocfg e i file statici (STATICPATH)
+    workers (int) --> numero di processi del pool
+    basePort (int) --> porta TraCI del primo scenario, None per usare porte libere scelte da TraCI
+    routeEngine (str), poolSize (int) --> parametri di generazione delle route (vedi ScenarioGenerator)
+    steppingPolicy (str), stepInterval (float) --> avanzamento delle simulazioni (vedi Simulator.setSteppingPolicy)
+    outputProfile (str | dict) --> profilo degli output degli scenari (vedi Simulator.setOutputProfile)
+    simulationModel (str | dict) --> modello di simulazione degli scenari (vedi Simulator.setSimulationModel)
+    reuseSession (bool) --> se True ogni worker riceve un blocco di ore consecutive e le simula con una sola istanza
+                            di SUMO (vedi runScenarioSession), invece di avviarne una per scenario
+    chainHours (bool) --> se True ogni worker riceve un giorno intero, simulato in ordine con le ore concatenate (vedi
+                          Planner.getTimeWindows) in una sola sessione
+    adaptiveTLS (bool) --> se True le simulazioni usano il controllo adattivo dei TLS su tutte le spire (vedi Simulator)
+    collectionMode (str) --> modalità di raccolta delle metriche dei veicoli (vedi Simulator)
+    tlsCooldown (float) --> secondi simulati minimi tra due cambi di programma dello stesso TLS (vedi Simulator)
+    detectorSamplingInterval (float) --> secondi simulati tra due campioni delle spire, None per il periodo di
+                                         aggregazione (vedi DetectorMonitor)
+    backend (str), batchEngine (str) --> backend di SUMO delle simulazioni e motore della politica "batch" (vedi
+                                         Simulator)
+    '''
+    configurationPath: str
+    workers: int
+    basePort: int
+    routeEngine: str
+    poolSize: int
+    steppingPolicy: str
+    stepInterval: float
+    outputProfile: dict
+    simulationModel: dict
+    reuseSession: bool
+    chainHours: bool
+    adaptiveTLS: bool
+    collectionMode: str
+    tlsCooldown: float
+    detectorSamplingInterval: float
+    backend: str
+    batchEngine: str
+
+    def __init__(self, configurationPath: str, workers: int = os.cpu_count(), basePort: int = None,
+                 routeEngine: str = "inprocess", poolSize: int = 3600, steppingPolicy: str = "step",
+                 stepInterval: float = 60, outputProfile="full", reuseSession: bool = False,
+                 chainHours: bool = False, simulationModel="micro", adaptiveTLS: bool = False,
+                 collectionMode: str = "polling", tlsCooldown: float = 300, detectorSamplingInterval: float = None,
+                 backend: str = "auto", batchEngine: str = "sumo"):
+
+        self.configurationPath = configurationPath
+        self.workers = max(1, workers or 1)
+        self.basePort = basePort
+        self.routeEngine = routeEngine
+        self.poolSize = poolSize
+        self.steppingPolicy = steppingPolicy
+        self.stepInterval = stepInterval
+        self.outputProfile = outputProfile
+        self.reuseSession = reuseSession
+        self.chainHours = chainHours
+        self.simulationModel = simulationModel
+        self.adaptiveTLS = adaptiveTLS
+        self.collectionMode = collectionMode
+        self.tlsCooldown = tlsCooldown
+        self.detectorSamplingInterval = detectorSamplingInterval
+        self.backend = backend
+        self.batchEngine = batchEngine
+
+    def run(self, baseFolder: str, totalVehicles: int, minLoops: int, congestioned: bool,
+            scenarios: list = None) -> list:
+        '''
+        Genera le route e simula tutti gli scenari di baseFolder, stampando il tempo di ogni scenario e un riepilogo
+        del throughput
+
+        :param baseFolder: Cartella con tutti i file 'edgedata_*.xml
+        :param totalVehicles: numero totale di veicoli per ogni ora
+        :param minLoops: Numero minimo di loops per veicolo
+        :param congestioned: flag per generare traffico congestionato
+        :param scenarios: scenari da eseguire (dizionari con edgedata, timestamp ed eventualmente scenarioFolder,
+                          generateRoutes e window), se None tutti quelli di baseFolder
+        :return: (list) dei risultati di runScenario, in ordine cronologico
+        '''
+        if scenarios is None:
+            scenarioList = Planner.getScenarioList(baseFolder)
+            windows = Planner.getTimeWindows(scenarioList) if self.chainHours else {}
+            scenarios = [{"edgedata": edgedata_path, "timestamp": timestamp, "window": windows.get(timestamp)}
+                         for edgedata_path, timestamp in scenarioList]
+        tasks = []
+        for index, scenario in enumerate(scenarios):
+            tasks.append({
+                "edgedata": scenario["edgedata"],
+                "timestamp": scenario["timestamp"],
+                "scenarioFolder": scenario.get("scenarioFolder"),
+                "generateRoutes": scenario.get("generateRoutes", True),
+                "window": scenario.get("window"),
+                "configurationPath": self.configurationPath,
+                "port": self.basePort + index if self.basePort is not None else None,
+                "totalVehicles": totalVehicles,
+                "minLoops": minLoops,
+                "congestioned": congestioned,
+                "routeEngine": self.routeEngine,
+                "poolSize": self.poolSize,
+                "steppingPolicy": self.steppingPolicy,
+                "stepInterval": self.stepInterval,
+                "outputProfile": self.outputProfile,
+                "simulationModel": self.simulationModel,
+                "adaptiveTLS": self.adaptiveTLS,
+                "collectionMode": self.collectionMode,
+                "tlsCooldown": self.tlsCooldown,
+                "detectorSamplingInterval": self.detectorSamplingInterval,
+                "backend": self.backend,
+                "batchEngine": self.batchEngine,
+            })
+
+        results = []
+        begin = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            if self.chainHours:
+                # un blocco per giorno: le ore di un giorno dipendono dallo stato dell'ora precedente
+                days = {}
+                for task in tasks:
+                    days.setdefault(task["timestamp"][:10], []).append(task)
+                futures = [executor.submit(runScenarioSession, block) for block in days.values()]
+            elif self.reuseSession:
+                # blocchi di ore consecutive, uno per worker
+                size = -(-len(tasks) // self.workers)
+                futures = [executor.submit(runScenarioSession, tasks[index:index + size])
+                           for index in range(0, len(tasks), size)]
+            else:
+                futures = [executor.submit(runScenario, task) for task in tasks]
+            for future in as_completed(futures):
+                for result in future.result() if self.chainHours or self.reuseSession else [future.result()]:
+                    results.append(result)
+                    status = "ERROR " + result["error"] if result["error"] else "ok"
+                    print(f"[{len(results)}/{len(tasks)}] {result['scenario']}: routes {result['routesSeconds']:.1f}s, "
+                          f"simulation {result['simulationSeconds']:.1f}s, total {result['totalSeconds']:.1f}s "
+                          f"({status})")
+        wallSeconds = time.perf_counter() - begin
+
+        order = {task["timestamp"]: index for index, task in enumerate(tasks)}
+        results.sort(key=lambda result: order[result["scenario"]])
+        self.printSummary(results, wallSeconds)
+        return results
+
+    def printSummary(self, results: list, wallSeconds: float):
+        '''
+        Stampa il riepilogo del throughput: scenari completati, tempo totale, scenari/ora ed efficienza del pool
+        :param results: risultati di runScenario
+        :param wallSeconds: tempo reale impiegato dall'intera esecuzione
+        '''
+        completed = [result for result in results if not result["error"]]
+        busySeconds = sum(result["totalSeconds"] for result in results)
+        print("\n Riepilogo esecuzione parallela")
+        print(f"Scenari completati: {len(completed)}/{len(results)} con {self.workers} worker")
+        print(f"Tempo totale: {wallSeconds:.1f}s")
+        if results and wallSeconds > 0:
+            print(f"Throughput: {len(completed) / wallSeconds * 3600:.1f} scenari/ora")
+            print(f"Tempo medio per scenario: {busySeconds / len(results):.1f}s")
+            print(f"Efficienza del pool: {busySeconds / (wallSeconds * self.workers):.0%}")
+
+
+def runBatchScenario(task: dict) -> dict:
+    '''
+    Worker del BatchRunner: esegue la simulazione di uno scenario in batch, senza TraCI.
+
+    :param task: dizionario con scenarioFolder, configurationPath, engine, outputProfile e simulationModel
+    :return: (dict) nome dello scenario, codice di uscita, stderr di SUMO e durata in secondi
+    '''
+    scenarioFolder = task["scenarioFolder"]
+    result = {"scenario": os.path.basename(os.path.normpath(scenarioFolder)), "exitCode": None, "stderr": "",
+              "seconds": 0.0}
+    try:
+        simulator = Simulator(configurationPath=task["configurationPath"],
+                              logFile=os.path.join(scenarioFolder, "sumo_log.txt"),
+                              label=result["scenario"], batchEngine=task["engine"],
+                              outputProfile=task["outputProfile"], simulationModel=task["simulationModel"])
+        result.update(simulator.runBatch(simulator.getBatchCommand(scenarioFolder)))
+    except Exception as e:
+        result["exitCode"] = 1
+        result["stderr"] = repr(e)
+    return result
+
+
+class BatchRunner:
+    '''
+    Esegue molti scenari in batch (sumo o libsumo, senza TraCI) su un pool limitato di processi, raccogliendo per ogni
+    scenario codice di uscita, stderr e durata.
+
+    Attributi della classe:
+    configurationPath (str) --> cartella con run.sumocfg e i file statici (STATICPATH)
+    workers (int) --> numero massimo di simulazioni contemporanee
+    engine (str) --> "sumo" oppure "libsumo" (vedi Simulator.runBatch)
+    outputProfile (str | dict) --> profilo degli output degli scenari (vedi Simulator.setOutputProfile)
+    simulationModel (str | dict) --> modello di simulazione degli scenari (vedi Simulator.setSimulationModel)
+    '''
+    configurationPath: str
+    workers: int
+    engine: str
+    outputProfile: dict
+    simulationModel: dict
+
+    def __init__(self, configurationPath: str, workers: int = os.cpu_count(), engine: str = "sumo",
+                 outputProfile="full", simulationModel="micro"):
+
+        self.configurationPath = configurationPath
+        self.workers = max(1, workers or 1)
+        self.engine = engine
+        self.outputProfile = outputProfile
+        self.simulationModel = simulationModel
+
+    def run(self, scenarioFolders: list) -> list:
+        '''
+        :param scenarioFolders: cartelle degli scenari con generatedRoutes.rou.xml
+        :return: (list) dei risultati di runBatchScenario, nell'ordine di scenarioFolders
+        '''
+        tasks = [{"scenarioFolder": folder, "configurationPath": self.configurationPath, "engine": self.engine,
+                  "outputProfile": self.outputProfile, "simulationModel": self.simulationModel}
+                 for folder in scenarioFolders]
+        results = []
+        begin = time.perf_counter()
+        # libsumo può avere una sola simulazione per processo: ogni worker è un processo separato
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(runBatchScenario, task): index for index, task in enumerate(tasks)}
+            for future in as_completed(futures):
+                result = future.result()
+                result["index"] = futures[future]
+                results.append(result)
+                status = "ok" if result["exitCode"] == 0 else f"exit code {result['exitCode']}"
+                print(f"[{len(results)}/{len(tasks)}] {result['scenario']}: {result['seconds']:.1f}s ({status})")
+        wallSeconds = time.perf_counter() - begin
+
+        results.sort(key=lambda result: result.pop("index"))
+        self.printSummary(results, wallSeconds)
+        return results
+
+    def printSummary(self, results: list, wallSeconds: float):
+        '''
+        Stampa il riepilogo: scenari riusciti e falliti (con la prima riga di stderr), tempo totale e throughput
+        :param results: risultati di runBatchScenario
+        :param wallSeconds: tempo reale impiegato dall'intera esecuzione
+        '''
+        failed = [result for result in results if result["exitCode"] != 0]
+        print("\n Riepilogo esecuzione batch")
+        print(f"Scenari riusciti: {len(results) - len(failed)}/{len(results)} con {self.workers} worker ({self.engine})")
+        for result in failed:
+            firstLine = result["stderr"].strip().splitlines()[0] if result["stderr"].strip() else ""
+            print(f"  {result['scenario']}: exit code {result['exitCode']} {firstLine}")
+        print(f"Tempo totale: {wallSeconds:.1f}s")
+        if results and wallSeconds > 0:
+            print(f"Throughput: {(len(results) - len(failed)) / wallSeconds * 3600:.1f} scenari/ora")
+
+
+# fasi per scenario della pipeline, nell'ordine in cui vengono eseguite. Il pool di route candidate ("sampleRoutes") è
+# condiviso da tutti gli scenari e viene preparato una sola volta prima di avviare la pipeline
+PIPELINE_STAGES = ("edgedata", "sampledRoutes", "simulation", "export")
+# worker di default per fase: la copia dell'edgedata è immediata, la simulazione è la fase più lenta
+PIPELINE_WORKERS = {"edgedata": 1, "sampledRoutes": 1, "simulation": max(1, (os.cpu_count() or 2) - 1), "export": 1}
+
+# generatori di route dei worker della pipeline, uno per processo: il pool di route candidate viene caricato in memoria
+# una sola volta e riusato da tutti gli scenari assegnati al worker
+_scenarioGenerators = {}
+
+
+def sampleScenarioRoutes(task: dict) -> float:
+    '''
+    Worker della fase "sampledRoutes" della pipeline: genera il file delle route di uno scenario
+    :param task: dizionario con edgedata, scenarioFolder e parametri di generazione delle route
+    :return: (float) durata in secondi
+    '''
+    begin = time.perf_counter()
+    key = (task["routeEngine"], task["poolSize"])
+    if key not in _scenarioGenerators:
+        _scenarioGenerators[key] = ScenarioGenerator(sumocfg="run.sumocfg", sim=None, routeEngine=task["routeEngine"],
+                                                     poolSize=task["poolSize"])
+    _scenarioGenerators[key].generateRoutes(edgefile=task["edgedata"], folderPath=task["scenarioFolder"],
+                                            totalVehicles=task["totalVehicles"], minLoops=task["minLoops"],
+                                            congestioned=task["congestioned"])
+    return time.perf_counter() - begin
+
+
+def simulateScenario(task: dict) -> float:
+    '''
+    Worker della fase "simulation" della pipeline: simula uno scenario con un'istanza isolata di SUMO (senza GUI)
+    :param task: dizionario con scenarioFolder, timestamp, configurationPath e parametri del simulatore
+    :return: (float) durata in secondi
+    '''
+    begin = time.perf_counter()
+    logFilePath = os.path.join(task["scenarioFolder"], "sumo_log.txt")
+    simulator = Simulator(configurationPath=task["configurationPath"], logFile=logFilePath, label=task["timestamp"],
+                          steppingPolicy=task["steppingPolicy"], stepInterval=task["stepInterval"],
+                          outputProfile=task["outputProfile"], simulationModel=task["simulationModel"],
+                          adaptiveTLS=task["adaptiveTLS"], collectionMode=task["collectionMode"],
+                          tlsCooldown=task["tlsCooldown"], detectorSamplingInterval=task["detectorSamplingInterval"],
+                          backend=task["backend"], batchEngine=task["batchEngine"])
+    result = simulator.start(activeGui=False, logFilePath=logFilePath, simulationPath=task["scenarioFolder"])
+    # con la politica "batch" start restituisce il risultato di runBatch invece di sollevare un'eccezione
+    if isinstance(result, dict) and result["exitCode"] != 0:
+        raise RuntimeError(f"SUMO exited with code {result['exitCode']}: {result['stderr'].strip()}")
+    return time.perf_counter() - begin
+
+
+def exportPipelineScenario(task: dict) -> float:
+    '''
+    Worker della fase "export" della pipeline: esporta gli output di uno scenario in Parquet (vedi
+    exportUtils.exportScenario)
+    :return: (float) durata in secondi
+    '''
+    result = exportUtils.exportScenario(task)
+    if result["error"]:
+        raise RuntimeError(result["error"])
+    return result["seconds"]
+
+
+class StageMetrics:
+    '''
+    Metriche di una fase della pipeline, aggiornate dai suoi worker.
+
+    Attributi della classe:
+    workers (int) --> numero di worker della fase
+    counts (dict) --> scenari completati ("done"), già aggiornati ("skipped") e falliti ("failed")
+    busySeconds (float) --> tempo totale in cui i worker hanno elaborato uno scenario
+    waitSeconds (float) --> tempo totale in cui i worker hanno atteso uno scenario dalla fase precedente
+    blockedSeconds (float) --> tempo totale in cui i worker hanno atteso spazio nella coda della fase successiva
+    depths (list) --> campioni del numero di scenari nella coda in ingresso alla fase
+    '''
+
+    def __init__(self, workers: int):
+
+        self.workers = workers
+        self.counts = {DONE: 0, "skipped": 0, FAILED: 0}
+        self.busySeconds = 0.0
+        self.waitSeconds = 0.0
+        self.blockedSeconds = 0.0
+        self.depths = []
+
+    def toDict(self, wallSeconds: float) -> dict:
+        '''
+        :param wallSeconds: tempo reale dell'intera pipeline
+        :return: (dict) metriche della fase, con utilizzo dei worker e profondità media e massima della coda in ingresso
+        '''
+        return {"workers": self.workers, **self.counts, "busySeconds": round(self.busySeconds, 3),
+                "waitSeconds": round(self.waitSeconds, 3), "blockedSeconds": round(self.blockedSeconds, 3),
+                "utilization": self.busySeconds / (wallSeconds * self.workers) if wallSeconds > 0 else 0.0,
+                "meanQueueDepth": sum(self.depths) / len(self.depths) if self.depths else 0.0,
+                "maxQueueDepth": max(self.depths, default=0)}
+
+
+class PipelineRunner:
+    '''
+    Esegue la campagna come pipeline produttore/consumatore: le fasi di PIPELINE_STAGES sono collegate da code limitate
+    e ogni fase ha i propri worker, quindi fasi diverse di scenari diversi si sovrappongono (le route dell'ora h+1 sono
+    campionate mentre l'ora h viene simulata). Quando una coda è piena la fase che la alimenta si ferma, così gli
+    scenari preparati in anticipo non superano mai queueSize per fase.
+    Ogni worker è un thread che esegue lo scenario su un pool di processi dedicato alla fase (la copia dell'edgedata
+    viene eseguita direttamente nel thread). Le fasi già completate con gli stessi input vengono saltate e registrate
+    nel manifest della campagna come nelle altre esecuzioni; se una fase fallisce lo scenario non prosegue.
+    Durante l'esecuzione la profondità delle code viene campionata ogni sampleInterval secondi: l'utilizzo dei worker
+    e le code indicano quale fase è il collo di bottiglia sulla macchina corrente.
+
+    Attributi della classe:
+    planner (Planner) --> planner con simulatore, generatore di route e manifest della campagna
+    workers (dict) --> fase --> numero di worker
+    queueSize (int) --> numero massimo di scenari in attesa in ogni coda
+    outputFolder (str) --> cartella del dataset Parquet della fase "export", None per non esportare
+    sampleInterval (float) --> secondi tra due campioni della profondità delle code
+    '''
+    planner: Planner
+    workers: dict
+    queueSize: int
+    outputFolder: str
+    sampleInterval: float
+
+    def __init__(self, planner: Planner, workers: dict = None, queueSize: int = 2, outputFolder: str = None,
+                 sampleInterval: float = 0.5):
+
+        if planner.chainHours:
+            raise ValueError("The pipeline simulates the hours independently, chainHours is not supported.")
+        unknown = set(workers or {}) - set(PIPELINE_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages {sorted(unknown)}, expected some of {PIPELINE_STAGES}.")
+        self.planner = planner
+        self.workers = {stage: max(1, (workers or {}).get(stage) or PIPELINE_WORKERS[stage])
+                        for stage in PIPELINE_STAGES}
+        self.queueSize = max(1, queueSize)
+        self.outputFolder = outputFolder
+        self.sampleInterval = sampleInterval
+        # il manifest della campagna non è thread-safe: letture e scritture passano da questo lock
+        self.lock = threading.Lock()
+
+    def getStages(self) -> tuple:
+        '''
+        :return: (tuple) fasi eseguite: senza outputFolder la fase "export" viene esclusa
+        '''
+        return PIPELINE_STAGES if self.outputFolder else PIPELINE_STAGES[:-1]
+
+    def run(self, baseFolder: str, totalVehicles: int, minLoops: int, congestioned: bool) -> dict:
+        '''
+        Esegue tutti gli scenari di baseFolder, stampando l'esito di ogni fase e il riepilogo delle metriche
+
+        :param baseFolder: Cartella con tutti i file 'edgedata_*.xml
+        :param totalVehicles: numero totale di veicoli per ogni ora
+        :param minLoops: Numero minimo di loops per veicolo
+        :param congestioned: flag per generare traffico congestionato
+        :return: (dict) con wallSeconds, scenarios (timestamp --> fase --> esito) e stages (fase --> metriche, vedi
+                 StageMetrics.toDict)
+        '''
+        self.parameters = {"totalVehicles": totalVehicles, "minLoops": minLoops, "congestioned": congestioned}
+        self.poolFile = self.planner.prepareRoutePool()
+        stages = self.getStages()
+        scenarios = self.planner.getScenarioList(baseFolder)
+
+        self.metrics = {stage: StageMetrics(self.workers[stage]) for stage in stages}
+        self.status = {timestamp: {} for _, timestamp in scenarios}
+        # coda in ingresso di ogni fase; la prima viene alimentata con gli scenari di baseFolder
+        self.queues = [queue.Queue(maxsize=self.queueSize) for _ in stages]
+        executors = {stage: ProcessPoolExecutor(max_workers=self.workers[stage])
+                     for stage in stages if stage != "edgedata"}
+        stopped = threading.Event()
+        monitor = threading.Thread(target=self.sampleQueues, args=(stages, stopped), daemon=True)
+
+        begin = time.perf_counter()
+        try:
+            threads = [[threading.Thread(target=self.stageWorker, args=(index, stage, executors.get(stage)))
+                        for _ in range(self.workers[stage])] for index, stage in enumerate(stages)]
+            for thread in sum(threads, []):
+                thread.start()
+            monitor.start()
+
+            for edgedata_path, timestamp in scenarios:
+                self.queues[0].put({"edgedata": edgedata_path, "timestamp": timestamp})
+            # ogni fase termina dopo la precedente: un None per worker chiude la fase
+            for index, stage in enumerate(stages):
+                for _ in threads[index]:
+                    self.queues[index].put(None)
+                for thread in threads[index]:
+                    thread.join()
+        finally:
+            stopped.set()
+            for executor in executors.values():
+                executor.shutdown()
+        wallSeconds = time.perf_counter() - begin
+
+        if self.outputFolder:
+            self.saveExportManifest()
+        report = {"wallSeconds": wallSeconds, "scenarios": self.status,
+                  "stages": {stage: metrics.toDict(wallSeconds) for stage, metrics in self.metrics.items()}}
+        self.printSummary(report)
+        return report
+
+    def sampleQueues(self, stages: tuple, stopped: threading.Event):
+        '''
+        Thread di monitoraggio: campiona la profondità della coda in ingresso di ogni fase finché stopped non è impostato
+        '''
+        while not stopped.wait(self.sampleInterval):
+            for index, stage in enumerate(stages):
+                self.metrics[stage].depths.append(self.queues[index].qsize())
+
+    def stageWorker(self, index: int, stage: str, executor: ProcessPoolExecutor):
+        '''
+        Worker di una fase: prende gli scenari dalla coda in ingresso, li elabora e li passa alla coda della fase
+        successiva, finché non riceve None
+        :param index: posizione della fase nella pipeline
+        :param stage: nome della fase
+        :param executor: pool di processi della fase, None per le fasi eseguite nel thread
+        '''
+        metrics = self.metrics[stage]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        while True:
+            waitBegin = time.perf_counter()
+            scenario = self.queues[index].get()
+            busyBegin = time.perf_counter()
+            if scenario is None:
+                break
+            try:
+                status = self.runStage(stage, scenario, executor)
+            except Exception as e:
+                status = FAILED
+                print(f"[pipeline] {scenario['timestamp']} {stage}: ERROR {e!r}")
+            busyEnd = time.perf_counter()
+            with self.lock:
+                metrics.counts[status] += 1
+                metrics.waitSeconds += busyBegin - waitBegin
+                metrics.busySeconds += busyEnd - busyBegin
+                self.status[scenario["timestamp"]][stage] = status
+            if status == FAILED or outbox is None:
+                continue
+            outbox.put(scenario)
+            with self.lock:
+                metrics.blockedSeconds += time.perf_counter() - busyEnd
+
+    def runStage(self, stage: str, scenario: dict, executor: ProcessPoolExecutor) -> str:
+        '''
+        Esegue una fase di uno scenario, se non è già stata completata con gli stessi input, e la registra nel manifest
+        della campagna
+        :param stage: una tra PIPELINE_STAGES
+        :param scenario: dizionario con edgedata e timestamp, completato dalle fasi con scenarioFolder
+        :param executor: pool di processi della fase
+        :return: (str) DONE oppure "skipped"
+        '''
+        planner, campaign, timestamp = self.planner, self.planner.campaign, scenario["timestamp"]
+        if stage == "edgedata":
+            with self.lock:
+                done = campaign.isDone(timestamp, stage, {"edgedata": campaign.fileHash(scenario["edgedata"])})
+                scenario["scenarioFolder"] = planner.prepareScenario(scenario["edgedata"], timestamp)
+            return "skipped" if done else DONE
+
+        scenarioFolder = scenario["scenarioFolder"]
+        with self.lock:
+            if stage == "sampledRoutes":
+                inputs = getRouteInputs(campaign, scenario["edgedata"], self.poolFile, self.parameters["totalVehicles"],
+                                        self.parameters["minLoops"], self.parameters["congestioned"],
+                                        planner.scenarioGenerator.routeEngine)
+            elif stage == "simulation":
+                inputs = getSimulationInputs(campaign, scenarioFolder, planner.simulator.configurationPath,
+                                             planner.getSimulationSettings())
+            else:
+                inputs = exportUtils.scenarioSignature(scenarioFolder)
+            if campaign.isDone(timestamp, stage, inputs):
+                return "skipped"
+
+        if stage == "sampledRoutes":
+            function, outputs = sampleScenarioRoutes, [os.path.join(scenarioFolder, "generatedRoutes.rou.xml")]
+            task = {"edgedata": scenario["edgedata"], "scenarioFolder": scenarioFolder,
+                    "routeEngine": planner.scenarioGenerator.routeEngine,
+                    "poolSize": planner.scenarioGenerator.poolSize, **self.parameters}
+        elif stage == "simulation":
+            function, outputs = simulateScenario, None
+            task = {"scenarioFolder": scenarioFolder, "timestamp": timestamp,
+                    "configurationPath": planner.simulator.configurationPath,
+                    "steppingPolicy": planner.simulator.steppingPolicy,
+                    "stepInterval": planner.simulator.stepInterval, "outputProfile": planner.simulator.outputProfile,
+                    "simulationModel": planner.simulator.simulationModel, "adaptiveTLS": planner.simulator.adaptiveTLS,
+                    "collectionMode": planner.simulator.collectionMode, "tlsCooldown": planner.simulator.tlsCooldown,
+                    "detectorSamplingInterval": planner.simulator.detectorSamplingInterval,
+                    "backend": planner.simulator.backend, "batchEngine": planner.simulator.batchEngine}
+        else:
+            function = exportPipelineScenario
+            outputs = [os.path.join(self.outputFolder, table, exportUtils.scenarioPartition(timestamp))
+                       for table in exportUtils.EXPORT_TABLES]
+            task = {"scenario": timestamp, "scenarioFolder": scenarioFolder, "outputFolder": self.outputFolder,
+                    "batchSize": 100000, "signature": inputs}
+
+        try:
+            seconds = executor.submit(function, task).result()
+        except Exception as e:
+            with self.lock:
+                campaign.record(timestamp, stage, FAILED, inputs, (), 0.0, repr(e))
+            raise
+        with self.lock:
+            campaign.record(timestamp, stage, DONE, inputs,
+                            outputFiles(scenarioFolder).values() if outputs is None else outputs, seconds)
+        print(f"[pipeline] {timestamp} {stage}: completato in {seconds:.1f}s")
+        return DONE
+
+    def saveExportManifest(self):
+        '''
+        Aggiorna il manifest del dataset Parquet con gli scenari esportati dalla pipeline, così exportScenarioCollection
+        non li riesporta
+        '''
+        manifest = exportUtils.loadManifest(self.outputFolder)
+        for timestamp, status in self.status.items():
+            if status.get("export") == DONE:
+                record = self.planner.campaign.getRecord(timestamp, "export")
+                manifest[timestamp] = record["inputs"]
+        exportUtils.saveManifest(self.outputFolder, manifest)
+
+    def printSummary(self, report: dict):
+        '''
+        Stampa il riepilogo della pipeline: per ogni fase esiti, utilizzo dei worker, attese e profondità delle code,
+        e la fase con l'utilizzo più alto (il collo di bottiglia)
+        :param report: risultato di run
+        '''
+        stages = report["stages"]
+        print("\n Riepilogo pipeline")
+        print(f"Tempo totale: {report['wallSeconds']:.1f}s")
+        for stage, metrics in stages.items():
+            print(f"{stage:>14}: {metrics['workers']} worker, {metrics[DONE]} eseguiti, {metrics['skipped']} saltati, "
+                  f"{metrics[FAILED]} falliti | utilizzo {metrics['utilization']:.0%}, "
+                  f"attesa input {metrics['waitSeconds']:.1f}s, bloccati {metrics['blockedSeconds']:.1f}s | "
+                  f"coda media {metrics['meanQueueDepth']:.1f}, max {metrics['maxQueueDepth']}")
+        if stages:
+            bottleneck = max(stages, key=lambda stage: stages[stage]["utilization"])
+            print(f"Collo di bottiglia: {bottleneck} (utilizzo {stages[bottleneck]['utilization']:.0%})")
@@ -0,0 +1,172 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from libraries.classes.CampaignManifest import CampaignManifest, DONE, FAILED
+
+# fase del manifest della campagna in cui vengono registrati i nodi della pipeline
+PIPELINE_STAGE = "preprocessing"
+
+
+def runNode(function, arguments: dict) -> float:
+    '''
+    Worker della pipeline: esegue la funzione di un nodo in un processo separato
+    :return: (float) durata in secondi
+    '''
+    begin = time.perf_counter()
+    function(**arguments)
+    return time.perf_counter() - begin
+
+
+class PipelineNode:
+    '''
+    Nodo della pipeline di preprocessing: una funzione con i suoi argomenti, i file che legge e i file (o cartelle)
+    che scrive.
+
+    Attributi della classe:
+    name (str) --> nome del nodo, usato come chiave nel manifest della campagna
+    function (callable) --> funzione di modulo eseguita dal nodo (es. preprocessingUtils.linkEdgeID)
+    arguments (dict) --> argomenti della funzione, parte degli input del nodo insieme agli hash dei file letti
+    inputs (tuple) --> file letti dal nodo
+    outputs (tuple) --> file o cartelle scritte dal nodo
+    '''
+
+    def __init__(self, name: str, function, arguments: dict, inputs=(), outputs=()):
+
+        self.name = name
+        self.function = function
+        self.arguments = arguments
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+    def getInputs(self, campaign: CampaignManifest) -> dict:
+        '''
+        :return: (dict) hash del contenuto dei file letti e argomenti della funzione
+        '''
+        inputs = {path: campaign.fileHash(path) for path in self.inputs}
+        inputs["arguments"] = self.arguments
+        return inputs
+
+
+class PreprocessingPipeline:
+    '''
+    Pipeline di preprocessing espressa come DAG: un nodo dipende da un altro se legge uno dei file che l'altro scrive.
+    Gli input di ogni nodo sono gli hash del contenuto dei file letti più gli argomenti: un nodo viene rieseguito solo
+    se cambiano i suoi input o se i suoi output sono stati modificati o cancellati. Se un nodo rieseguito produce gli
+    stessi file, i nodi a valle restano aggiornati. I nodi senza dipendenze tra loro vengono eseguiti in parallelo su
+    un pool di processi.
+
+    Attributi della classe:
+    nodes (dict) --> nome --> PipelineNode, nell'ordine di inserimento
+    campaign (CampaignManifest) --> manifest in cui vengono registrati i nodi eseguiti
+    '''
+
+    def __init__(self, campaign: CampaignManifest = None):
+        '''
+        :param campaign: manifest della campagna, se None i nodi vengono registrati solo in memoria e sempre eseguiti
+        '''
+        self.nodes = {}
+        self.campaign = campaign if campaign is not None else CampaignManifest()
+
+    def addNode(self, name: str, function, arguments: dict, inputs=(), outputs=()) -> PipelineNode:
+        '''
+        Aggiunge un nodo alla pipeline (vedi PipelineNode)
+        :return: (PipelineNode) il nodo aggiunto
+        '''
+        if name in self.nodes:
+            raise ValueError(f"Duplicate pipeline node '{name}'.")
+        node = PipelineNode(name, function, arguments, inputs, outputs)
+        self.nodes[name] = node
+        return node
+
+    def getDependencies(self) -> dict:
+        '''
+        :return: (dict) nome del nodo --> insieme dei nomi dei nodi che scrivono i file che legge
+        '''
+        producers = {}
+        for node in self.nodes.values():
+            for path in node.outputs:
+                path = os.path.abspath(path)
+                if path in producers:
+                    raise ValueError(f"'{path}' is written by both '{producers[path]}' and '{node.name}'.")
+                producers[path] = node.name
+        dependencies = {name: set() for name in self.nodes}
+        for node in self.nodes.values():
+            for path in node.inputs:
+                producer = producers.get(os.path.abspath(path))
+                if producer == node.name:
+                    raise ValueError(f"Node '{node.name}' reads and writes '{path}'.")
+                if producer:
+                    dependencies[node.name].add(producer)
+        self.checkCycles(dependencies)
+        return dependencies
+
+    @staticmethod
+    def checkCycles(dependencies: dict):
+        '''
+        :param dependencies: vedi getDependencies
+        :raise ValueError: se le dipendenze contengono un ciclo
+        '''
+        remaining = {name: set(required) for name, required in dependencies.items()}
+        while remaining:
+            ready = [name for name, required in remaining.items() if not required]
+            if not ready:
+                raise ValueError(f"The pipeline has a dependency cycle between {sorted(remaining)}.")
+            for name in ready:
+                del remaining[name]
+            for required in remaining.values():
+                required.difference_update(ready)
+
+    def run(self, workers: int = os.cpu_count()) -> dict:
+        '''
+        Esegue i nodi non aggiornati rispettando le dipendenze. Un nodo viene valutato solo quando tutti i nodi da cui
+        dipende sono terminati, perché i suoi input sono gli output appena scritti. Se un nodo fallisce, i nodi a valle
+        non vengono eseguiti.
+
+        :param workers: numero massimo di nodi eseguiti contemporaneamente
+        :return: (dict) nome del nodo --> "skipped", "done", "failed" oppure "blocked"
+        '''
+        dependencies = self.getDependencies()
+        status = {}
+        running = {}
+        nodeInputs = {}
+        begin = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=max(1, workers or 1)) as executor:
+            while len(status) < len(self.nodes):
+                for name, node in self.nodes.items():
+                    if name in status or name in nodeInputs or any(
+                            dependency not in status for dependency in dependencies[name]):
+                        continue
+                    if any(status[dependency] in (FAILED, "blocked") for dependency in dependencies[name]):
+                        status[name] = "blocked"
+                        print(f"[pipeline] {name}: non eseguito, dipende da un nodo fallito")
+                        continue
+                    inputs = node.getInputs(self.campaign)
+                    if self.campaign.isDone(name, PIPELINE_STAGE, inputs):
+                        status[name] = "skipped"
+                        print(f"[pipeline] {name}: aggiornato, saltato")
+                        continue
+                    print(f"[pipeline] {name}: in esecuzione")
+                    nodeInputs[name] = inputs
+                    running[executor.submit(runNode, node.function, node.arguments)] = name
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        seconds = future.result()
+                    except Exception as e:
+                        status[name] = FAILED
+                        self.campaign.record(name, PIPELINE_STAGE, FAILED, nodeInputs.pop(name), (), 0.0, repr(e))
+                        print(f"[pipeline] {name}: ERROR {e!r}")
+                        continue
+                    status[name] = DONE
+                    self.campaign.record(name, PIPELINE_STAGE, DONE, nodeInputs.pop(name), self.nodes[name].outputs,
+                                         seconds)
+                    print(f"[pipeline] {name}: completato in {seconds:.1f}s")
+
+        counts = {value: list(status.values()).count(value) for value in ("skipped", DONE, FAILED, "blocked")}
+        print(f"[pipeline] {counts} in {time.perf_counter() - begin:.1f}s")
+        return status
@@ -2,16 +2,145 @@
 from statistics import mean
 #from libraries.constants import *
 import os
+import subprocess
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
 import traci
 from typing import Optional
+from libraries.classes.DetectorMonitor import DetectorMonitor, isValid
+from libraries.classes.TrafficLightIndex import TrafficLightIndex
 
 #from build.lib.traci import inductionloop
 #from output.generateITetrisNetworkMetrics import interval
 #from purgatory.binary2plain import elements
 
+# variabili dei veicoli richieste in un'unica subscription (stesso ordine delle colonne dell'array delle metriche)
+VEHICLE_SUBSCRIPTION_VARIABLES = (
+    traci.constants.VAR_SPEED,
+    traci.constants.VAR_TIMELOSS,
+    traci.constants.VAR_DISTANCE,
+    traci.constants.VAR_DEPART_DELAY,
+    traci.constants.VAR_ACCUMULATED_WAITING_TIME,
+)
+
+# modalità di raccolta delle metriche dei veicoli ad ogni step
+COLLECTION_MODES = ("polling", "subscription")
+
+# politiche di avanzamento della simulazione (vedi Simulator.setSteppingPolicy)
+STEPPING_POLICIES = ("step", "interval", "batch")
+# esecuzione batch senza TraCI: processo sumo separato oppure libsumo nel processo corrente
+BATCH_ENGINES = ("sumo", "libsumo")
+# backend delle simulazioni controllate da Python: "auto" usa libsumo senza GUI (se installato) e traci con la GUI
+BACKENDS = ("auto", "traci", "libsumo")
+
+# file, nella cartella dello scenario, con le letture degli inductionLoop (vedi Simulator.writeScenarioDetectors)
+DETECTOR_OUTPUT_FILE = "e1_output.xml"
+# profili degli output di scenario, applicati da riga di comando senza modificare run.sumocfg
+# (vedi Simulator.setOutputProfile per il significato delle chiavi).
+# tripinfos non viene compresso: SUMO lo scrive un veicolo alla volta e il .gz risulta più grande dell'xml
+COMPRESSED_OUTPUTS = ("fcd", "vehroute", "summary", "queue", "detector")
+OUTPUT_PROFILES = {
+    "full": {},
+    "compressed": {"compress": COMPRESSED_OUTPUTS},
+    "light": {"compress": COMPRESSED_OUTPUTS, "fcdPeriod": 5, "fcdAttributes": ["x", "y", "speed", "lane"],
+              "fcdSkipEmpty": True},
+    "detectors": {"compress": COMPRESSED_OUTPUTS, "fcdEdges": "detectors", "fcdSkipEmpty": True},
+    "sample": {"compress": COMPRESSED_OUTPUTS, "fcdVehicleProbability": 0.1, "fcdSkipEmpty": True},
+    "nofcd": {"compress": COMPRESSED_OUTPUTS, "fcd": False},
+}
+# file, nella cartella dello scenario, con gli edge a cui limitare l'FCD
+FCD_EDGES_FILE = "fcd_edges.txt"
+
+# profili del modello di simulazione, applicati da riga di comando senza modificare run.sumocfg: opzione di SUMO -->
+# valore. "meso" corrisponde al blocco <mesoscopic> commentato in run.sumocfg senza meso-lane-queue: insieme a
+# meso-junction-control manda in crash SUMO 1.28 su diverse ore di questa rete
+SIMULATION_MODELS = {
+    "micro": {},
+    "meso": {"mesosim": True, "meso-junction-control": True, "meso-overtaking": True},
+}
+
+# file, nella cartella dello scenario, con le route spostate nella finestra temporale dello scenario quando le ore
+# vengono concatenate (vedi Simulator.setTimeWindow)
+CHAINED_ROUTES_FILE = "chainedRoutes.rou.xml"
+# file, nella cartella dello scenario, con lo stato della simulazione alla fine dell'ora, caricato dall'ora successiva
+STATE_FILE = "state.xml"
+
+# file, nella cartella dello scenario, con i campioni raccolti dal DetectorMonitor
+DETECTOR_SAMPLES_FILE = "detector_samples.csv"
+
+# controllo adattivo dei TLS: soglia di veicoli sulla spira e programma attivato quando viene superata
+ADAPTIVE_VEHICLE_THRESHOLD = 10
+ADAPTIVE_TLS_PROGRAM = "utopia"
+
 
 class Simulator:
-    def __init__(self, configurationPath: str, logFile: str):
+    def __init__(self, configurationPath: str, logFile: str, collectionMode: str = "polling",
+                 label: str = "default", port: Optional[int] = None,
+                 detectorSamplingInterval: Optional[float] = None, tlsCooldown: float = 300,
+                 steppingPolicy: str = "step", stepInterval: float = 60, batchEngine: str = "sumo",
+                 backend: str = "auto", outputProfile="full", reuseSession: bool = False,
+                 simulationModel="micro", adaptiveTLS: bool = False):
+        '''
+        :param configurationPath: cartella con run.sumocfg e i file statici della rete
+        :param logFile: file di log (trace di TraCI) usato di default
+        :param collectionMode: "polling" interroga ogni veicolo con una chiamata TraCI per metrica,
+                               "subscription" sottoscrive i veicoli alla partenza e legge tutte le metriche
+                               con una sola getAllSubscriptionResults() per step
+        :param label: etichetta della connessione TraCI, permette di avere più istanze di SUMO nello stesso processo
+        :param port: porta TraCI da usare. Se None viene scelta una porta libera
+        :param detectorSamplingInterval: secondi simulati tra due campioni delle spire (vedi DetectorMonitor).
+                                         Se None le spire vengono campionate una volta per periodo di aggregazione
+        :param tlsCooldown: secondi simulati minimi tra due cambi di programma dello stesso TLS
+        :param steppingPolicy: politica di avanzamento della simulazione (vedi setSteppingPolicy)
+        :param stepInterval: secondi simulati tra due raccolte di metriche con la politica "interval"
+        :param batchEngine: "sumo" esegue le simulazioni batch in un processo separato, "libsumo" nel processo
+                            corrente (una simulazione alla volta per processo)
+        :param backend: "traci" (SUMO in un processo separato, comandi via socket), "libsumo" (SUMO nel processo
+                        corrente, stessa API senza socket) oppure "auto" (libsumo senza GUI, traci con la GUI).
+                        Con libsumo si può avere una sola simulazione per processo e label/port vengono ignorati
+        :param outputProfile: nome di un profilo di OUTPUT_PROFILES oppure dizionario (vedi setOutputProfile)
+        :param reuseSession: se True SUMO resta aperto alla fine di ogni simulazione e la start successiva ricarica lo
+                             stesso processo con il nuovo scenario (traci.load), evitando avvio del processo e
+                             connessione. Gli output di uno scenario vengono chiusi da SUMO solo al caricamento dello
+                             scenario successivo o con end(), che va chiamata dopo l'ultima simulazione
+        :param simulationModel: nome di un profilo di SIMULATION_MODELS oppure dizionario (vedi setSimulationModel)
+        :param adaptiveTLS: se True il controllo adattivo dei TLS (vedi checkSubscription) usa tutte le spire
+                            sottoscritte dal DetectorMonitor. Se False, come in origine, solo le spire scelte con
+                            subscriveToInductionLoop
+        '''
+        self.setOutputProfile(outputProfile)
+        self.setSimulationModel(simulationModel)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}.")
+        self.backend = backend
+        self.activeBackend = None
+        self.activeBinary = None
+        self.reuseSession = reuseSession
+        # secondi impiegati dall'ultima start per avviare (o ricaricare) SUMO, fino alla simulazione pronta
+        self.startupSeconds = None
+        self.timeWindow = {}
+        if batchEngine not in BATCH_ENGINES:
+            raise ValueError(f"Unknown batch engine '{batchEngine}', expected one of {BATCH_ENGINES}.")
+        self.batchEngine = batchEngine
+        if collectionMode not in COLLECTION_MODES:
+            raise ValueError(f"Unknown collection mode '{collectionMode}', expected one of {COLLECTION_MODES}.")
+        self.collectionMode = collectionMode
+        self.setSteppingPolicy(steppingPolicy, stepInterval)
+        self.subscribedVehicles = set()
+        self.label = label
+        self.port = port
+        self.connection = None
+        self.simulationPath = None
+        self.inductionLoopSummary = None
+        self.tlsIndex = None
+        self.tlsCooldown = tlsCooldown
+        self.tlsPrograms = {}
+        self.tlsSwitchTimes = {}
+        self.adaptiveTLS = adaptiveTLS
+        self.adaptiveDetectors = set()
+        self.occupancyWarnings = {}
         self.configurationPath = configurationPath
         self.routePath = configurationPath
         staticpath = os.path.abspath(self.configurationPath)
@@ -23,9 +152,113 @@ class Simulator:
         self.logFile = logFile
         self.vehicleSummary = {}
         self.listener = ValueListener()
+        self.detectorSamplingInterval = detectorSamplingInterval
+        self.detectorMonitor = DetectorMonitor.fromConfiguration(self.configurationPath, detectorSamplingInterval)
         #traci.addStepListener(self.listener)
 
-    def start(self, activeGui: bool = False, logFilePath: Optional[str] = None):
+    def setSteppingPolicy(self, steppingPolicy: str, stepInterval: float = 60):
+        '''
+        Sceglie come resume() fa avanzare la simulazione:
+        "step" --> uno step alla volta, con raccolta delle metriche e controllo dei TLS ad ogni step
+        "interval" --> salti di stepInterval secondi con una sola simulationStep(t); metriche, spire e controllo dei
+                       TLS vengono aggiornati solo alla fine di ogni salto
+        "batch" --> nessuna connessione TraCI: SUMO viene eseguito fino alla fine e produce solo i file di output
+                    (niente metriche in Python, campioni delle spire né controllo adattivo dei TLS)
+
+        :param steppingPolicy: una tra STEPPING_POLICIES
+        :param stepInterval: secondi simulati di ogni salto con la politica "interval"
+        '''
+        if steppingPolicy not in STEPPING_POLICIES:
+            raise ValueError(f"Unknown stepping policy '{steppingPolicy}', expected one of {STEPPING_POLICIES}.")
+        if stepInterval <= 0:
+            raise ValueError("The step interval must be positive.")
+        self.steppingPolicy = steppingPolicy
+        self.stepInterval = stepInterval
+
+    def setOutputProfile(self, outputProfile="full"):
+        '''
+        Sceglie il profilo degli output scritti nella cartella dello scenario (usato quando start riceve simulationPath).
+        Chiavi del profilo, tutte opzionali:
+        compress (bool | list) --> scrive compressi (.xml.gz) tutti gli output o solo quelli elencati
+                                   (fcd, tripinfos, vehroute, summary, queue, detector)
+        fcd (bool) --> False disattiva l'output FCD
+        fcdPeriod (float) --> secondi tra due registrazioni FCD
+        fcdAttributes (list) --> attributi dei veicoli scritti nell'FCD
+        fcdEdges (list | str) --> edge a cui limitare l'FCD, "detectors" per gli edge con una spira
+        fcdVehicleProbability (float) --> frazione dei veicoli registrati nell'FCD
+        fcdSkipEmpty (bool) --> non scrive i timestep senza veicoli
+
+        :param outputProfile: nome di un profilo di OUTPUT_PROFILES oppure dizionario con le chiavi sopra
+        '''
+        if isinstance(outputProfile, str):
+            if outputProfile not in OUTPUT_PROFILES:
+                raise ValueError(f"Unknown output profile '{outputProfile}', expected one of {list(OUTPUT_PROFILES)}.")
+            outputProfile = OUTPUT_PROFILES[outputProfile]
+        self.outputProfile = dict(outputProfile)
+
+    def setSimulationModel(self, simulationModel="micro"):
+        '''
+        Sceglie il modello di simulazione degli scenari (usato quando start riceve simulationPath): "micro" simula ogni
+        veicolo sulla propria corsia, "meso" usa il modello mesoscopico di SUMO (code per tratto di edge), molto più
+        veloce ma con spire, tempi di viaggio e FCD approssimati.
+
+        :param simulationModel: nome di un profilo di SIMULATION_MODELS oppure dizionario opzione di SUMO --> valore
+        '''
+        if isinstance(simulationModel, str):
+            if simulationModel not in SIMULATION_MODELS:
+                raise ValueError(f"Unknown simulation model '{simulationModel}', "
+                                 f"expected one of {list(SIMULATION_MODELS)}.")
+            simulationModel = SIMULATION_MODELS[simulationModel]
+        self.simulationModel = dict(simulationModel)
+
+    def isMesoscopic(self) -> bool:
+        '''
+        :return: (bool) True se il modello di simulazione scelto è quello mesoscopico
+        '''
+        return str(self.simulationModel.get("mesosim", False)).lower() == "true"
+
+    def getSimulationModelArguments(self) -> list:
+        '''
+        :return: (list) opzioni di SUMO del modello di simulazione scelto con setSimulationModel
+        '''
+        arguments = []
+        for option, value in self.simulationModel.items():
+            arguments += [f"--{option}", str(value).lower() if isinstance(value, bool) else str(value)]
+        return arguments
+
+    def setTimeWindow(self, begin: Optional[float] = None, end: Optional[float] = None,
+                      loadState: Optional[str] = None, saveState: Optional[str] = None):
+        '''
+        Imposta la finestra temporale delle prossime simulazioni, per concatenare ore consecutive invece di far partire
+        ogni ora da rete vuota e svuotarla alla fine. Usata solo quando start riceve simulationPath.
+        Senza argomenti ripristina il comportamento di default (partenza al secondo 0, fino all'uscita dell'ultimo
+        veicolo).
+
+        :param begin: secondo di inizio della simulazione (es. 3600 * ora): le partenze dello scenario vengono spostate
+                      di begin secondi (vedi writeChainedRoutes)
+        :param end: secondo a cui la simulazione si ferma anche se ci sono ancora veicoli, None per eseguirla fino
+                    all'uscita dell'ultimo veicolo
+        :param loadState: file di stato da cui ripartire, con i veicoli ancora in rete alla fine dell'ora precedente
+        :param saveState: file in cui salvare lo stato al secondo end, prima di eseguirne lo step (quindi l'ora
+                          successiva riparte esattamente da lì). Viene salvato da Python, non con --save-state.times:
+                          SUMO salverebbe lo stato solo eseguendo anche lo step end, che finirebbe negli output di
+                          entrambe le ore. Per questo con la politica "batch" serve batchEngine "libsumo"
+        '''
+        if saveState and end is None:
+            raise ValueError("The state can only be saved at the end of a time window.")
+        self.timeWindow = {"begin": begin, "end": end, "loadState": loadState, "saveState": saveState}
+
+    def getOutputFile(self, name: str) -> str:
+        '''
+        :param name: nome dell'output (fcd, tripinfos, vehroute, summary, queue, detector)
+        :return: (str) nome del file dell'output, con estensione .xml.gz se il profilo lo comprime
+        '''
+        compress = self.outputProfile.get("compress", False)
+        compressed = compress is True or (not isinstance(compress, bool) and name in compress)
+        fileName = DETECTOR_OUTPUT_FILE if name == "detector" else name + ".xml"
+        return fileName + ".gz" if compressed else fileName
+
+    def start(self, activeGui: bool = False, logFilePath: Optional[str] = None, simulationPath: Optional[str] = None):
 
         '''
         Avvia una simulazione in SUMO, scegliendo se visualizzare o meno la GUI.
@@ -35,31 +268,323 @@ class Simulator:
         :param activeGui: If True, starts the simulation with the SUMO GUI (sumo-gui).
                           If False, starts the simulation without the GUI (sumo). Default is False.
         :param logFilePath:Optional path to a log file. If specified, the log file is used for the SUMO trace.
+        :param simulationPath: Optional scenario folder. If specified, route file and outputs are passed to SUMO on the
+                               command line instead of reading SIMULATIONPATH from os.environ (see changeRoutePath)
         :return:
         '''
 
-        if traci.isLoaded():
+        #Construct the command for starting SUMO or SUMO-GUI
+        sumo_command = "sumo-gui" if activeGui else "sumo"
+        backend = self.getBackend(activeGui)
+        connected = self.isConnected()
+        reuse = (self.reuseSession and connected and self.steppingPolicy != "batch"
+                 and (self.activeBackend, self.activeBinary) == (backend, sumo_command))
+        if connected and not reuse:
             print("Warning: A previous simulation was loaded. It will be overwritten.")
-            traci.close(wait=True)
+            self.closeConnection()
 
         print("start() is being called.")  # Debug: stampa quando SUMO viene avviato
-        #Construct the command for starting SUMO or SUMO-GUI
-        sumo_command = "sumo-gui" if activeGui else "sumo"
         command = [sumo_command, "-c", os.path.join(self.configurationPath, "run.sumocfg")]
+        if simulationPath:
+            command += self.getScenarioArguments(simulationPath)
+        self.simulationPath = os.path.abspath(simulationPath) if simulationPath else self.routePath
 
         #set the log file path if specified
         self.logFile=logFilePath if logFilePath else self.logFile
 
-        #start the simulation with the specified command and log file
-        traci.start(command, traceFile=self.logFile)
-        print("Note: Each simulation step is equivalent to " + str(traci.simulation.getDeltaT()) + " seconds.")
+        if self.steppingPolicy == "batch":
+            if not activeGui:
+                return self.runBatch(command)
+            print("Warning: the batch policy cannot be used with the GUI, the simulation is run step by step.")
 
-        traci.addStepListener(self.listener)
+        #start the simulation with the specified command and log file
+        begin = time.perf_counter()
+        if reuse:
+            # stesso processo di SUMO: il nuovo scenario viene caricato senza riavviarlo (gli output dello scenario
+            # precedente vengono chiusi)
+            self.connection.load(command[1:])
+        else:
+            self.openConnection(command, backend)
+            self.activeBinary = sumo_command
+            self.connection.addStepListener(self.listener)
+        self.startupSeconds = time.perf_counter() - begin
+        print("Note: Each simulation step is equivalent to " + str(self.connection.simulation.getDeltaT()) + " seconds.")
+
+        self.subscribedVehicles = set()
+        if self.collectionMode == "subscription" and simulationPath and self.timeWindow.get("loadState"):
+            # i veicoli ripristinati dallo stato dell'ora precedente non compaiono in getDepartedIDList
+            self.subscribeNewVehicles()
+        # il modello di simulazione viene applicato solo agli scenari (vedi getScenarioArguments)
+        self.detectorMonitor.start(self.connection, mesoscopic=bool(simulationPath) and self.isMesoscopic())
+        self.buildTLSIndex()
         #resume the simulation
         self.resume()
 
         #self.end()
 
+    def getBatchCommand(self, simulationPath: str) -> list:
+        '''
+        :param simulationPath: cartella dello scenario
+        :return: (list) comando di SUMO (senza GUI) con i percorsi dello scenario da riga di comando
+        '''
+        return ["sumo", "-c", os.path.join(self.configurationPath, "run.sumocfg")] + \
+            self.getScenarioArguments(simulationPath)
+
+    def runBatch(self, command: list) -> dict:
+        '''
+        Esegue SUMO in batch, senza TraCI, fino alla fine della simulazione, con il motore scelto in batchEngine.
+        Tutti gli output (fcd, queue, tripinfos, vehroute, summary, spire) vengono scritti da SUMO sui file configurati.
+
+        :param command: comando di SUMO con configurazione e opzioni dello scenario
+        :return: (dict) codice di uscita, stderr di SUMO e durata in secondi
+        '''
+        if self.batchEngine == "libsumo":
+            result = self.runLibsumo(command, self.timeWindow.get("end"), self.timeWindow.get("saveState"))
+        elif self.timeWindow.get("end") is not None:
+            raise ValueError("A time window with an end requires the libsumo batch engine or a TraCI stepping policy.")
+        else:
+            begin = time.perf_counter()
+            process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            result = {"exitCode": process.returncode, "stderr": process.stderr,
+                      "seconds": time.perf_counter() - begin}
+        if result["exitCode"] != 0:
+            print(f"Error: SUMO exited with code {result['exitCode']}\n{result['stderr']}")
+        return result
+
+    @staticmethod
+    def runLibsumo(command: list, end: Optional[float] = None, saveState: Optional[str] = None) -> dict:
+        '''
+        Esegue la simulazione con libsumo nel processo corrente, senza socket, fino a quando non ci sono più veicoli.
+        I messaggi di errore di SUMO vengono raccolti con --error-log e restituiti come stderr.
+
+        :param command: comando di SUMO con configurazione e opzioni dello scenario
+        :param end: se specificato, la simulazione si ferma al secondo end (vedi setTimeWindow)
+        :param saveState: file in cui salvare lo stato al secondo end
+        :return: (dict) codice di uscita (0 oppure 1), stderr di SUMO e durata in secondi
+        '''
+        import libsumo
+        begin = time.perf_counter()
+        exitCode = 0
+        message = ""
+        with tempfile.TemporaryDirectory() as workDir:
+            errorLog = os.path.join(workDir, "errors.log")
+            try:
+                libsumo.start(command + ["--error-log", errorLog])
+                while libsumo.simulation.getMinExpectedNumber() > 0 and (
+                        end is None or libsumo.simulation.getTime() < end):
+                    libsumo.simulationStep()
+                if saveState and libsumo.simulation.getTime() >= end:
+                    libsumo.simulation.saveState(os.path.abspath(saveState))
+            except Exception as e:
+                exitCode = 1
+                message = str(e)
+            finally:
+                try:
+                    libsumo.close()
+                except Exception:
+                    pass
+            stderr = open(errorLog, encoding="UTF-8").read() if os.path.exists(errorLog) else ""
+        return {"exitCode": exitCode, "stderr": stderr + message, "seconds": time.perf_counter() - begin}
+
+    def buildTLSIndex(self):
+        '''
+        Costruisce l'indice lane --> TLS e detector --> TLS della simulazione appena avviata e azzera lo stato del
+        controllo adattivo (programmi impostati, istanti dell'ultimo cambio, spire scelte e segnalazioni)
+        '''
+        detectorFile = os.path.join(self.configurationPath, "detectors.add.xml") if self.isMesoscopic() else None
+        self.tlsIndex = TrafficLightIndex.fromConnection(self.connection, self.detectorMonitor.detectorIDs,
+                                                         detectorFile)
+        self.tlsPrograms = {}
+        self.tlsSwitchTimes = {}
+        self.adaptiveDetectors = set()
+        self.occupancyWarnings = {}
+
+    def getBackend(self, activeGui: bool = False) -> str:
+        '''
+        Sceglie il backend della prossima simulazione: la GUI richiede sempre traci, "auto" usa libsumo se installato
+        :param activeGui: True se la simulazione viene avviata con sumo-gui
+        :return: (str) "traci" oppure "libsumo"
+        '''
+        if activeGui:
+            if self.backend == "libsumo":
+                print("Warning: libsumo does not support the GUI, traci is used instead.")
+            return "traci"
+        if self.backend == "auto":
+            try:
+                import libsumo
+                return "libsumo"
+            except ImportError:
+                return "traci"
+        return self.backend
+
+    def openConnection(self, command: list, backend: str):
+        '''
+        Avvia SUMO con il backend indicato. Con libsumo la "connessione" è il modulo stesso, che espone gli stessi
+        domini (vehicle, inductionloop, trafficlight, simulation, ...) di una connessione traci
+        :param command: comando di SUMO
+        :param backend: "traci" oppure "libsumo"
+        '''
+        if backend == "libsumo":
+            import libsumo
+            libsumo.start(command, traceFile=self.logFile)
+            self.connection = libsumo
+        else:
+            traci.start(command, port=self.port, label=self.label, traceFile=self.logFile)
+            self.connection = traci.getConnection(self.label)
+        self.activeBackend = backend
+
+    def closeConnection(self):
+        '''
+        Chiude la simulazione in corso, qualunque sia il backend
+        '''
+        if self.activeBackend == "libsumo":
+            return self.connection.close()
+        return self.connection.close(wait=True)
+
+    def isConnected(self):
+        '''
+        :return: (bool) True se esiste una connessione TraCI attiva con l'etichetta del simulatore
+                 (con libsumo: se c'è una simulazione caricata nel processo)
+        '''
+        if self.activeBackend == "libsumo":
+            try:
+                self.connection.simulation.getTime()
+                return True
+            except Exception:
+                return False
+        try:
+            traci.getConnection(self.label)
+            return True
+        except traci.TraCIException:
+            return False
+
+    def getScenarioArguments(self, simulationPath: str) -> list:
+        '''
+        Costruisce le opzioni da riga di comando che sostituiscono i percorsi ${SIMULATIONPATH} di run.sumocfg,
+        così ogni istanza di SUMO legge e scrive nella propria cartella di scenario senza usare os.environ.
+        Anche le letture delle spire vengono scritte nella cartella dello scenario (vedi writeScenarioDetectors).
+        Gli output seguono il profilo scelto con setOutputProfile, il modello quello scelto con setSimulationModel.
+
+        :param simulationPath: cartella dello scenario
+        :return: (list) opzioni da aggiungere al comando di SUMO
+        '''
+        simulationPath = os.path.abspath(simulationPath)
+        staticPath = os.path.abspath(self.configurationPath)
+        additionalFiles = [
+            self.writeScenarioDetectors(simulationPath),
+            os.path.join(staticPath, "joined_vtypes.add.xml"),
+            os.path.join(staticPath, "joined_tls.add.xml"),
+        ]
+        writeFCD = self.outputProfile.get("fcd", True)
+        begin = self.timeWindow.get("begin")
+        routeFile = self.writeChainedRoutes(simulationPath, begin) if begin else \
+            os.path.join(simulationPath, "generatedRoutes.rou.xml")
+        return [
+            "--route-files", routeFile,
+            "--additional-files", ",".join(additionalFiles),
+            "--tripinfo-output", os.path.join(simulationPath, self.getOutputFile("tripinfos")),
+            # run.sumocfg definisce sempre fcd-output: senza FCD lo si manda su os.devnull
+            "--fcd-output", os.path.join(simulationPath, self.getOutputFile("fcd")) if writeFCD else os.devnull,
+            "--vehroute-output", os.path.join(simulationPath, self.getOutputFile("vehroute")),
+            "--summary-output", os.path.join(simulationPath, self.getOutputFile("summary")),
+            "--queue-output", os.path.join(simulationPath, self.getOutputFile("queue")),
+            "--log", os.path.join(simulationPath, "sumo_run.log"),
+        ] + (self.getFCDArguments(simulationPath) if writeFCD else []) + self.getTimeWindowArguments() + \
+            self.getSimulationModelArguments()
+
+    def getTimeWindowArguments(self) -> list:
+        '''
+        Traduce l'inizio della finestra temporale (vedi setTimeWindow) nelle opzioni di SUMO. La fine della finestra e
+        il salvataggio dello stato sono gestiti da resume (o da runLibsumo in batch)
+        :return: (list) opzioni da aggiungere al comando di SUMO
+        '''
+        window = self.timeWindow
+        # lo stato di un'esecuzione precedente non deve sopravvivere se questa non arriva alla fine della finestra
+        if window.get("saveState") and os.path.exists(window["saveState"]):
+            os.remove(window["saveState"])
+        arguments = []
+        if window.get("begin") is not None:
+            arguments += ["--begin", str(window["begin"])]
+        if window.get("loadState"):
+            arguments += ["--load-state", os.path.abspath(window["loadState"])]
+        return arguments
+
+    @staticmethod
+    def writeChainedRoutes(simulationPath: str, begin: float) -> str:
+        '''
+        Copia generatedRoutes.rou.xml spostando le partenze di begin secondi e aggiungendo il prefisso '<begin>_' agli
+        ID di veicoli e route, così non si sovrappongono a quelli delle ore precedenti caricati dal file di stato.
+
+        :param simulationPath: cartella dello scenario
+        :param begin: secondo di inizio della finestra dello scenario
+        :return: (str) path del file delle route dello scenario
+        '''
+        tree = ET.parse(os.path.join(simulationPath, "generatedRoutes.rou.xml"))
+        prefix = f"{begin:g}_"
+        routeIDs = {route.get("id") for route in tree.getroot().findall("route")}
+        for element in tree.getroot():
+            if element.tag in ("vehicle", "trip", "flow", "route") and element.get("id") is not None:
+                element.set("id", prefix + element.get("id"))
+            if element.get("route") in routeIDs:
+                element.set("route", prefix + element.get("route"))
+            for attribute in ("depart", "begin", "end"):
+                value = element.get(attribute)
+                if value is not None and element.tag != "route":
+                    try:
+                        element.set(attribute, f"{float(value) + begin:.2f}")
+                    except ValueError:
+                        # partenze come "triggered" o "now" restano invariate
+                        pass
+        routeFile = os.path.join(simulationPath, CHAINED_ROUTES_FILE)
+        tree.write(routeFile, encoding="UTF-8", xml_declaration=True)
+        return routeFile
+
+    def getFCDArguments(self, simulationPath: str) -> list:
+        '''
+        Traduce le chiavi fcd* del profilo di output nelle opzioni di SUMO
+        :param simulationPath: cartella dello scenario (assoluta)
+        :return: (list) opzioni da aggiungere al comando di SUMO
+        '''
+        profile = self.outputProfile
+        arguments = []
+        if profile.get("fcdPeriod"):
+            arguments += ["--device.fcd.period", str(profile["fcdPeriod"])]
+        if profile.get("fcdAttributes"):
+            arguments += ["--fcd-output.attributes", ",".join(profile["fcdAttributes"])]
+        if profile.get("fcdVehicleProbability") is not None:
+            arguments += ["--device.fcd.probability", str(profile["fcdVehicleProbability"])]
+        if profile.get("fcdSkipEmpty"):
+            arguments += ["--fcd-output.skip-empty"]
+        if profile.get("fcdEdges"):
+            edges = profile["fcdEdges"]
+            if edges == "detectors":
+                lanes = [inductionLoop.get("lane") for inductionLoop in
+                         ET.parse(os.path.join(self.configurationPath, "detectors.add.xml")).getroot()
+                         .iter("inductionLoop")]
+                edges = sorted({lane.rsplit("_", 1)[0] for lane in lanes})
+            edgesFile = os.path.join(simulationPath, FCD_EDGES_FILE)
+            with open(edgesFile, "w", encoding="UTF-8") as selection:
+                selection.writelines(f"edge:{edge}\n" for edge in edges)
+            arguments += ["--fcd-output.filter-edges.input-file", edgesFile]
+        return arguments
+
+    def writeScenarioDetectors(self, simulationPath: str) -> str:
+        '''
+        Copia detectors.add.xml nella cartella dello scenario facendo scrivere gli inductionLoop su 'e1_output.xml' (.gz se il profilo di output lo comprime).
+        SUMO risolve il percorso relativo rispetto al file additional, quindi ogni scenario ha le proprie letture
+        delle spire invece di sovrascrivere configs/e1_real_output.xml.
+
+        :param simulationPath: cartella dello scenario
+        :return: (str) path del file additional dello scenario
+        '''
+        tree = ET.parse(os.path.join(self.configurationPath, "detectors.add.xml"))
+        outputFile = self.getOutputFile("detector")
+        for inductionLoop in tree.getroot().iter("inductionLoop"):
+            inductionLoop.set("file", outputFile)
+        detectorFile = os.path.join(simulationPath, "detectors.add.xml")
+        tree.write(detectorFile, encoding="UTF-8", xml_declaration=True)
+        return detectorFile
+
     def startBasic(self, activeGui=False):
         '''
         Avvia una simulazione in SUMOENV con una configurazione di base.
@@ -68,11 +593,15 @@ class Simulator:
                          If False, starts the simulation without the GUI (sumo). Default is False.
         :return:
         '''
-        if traci.simulation.isLoaded():
+        if self.isConnected():
             print("Warning: A previous simulation was loaded. It will be overwritten.")
         sumo_command = "sumo-gui" if activeGui else "sumo"
         command = [sumo_command, "-c", os.path.join(self.configurationPath, "run.sumocfg")]
-        traci.start(command, traceFile=self.logFile)
+        self.openConnection(command, self.getBackend(activeGui))
+        self.simulationPath = self.routePath
+        self.subscribedVehicles = set()
+        self.detectorMonitor.start(self.connection)
+        self.buildTLSIndex()
         self.resume()
 
     def startCongesioned(self, activeGui=False):
@@ -83,11 +612,15 @@ class Simulator:
                                  If False, starts the simulation without the GUI (sumo). Default is False.
         :return:
         '''
-        if traci.simulation.isLoaded():
+        if self.isConnected():
             print("Warning: A previous simulation was loaded. It will be overwritten.")
         sumo_command = ["sumo-gui" if activeGui else "sumo", "-c", self.configurationPath + "/congestionated/run.sumocfg"]
         command = [sumo_command, "-c", os.path.join(self.configurationPath, "run.sumocfg")]
-        traci.start(command, traceFile=self.logFile)
+        self.openConnection(command, self.getBackend(activeGui))
+        self.simulationPath = self.routePath
+        self.subscribedVehicles = set()
+        self.detectorMonitor.start(self.connection)
+        self.buildTLSIndex()
         self.resume()
 
     def step(self, quantity=1):
@@ -99,29 +632,71 @@ class Simulator:
         '''
         step=0
         while step < quantity and self.getRemainingVehicles() > 0:
-            traci.simulationStep()
-            self.vehiclesSummary = self.getVehiclesSummary()
-            self.checkSubscription()
-            self.getInductionLoopSummary()
+            self.connection.simulationStep()
+            if self.collectionMode == "subscription":
+                self.subscribeDepartedVehicles()
+            self.collectMetrics()
             #print(self.getRemainingVehicles())
             step += 1
 
+    def advance(self, seconds: float):
+        '''
+        Fa avanzare la simulazione di più secondi con una sola chiamata simulationStep(t) e raccoglie le metriche solo
+        alla fine del salto. Il salto si ferma al prossimo istante di campionamento delle spire, così i campioni del
+        DetectorMonitor restano allineati.
+        :param seconds: secondi simulati da avanzare
+        '''
+        current = self.connection.simulation.getTime()
+        target = min(current + seconds, self.detectorMonitor.nextSample)
+        if self.timeWindow.get("end") is not None:
+            target = min(target, self.timeWindow["end"])
+        self.connection.simulationStep(target)
+        if self.collectionMode == "subscription":
+            # getDepartedIDList riporta solo le partenze dell'ultimo step del salto
+            self.subscribeNewVehicles()
+        self.collectMetrics()
+
+    def collectMetrics(self):
+        '''
+        Aggiorna il summary dei veicoli, il controllo adattivo dei TLS e i campioni delle spire al tempo corrente
+        '''
+        if self.collectionMode == "subscription":
+            self.vehiclesSummary = self.getVehiclesSummarySubscribed()
+        else:
+            self.vehiclesSummary = self.getVehiclesSummary()
+        current = self.connection.simulation.getTime()
+        self.checkSubscription(current)
+        if self.detectorMonitor.update(current):
+            self.inductionLoopSummary = self.detectorMonitor.getSummary()
+
     def oneHourStep(self):
         '''
         Fa avanzare la simulazione di 3600 secondi (1 ora), ma solo se ci sono ancora veicoli nella simulazione.
         :return:
         '''
-        if traci.simulation.getMinExpectedNumber() > 0:
-            traci.simulationStep(3600)
+        if self.connection.simulation.getMinExpectedNumber() > 0:
+            self.connection.simulationStep(3600)
 
     def resume(self):
         '''
-        Resumes the simulation, esegue fino a quando non ci sono più veicoli nella simulazione
+        Resumes the simulation, esegue fino a quando non ci sono più veicoli nella simulazione (o fino alla fine della
+        finestra temporale, vedi setTimeWindow)
         :return:
         '''
-        while traci.simulation.getMinExpectedNumber() > 0:
-            self.step()
-        self.end()
+        end = self.timeWindow.get("end")
+        while self.connection.simulation.getMinExpectedNumber() > 0 and (
+                end is None or self.connection.simulation.getTime() < end):
+            if self.steppingPolicy == "interval":
+                self.advance(self.stepInterval)
+            else:
+                self.step()
+        # se la rete si è svuotata prima della fine della finestra non c'è niente da passare all'ora successiva
+        if self.timeWindow.get("saveState") and self.connection.simulation.getTime() >= end:
+            self.connection.simulation.saveState(os.path.abspath(self.timeWindow["saveState"]))
+        self.exportDetectorSamples()
+        # con reuseSession SUMO resta aperto per lo scenario successivo (vedi start)
+        if not self.reuseSession:
+            self.end()
 
     def end(self):
         '''
@@ -131,16 +706,23 @@ class Simulator:
         :return:
         '''
         print("Closing SUMO...")
-        return traci.close(wait=True)
+        return self.closeConnection()
         print("SUMO closed successfully.")
 
+    def exportDetectorSamples(self):
+        '''
+        Salva i campioni delle spire raccolti dal DetectorMonitor nella cartella dello scenario
+        '''
+        if self.simulationPath:
+            self.detectorMonitor.export(os.path.join(self.simulationPath, DETECTOR_SAMPLES_FILE))
+
     def getRemainingVehicles(self):
         '''
         Conta i veicoli ancora presenti nella simulazione.
         Include sia i veicoli attualmente sulla strada sia quelli in attesa di entrare nella simulazione.
         :return:
         '''
-        return traci.simulation.getMinExpectedNumber()
+        return self.connection.simulation.getMinExpectedNumber()
 
     def changeRoutePath(self, routePath: str):
         '''
@@ -174,22 +756,75 @@ class Simulator:
         '''
 
         vehicleSummary = {}
-        vehiclesList = traci.vehicle.getIDList()
+        vehiclesList = self.connection.vehicle.getIDList()
         summary = []
         if len(vehiclesList) > 1:
             for vehicleID in vehiclesList:
                 element = {}
-                element["speed"] = traci.vehicle.getSpeed(vehicleID)
-                element["timeLost"] = traci.vehicle.getTimeLoss(vehicleID)
-                element["distance"] = traci.vehicle.getDistance(vehicleID)
-                element["departDelay"] = traci.vehicle.getDepartDelay(vehicleID)
-                element["totalWaitingTime"] = traci.vehicle.getAccumulatedWaitingTime(vehicleID)
+                element["speed"] = self.connection.vehicle.getSpeed(vehicleID)
+                element["timeLost"] = self.connection.vehicle.getTimeLoss(vehicleID)
+                element["distance"] = self.connection.vehicle.getDistance(vehicleID)
+                element["departDelay"] = self.connection.vehicle.getDepartDelay(vehicleID)
+                element["totalWaitingTime"] = self.connection.vehicle.getAccumulatedWaitingTime(vehicleID)
                 summary.append(element)
 
             vehicleSummary["averageSpeed"] = mean(element["speed"] for element in summary)
             vehicleSummary["averangeTimeLost"] = mean(element["timeLost"] for element in summary)
             vehicleSummary["averageDepartDelay"] = mean(element["departDelay"] for element in summary)
-            vehicleSummary["averageWaitingTime"] = mean(element["totalWaitingTime"] for element in summary)
+            # con il modello mesoscopico il tempo di attesa accumulato non è disponibile (valore non valido)
+            waitingTimes = [element["totalWaitingTime"] for element in summary if isValid(element["totalWaitingTime"])]
+            vehicleSummary["averageWaitingTime"] = mean(waitingTimes) if waitingTimes else float("nan")
+            self.vehicleSummary = vehicleSummary
+            return vehicleSummary
+        print("There are no vehicles ")
+        return None
+
+    def subscribeDepartedVehicles(self):
+        '''
+        Sottoscrive i veicoli partiti nell'ultimo step alle variabili usate dal summary.
+        Le subscription vengono rimosse automaticamente da SUMO quando il veicolo arriva a destinazione.
+        :return: (int) numero di veicoli sottoscritti
+        '''
+        departed = self.connection.simulation.getDepartedIDList()
+        for vehicleID in departed:
+            self.connection.vehicle.subscribe(vehicleID, VEHICLE_SUBSCRIPTION_VARIABLES)
+        return len(departed)
+
+    def subscribeNewVehicles(self):
+        '''
+        Sottoscrive i veicoli in simulazione non ancora sottoscritti (usata quando si avanza di più step alla volta)
+        :return: (int) numero di veicoli sottoscritti
+        '''
+        vehicles = set(self.connection.vehicle.getIDList())
+        new = vehicles - self.subscribedVehicles
+        for vehicleID in new:
+            self.connection.vehicle.subscribe(vehicleID, VEHICLE_SUBSCRIPTION_VARIABLES)
+        self.subscribedVehicles = vehicles
+        return len(new)
+
+    def getVehiclesSummarySubscribed(self):
+        '''
+        Variante di getVehiclesSummary basata sulle subscription: legge i valori di tutti i veicoli con una sola
+        chiamata TraCI e calcola le medie su un array NumPy (una riga per veicolo, una colonna per variabile).
+        Restituisce le stesse chiavi di getVehiclesSummary.
+
+        :return: A dictionary containing average statistics for the vehicles in the simulation.
+        '''
+        results = self.connection.vehicle.getAllSubscriptionResults()
+        if len(results) > 1:
+            values = np.array([[result[variable] for variable in VEHICLE_SUBSCRIPTION_VARIABLES]
+                               for result in results.values()], dtype=np.float64)
+            # valori non validi (es. tempo di attesa accumulato con il modello mesoscopico) esclusi dalle medie
+            valid = values > traci.constants.INVALID_DOUBLE_VALUE
+            with np.errstate(invalid="ignore"):
+                means = np.where(valid, values, 0).sum(axis=0) / valid.sum(axis=0)
+            speed, timeLost, distance, departDelay, waitingTime = means
+
+            vehicleSummary = {}
+            vehicleSummary["averageSpeed"] = float(speed)
+            vehicleSummary["averangeTimeLost"] = float(timeLost)
+            vehicleSummary["averageDepartDelay"] = float(departDelay)
+            vehicleSummary["averageWaitingTime"] = float(waitingTime)
             self.vehicleSummary = vehicleSummary
             return vehicleSummary
         print("There are no vehicles ")
@@ -198,9 +833,11 @@ class Simulator:
     ### INDUCTION LOOP FUNCTIONS
     def getDetectorList(self):
         '''
-        :return: list of all induction loop detectors in the simulation.
+        :return: list of all induction loop detectors in the simulation (letta una sola volta dal DetectorMonitor).
         '''
-        return traci.inductionloop.getIDList()
+        if self.detectorMonitor.detectorIDs:
+            return self.detectorMonitor.detectorIDs
+        return self.connection.inductionloop.getIDList()
 
     def getAverageOccupationTime(self):
         '''
@@ -211,7 +848,7 @@ class Simulator:
         detectorList= self.getDetectorList()
         intervalOccupancies = []
         for detector in detectorList:
-            intervalOccupancies.append(traci.inductionloop.getIntervalOccupancy(detector))
+            intervalOccupancies.append(self.connection.inductionloop.getIntervalOccupancy(detector))
         average = mean(intervalOccupancies)
         return average
 
@@ -229,9 +866,9 @@ class Simulator:
         inductionLoopSummary = {}
         for detector in detectorList:
             element = {}
-            element["intervalOccupancy"] = traci.inductionloop.getIntervalOccupancy(detector)
-            element["meanSpeed"] = traci.inductionloop.getIntervalMeanSpeed(detector)
-            element["vehicleNumber"] = traci.inductionloop.getIntervalVehicleNumber(detector)
+            element["intervalOccupancy"] = self.connection.inductionloop.getIntervalOccupancy(detector)
+            element["meanSpeed"] = self.connection.inductionloop.getIntervalMeanSpeed(detector)
+            element["vehicleNumber"] = self.connection.inductionloop.getIntervalVehicleNumber(detector)
             detectors.append(element)
         inductionLoopSummary["averageIntervalOccupancy"] = mean(element["intervalOccupancy"] for element in detectors)
         inductionLoopSummary["averageMeanSpeed"] = mean(element["meanSpeed"] for element in detectors)
@@ -246,11 +883,13 @@ class Simulator:
         :return: (list) degli id dei TLS collegati al detector
         '''
 
-        lane = traci.inductionloop.getLaneID(detectorID)
+        if self.tlsIndex is not None:
+            return list(self.tlsIndex.getLinkedTLS(detectorID))
+        lane = self.connection.inductionloop.getLaneID(detectorID)
         tls = self.getTLSList()
         found = []
         for element in tls:
-            lanes = traci.trafficlight.getControlledLanes(element)
+            lanes = self.connection.trafficlight.getControlledLanes(element)
             if lane in lanes:
                 found.append(element)
 
@@ -264,33 +903,69 @@ class Simulator:
         :return:
         '''
 
+        self.adaptiveDetectors.add(inductionLoopID)
+        if inductionLoopID in self.detectorMonitor.detectorIDs:
+            # già sottoscritta dal DetectorMonitor con tutte le variabili: una nuova subscribe la sostituirebbe
+            return
         if value == "intervalOccupancy":
-            traci.inductionloop.subscribe(inductionLoopID, [traci.constants.VAR_INTERVAL_OCCUPANCY])
+            self.connection.inductionloop.subscribe(inductionLoopID, [traci.constants.VAR_INTERVAL_OCCUPANCY])
         elif value == "meanSpeed":
-            traci.inductionloop.subscribe(inductionLoopID, [traci.constants.VAR_INTERVAL_SPEED])
+            self.connection.inductionloop.subscribe(inductionLoopID, [traci.constants.VAR_INTERVAL_SPEED])
         elif value == "vehicleNumber":
-            traci.inductionloop.subscribe(inductionLoopID, [traci.constants.VAR_INTERVAL_NUMBER])
+            self.connection.inductionloop.subscribe(inductionLoopID, [traci.constants.VAR_INTERVAL_NUMBER])
 
 
 
-    def checkSubscription(self):
+    def checkSubscription(self, time: Optional[float] = None):
         '''
-        recupera i risultati delle subscription per tutti gli induction loop e modifica i programmi dei TLS se
-        il numero di veicoli o l'occupazione eccede una data soglia
+        recupera i risultati delle subscription degli induction loop usati dal controllo adattivo (tutti con
+        adaptiveTLS, altrimenti quelli scelti con subscriveToInductionLoop) e modifica i programmi dei TLS se
+        il numero di veicoli eccede una data soglia, segnalando le spire con occupazione eccessiva.
+        Un TLS già passato al programma adattivo non viene reimpostato, e tra due cambi dello stesso TLS (o due
+        segnalazioni della stessa spira) devono passare almeno tlsCooldown secondi (vedi canSwitchTLS)
 
+        :param time: tempo simulato corrente, se None viene letto da SUMO
         '''
-
-        results = traci.inductionloop.getAllSubscriptionResults()
+        if not self.adaptiveTLS and not self.adaptiveDetectors:
+            return
+        results = self.connection.inductionloop.getAllSubscriptionResults()
         for key, value in results.items():
-            #controlla se ci sono tanti veicoli
-            if traci.constants.VAR_INTERVAL_NUMBER in value and value[traci.constants.VAR_INTERVAL_NUMBER] > 10:
-                tlsIDs = self.findLinkedTLS(key)
-                for element in tlsIDs:
-                    self.setTLSProgram(element, "utopia")
-                    print("New program is " + str(traci.trafficlight.getProgram(element)))
-            if traci.constants.VAR_INTERVAL_OCCUPANCY in value and value[traci.constants.VAR_INTERVAL_OCCUPANCY] > 30:
-                print("value in excess")
-
+            if not self.adaptiveTLS and key not in self.adaptiveDetectors:
+                continue
+            #controlla se ci sono tanti veicoli (i valori non validi, es. con il modello mesoscopico, vengono ignorati)
+            vehicleNumber = value.get(traci.constants.VAR_INTERVAL_NUMBER)
+            if isValid(vehicleNumber) and vehicleNumber > ADAPTIVE_VEHICLE_THRESHOLD:
+                if time is None:
+                    time = self.connection.simulation.getTime()
+                for element in self.findLinkedTLS(key):
+                    if self.canSwitchTLS(element, ADAPTIVE_TLS_PROGRAM, time):
+                        self.setTLSProgram(element, ADAPTIVE_TLS_PROGRAM)
+                        self.tlsSwitchTimes[element] = time
+                        print("New program is " + str(self.connection.trafficlight.getProgram(element)))
+            occupancy = value.get(traci.constants.VAR_INTERVAL_OCCUPANCY)
+            if isValid(occupancy) and occupancy > 30:
+                if time is None:
+                    time = self.connection.simulation.getTime()
+                lastWarning = self.occupancyWarnings.get(key)
+                if lastWarning is None or time - lastWarning >= self.tlsCooldown:
+                    self.occupancyWarnings[key] = time
+                    print(f"value in excess: occupancy of induction loop {key} above 30%")
+
+
+    def canSwitchTLS(self, tlsID: str, programID: str, time: float) -> bool:
+        '''
+        Isteresi del controllo adattivo: il cambio è inutile se il TLS ha già il programma richiesto, ed è rimandato
+        se il TLS ha cambiato programma meno di tlsCooldown secondi fa
+
+        :param tlsID: ID del TLS
+        :param programID: programma da impostare
+        :param time: tempo simulato corrente
+        :return: (bool) True se il programma del TLS può essere cambiato
+        '''
+        if self.tlsPrograms.get(tlsID) == programID:
+            return False
+        lastSwitch = self.tlsSwitchTimes.get(tlsID)
+        return lastSwitch is None or time - lastSwitch >= self.tlsCooldown
 
     ### TLS FUNCTIONS
     def getTLSList(self):
@@ -299,13 +974,17 @@ class Simulator:
 
         :return: (list) if TLS IDs
         '''
-        return traci.trafficlight.getIDList()
+        if self.tlsIndex is not None:
+            return self.tlsIndex.tlsIDs
+        return self.connection.trafficlight.getIDList()
     def checkTLS(self, tlsID):
         '''
         controlla se l'ID del TLS in ingresso esiste nella simulazione
         :param tlsID:
         :return: (bool) --> true if exists, False otherwise
         '''
+        if self.tlsIndex is not None:
+            return self.tlsIndex.hasTLS(tlsID)
         tls = self.getTLSList()
         if tlsID in tls:
             return True
@@ -324,10 +1003,12 @@ class Simulator:
         if all:
             tls = self.getTLSList()
             for traffic_light in tls:
-                traci.trafficlight.setProgram(traffic_light,programID)
+                self.connection.trafficlight.setProgram(traffic_light,programID)
+                self.tlsPrograms[traffic_light] = programID
             print("The program of all traffic light is changed to" + str(programID))
         elif self.checkTLS(trafficLightID):
-            traci.trafficlight.setProgram(trafficLightID, programID)
+            self.connection.trafficlight.setProgram(trafficLightID, programID)
+            self.tlsPrograms[trafficLightID] = programID
             print("The program of the TLS " +str(trafficLightID) + " is changed to " + str(programID))
 
 
@@ -0,0 +1,360 @@
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from libraries.utils.networkUtils import defaultCacheDir, fileHash
+
+# colonne orarie del dataset delle spire, nell'ordine delle ore del giorno
+HOUR_COLUMNS = [f"{hour:02d}:00-{hour + 1:02d}:00" for hour in range(24)]
+# colonne testuali con pochi valori distinti, caricate come categorie
+CATEGORY_COLUMNS = ("codice_spira", "Nome via", "geopoint", "edge_id", "tipologia", "ordinanza", "stato", "direzione",
+                    "giorno settimana", "longitudine", "latitudine")
+# formati della colonna 'data': dd/mm/YYYY nei dataset del Comune, YYYY-mm-dd in quelli riordinati da reorderDataset
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+
+# versione dei tipi scritti nella copia Feather: cambia quando cambia readCSV, così le copie precedenti non vengono usate
+CACHE_VERSION = 2
+
+# dataset già caricati nel processo corrente, indicizzati per (path assoluto, dimensione, data di modifica)
+_datasets = {}
+
+
+def parseDate(date) -> pd.Timestamp:
+    '''
+    :param date: data come stringa 'dd/mm/YYYY' (formato usato da preprocessingSetup), datetime o Timestamp
+    :return: (pd.Timestamp)
+    '''
+    if isinstance(date, str):
+        return pd.Timestamp(datetime.strptime(date, DATE_FORMATS[0]))
+    return pd.Timestamp(date)
+
+
+class PercentStrippingReader:
+    '''
+    File di testo in sola lettura che rimuove il simbolo '%' mentre viene letto, così il parser CSV converte
+    direttamente le percentuali in numeri senza una copia intermedia del file
+    '''
+
+    def __init__(self, file):
+
+        self.file = file
+
+    def read(self, size: int = -1) -> str:
+        return self.file.read(size).replace('%', '')
+
+    def __iter__(self):
+        return (line.replace('%', '') for line in self.file)
+
+
+def readAccurateKeys(accuracyFile: str, acceptedPercentage: int, dateColumn: str = "data",
+                     sensorColumn: str = "codice_spira", chunksize: int = None) -> pd.DataFrame:
+    '''
+    Legge il file di accuratezza e restituisce le coppie (data, spira) accurate: quelle con accuratezza almeno
+    acceptedPercentage in tutte le colonne percentuali. Le percentuali vengono convertite tutte insieme dal parser CSV
+    (vedi PercentStrippingReader) e filtrate con il minimo per riga; un valore mancante rende la coppia non accurata.
+    :param accuracyFile: path del CSV di accuratezza (valori 'NN%')
+    :param acceptedPercentage: percentuale minima di accuratezza
+    :param dateColumn: nome della colonna della data
+    :param sensorColumn: nome della colonna con l'ID della spira
+    :param chunksize: se specificato, il file viene letto a blocchi di chunksize righe e restano in memoria solo le chiavi
+    :return: (pd.DataFrame) coppie uniche (dateColumn, sensorColumn) come stringhe, come nel file
+    '''
+    def accurateKeys(accuracy: pd.DataFrame) -> pd.DataFrame:
+        percentages = accuracy.drop(columns=[dateColumn, sensorColumn]).to_numpy(dtype=np.float32)
+        # minimo per riga: NaN se manca una percentuale, e il confronto con NaN è sempre falso
+        accurate = percentages.min(axis=1, initial=np.inf) >= acceptedPercentage
+        return accuracy.loc[accurate, [dateColumn, sensorColumn]]
+
+    with open(accuracyFile, encoding="UTF-8") as file:
+        accuracy = pd.read_csv(PercentStrippingReader(file), sep=';', dtype={dateColumn: str, sensorColumn: str},
+                               chunksize=chunksize)
+        if chunksize is None:
+            return accurateKeys(accuracy).drop_duplicates()
+        return pd.concat([accurateKeys(chunk) for chunk in accuracy], ignore_index=True).drop_duplicates()
+
+
+def getCountDtypes(counts: pd.DataFrame) -> dict:
+    '''
+    :param counts: conteggi orari letti come float
+    :return: (dict) colonna --> dtype: int16 o int32 se i conteggi della colonna sono tutti presenti, float32 se ne
+             mancano (come la conversione di default di pandas, che rende float solo le colonne con valori mancanti)
+    '''
+    missing = counts.isna().any()
+    maximum = counts.max()
+    return {column: "float32" if missing[column] else "int16" if maximum[column] <= np.iinfo(np.int16).max
+            else "int32" for column in counts.columns}
+
+
+def commonDtype(dtypes: list):
+    '''
+    :param dtypes: dtype di una colonna in blocchi diversi dello stesso file
+    :return: dtype della colonna nell'intero file (es. int64 e float64 --> float64, testo e numeri --> object)
+    '''
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+        return np.result_type(*dtypes)
+    return dtypes[0] if all(dtype == dtypes[0] for dtype in dtypes) else object
+
+
+def getDateFormats(dates: pd.Series) -> list:
+    '''
+    :param dates: colonna 'data' come testo
+    :return: (list) formati di DATE_FORMATS con cui tutte le date vengono convertite, nell'ordine di DATE_FORMATS
+    '''
+    return [dateFormat for dateFormat in DATE_FORMATS
+            if pd.to_datetime(dates, format=dateFormat, errors="coerce").notna().all()]
+
+
+def semiJoin(frame: pd.DataFrame, keys: pd.DataFrame, columns: list) -> np.ndarray:
+    '''
+    :param frame: righe da filtrare
+    :param keys: chiavi uniche da cercare, con le colonne indicate
+    :param columns: colonne della chiave
+    :return: (np.ndarray) maschera booleana delle righe di frame la cui chiave è presente in keys
+    '''
+    merged = frame[columns].merge(keys, on=columns, how="left", indicator=True)
+    return merged["_merge"].to_numpy() == "both"
+
+
+class TrafficDataset:
+    '''
+    Dataset delle spire caricato una sola volta, con tipi espliciti: date già convertite, conteggi orari interi a 16 o
+    32 bit, nomi delle strade, geopoint ed edge come categorie. I filtri usati dal preprocessing sono metodi che
+    restituiscono un nuovo TrafficDataset, senza rileggere né riconvertire il CSV.
+    Al primo caricamento viene salvata una copia Feather nella cartella '.cache' accanto al CSV, identificata
+    dall'hash del file: le esecuzioni successive (anche di altri processi) leggono la copia binaria.
+
+    Attributi della classe:
+    frame (pd.DataFrame) --> righe del dataset, nell'ordine del file
+    dateFormat (str) --> formato della colonna 'data' nel CSV, usato anche per riscriverlo
+    '''
+
+    def __init__(self, frame: pd.DataFrame, dateFormat: str = DATE_FORMATS[0]):
+
+        self.frame = frame
+        self.dateFormat = dateFormat
+        self._dateIndex = None
+        self._edgeIndex = None
+
+    @classmethod
+    def load(cls, csvFile: str, cacheDir: str = None):
+        '''
+        Restituisce il dataset del CSV, leggendolo solo al primo utilizzo nel processo e dalla copia Feather se
+        esiste già per lo stesso contenuto del file. Dimensione e data di modifica bastano a riconoscere il CSV già
+        caricato, l'hash del contenuto viene calcolato solo per trovare la copia Feather
+        :param csvFile: path del CSV (separatore ';')
+        :param cacheDir: cartella della cache, di default '.cache' accanto al CSV
+        :return: (TrafficDataset)
+        '''
+        stat = os.stat(csvFile)
+        key = (os.path.abspath(csvFile), stat.st_size, stat.st_mtime_ns)
+        if key not in _datasets:
+            csvHash = fileHash(csvFile)
+            cachePath = os.path.join(cacheDir or defaultCacheDir(csvFile), f"traffic_{csvHash}_v{CACHE_VERSION}.feather")
+            if os.path.exists(cachePath):
+                table = feather.read_table(cachePath)
+                frame = table.to_pandas()
+                dateFormat = table.schema.metadata.get(b"dateFormat", DATE_FORMATS[0].encode()).decode()
+            else:
+                frame, dateFormat = cls.readCSV(csvFile)
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                table = table.replace_schema_metadata({**table.schema.metadata, b"dateFormat": dateFormat.encode()})
+                cls.writeCache(table, cachePath)
+            _datasets[key] = cls(frame, dateFormat)
+        return _datasets[key]
+
+    @staticmethod
+    def writeCache(table: pa.Table, cachePath: str):
+        '''
+        Scrive la copia Feather in modo atomico: ogni processo scrive un proprio file temporaneo nella cartella della
+        cache e lo rinomina, così i nodi paralleli della pipeline non leggono mai una copia scritta a metà né si
+        contendono lo stesso file temporaneo. Se la scrittura fallisce ma un altro processo ha già salvato la copia,
+        il risultato è comunque valido.
+        :param table: tabella da salvare
+        :param cachePath: path della copia Feather
+        '''
+        os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+        descriptor, tmpPath = tempfile.mkstemp(dir=os.path.dirname(cachePath), suffix=".tmp")
+        os.close(descriptor)
+        try:
+            feather.write_feather(table, tmpPath)
+            os.replace(tmpPath, cachePath)
+        except OSError:
+            if not os.path.exists(cachePath):
+                raise
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    @staticmethod
+    def readCSV(csvFile: str) -> tuple:
+        '''
+        Legge il CSV con i tipi espliciti: categorie per le colonne testuali, interi per i conteggi orari (float32 per
+        le colonne con valori mancanti) e conversione della colonna 'data'
+        :param csvFile: path del CSV
+        :return: (tuple) DataFrame e formato della colonna 'data'
+        '''
+        columns = pd.read_csv(csvFile, sep=';', nrows=0).columns
+        dtypes = {column: "category" for column in CATEGORY_COLUMNS if column in columns}
+        dtypes["data"] = "string"
+        counts = [column for column in HOUR_COLUMNS if column in columns]
+        # i conteggi vengono letti come float e convertiti in interi solo se non ci sono valori mancanti
+        frame = pd.read_csv(csvFile, sep=';', dtype={**dtypes, **dict.fromkeys(counts, "float64")})
+        if counts:
+            frame = frame.astype(getCountDtypes(frame[counts]))
+
+        dateFormat = DATE_FORMATS[0]
+        if "data" in frame.columns:
+            dateFormat = getDateFormats(frame["data"])[:1]
+            if not dateFormat:
+                raise ValueError(f"Unknown date format in '{csvFile}', expected one of {DATE_FORMATS}.")
+            dateFormat = dateFormat[0]
+            frame["data"] = pd.to_datetime(frame["data"], format=dateFormat)
+        return frame, dateFormat
+
+    @classmethod
+    def iterCSV(cls, csvFile: str, chunksize: int):
+        '''
+        Legge il CSV a blocchi di chunksize righe con gli stessi tipi di readCSV (le colonne testuali come stringhe
+        invece che categorie), così i blocchi salvati con toCSV producono lo stesso file del dataset completo. I tipi che
+        dipendono da tutto il file (colonne dei conteggi intere o float32, tipi delle altre colonne, formato delle date)
+        vengono determinati con una prima lettura a blocchi; in memoria resta un solo blocco alla volta.
+        :param csvFile: path del CSV
+        :param chunksize: righe per blocco
+        :return: (generator) TrafficDataset di ogni blocco
+        '''
+        columns = pd.read_csv(csvFile, sep=';', nrows=0).columns
+        text = {column: str for column in CATEGORY_COLUMNS + ("data",) if column in columns}
+        counts = [column for column in HOUR_COLUMNS if column in columns]
+        missingCounts, otherDtypes, dateFormats = set(), {}, list(DATE_FORMATS)
+        for chunk in pd.read_csv(csvFile, sep=';', dtype={**text, **dict.fromkeys(counts, "float64")},
+                                 chunksize=chunksize):
+            missingCounts.update(chunk[counts].columns[chunk[counts].isna().any()])
+            for column in chunk.columns.difference(list(text) + counts):
+                otherDtypes.setdefault(column, []).append(chunk[column].dtype)
+            if "data" in chunk.columns:
+                dateFormats = [dateFormat for dateFormat in getDateFormats(chunk["data"]) if dateFormat in dateFormats]
+        if "data" in columns and not dateFormats:
+            raise ValueError(f"Unknown date format in '{csvFile}', expected one of {DATE_FORMATS}.")
+
+        # tipi dell'intero file: come se fosse stato letto in una volta sola
+        dtypes = {column: commonDtype(columnDtypes) for column, columnDtypes in otherDtypes.items()}
+        dtypes.update(text)
+        dtypes.update({column: "float32" if column in missingCounts else "int32" for column in counts})
+        dateFormat = dateFormats[0] if "data" in columns else DATE_FORMATS[0]
+        for chunk in pd.read_csv(csvFile, sep=';', dtype=dtypes, chunksize=chunksize):
+            if "data" in chunk.columns:
+                chunk["data"] = pd.to_datetime(chunk["data"], format=dateFormat)
+            yield cls(chunk, dateFormat)
+
+    def select(self, rows) -> "TrafficDataset":
+        '''
+        :param rows: maschera booleana o posizioni delle righe da tenere
+        :return: (TrafficDataset) con le sole righe indicate
+        '''
+        if isinstance(rows, (pd.Series, np.ndarray)) and rows.dtype == bool:
+            return TrafficDataset(self.frame[np.asarray(rows)], self.dateFormat)
+        return TrafficDataset(self.frame.iloc[rows], self.dateFormat)
+
+    @property
+    def dateIndex(self) -> dict:
+        '''
+        :return: (dict) data --> posizioni delle righe di quella data, calcolato alla prima richiesta
+        '''
+        if self._dateIndex is None:
+            self._dateIndex = self.frame.groupby("data", sort=False).indices
+        return self._dateIndex
+
+    @property
+    def edgeIndex(self) -> dict:
+        '''
+        :return: (dict) edge_id --> posizioni delle righe di quell'edge, calcolato alla prima richiesta
+        '''
+        if self._edgeIndex is None:
+            self._edgeIndex = self.frame.groupby("edge_id", sort=False, observed=True).indices
+        return self._edgeIndex
+
+    def getDate(self, date) -> "TrafficDataset":
+        '''
+        Filtro di dailyFilter: righe di una data, nell'ordine del file
+        :param date: data come stringa 'dd/mm/YYYY', datetime o Timestamp
+        :return: (TrafficDataset)
+        '''
+        return self.select(self.dateIndex.get(parseDate(date), np.empty(0, dtype=np.int64)))
+
+    def getEdge(self, edgeID: str) -> "TrafficDataset":
+        '''
+        :param edgeID: ID dell'edge SUMO
+        :return: (TrafficDataset) righe delle spire collegate all'edge
+        '''
+        return self.select(self.edgeIndex.get(edgeID, np.empty(0, dtype=np.int64)))
+
+    def between(self, startDate, endDate) -> "TrafficDataset":
+        '''
+        Filtro di filteringDataset e generateEdgeDataPerHour: righe con data compresa tra startDate e endDate (inclusi)
+        :return: (TrafficDataset)
+        '''
+        dates = self.frame["data"]
+        return self.select((dates >= parseDate(startDate)) & (dates <= parseDate(endDate)))
+
+    def sortedByDate(self) -> "TrafficDataset":
+        '''
+        Ordinamento di reorderDataset: righe in ordine cronologico, a parità di data nell'ordine del file
+        :return: (TrafficDataset)
+        '''
+        return TrafficDataset(self.frame.sort_values(by="data", kind="stable"), self.dateFormat)
+
+    def filterWithAccuracy(self, accuracyFile: str, acceptedPercentage: int, dateColumn: str = "data",
+                           sensorColumn: str = "codice_spira") -> "TrafficDataset":
+        '''
+        Filtro di filterWithAccuracy: righe i cui (data, spira) hanno accuratezza almeno acceptedPercentage in tutte
+        le colonne percentuali del file di accuratezza (vedi readAccurateKeys), con un unico semi-join sulla chiave
+        :param accuracyFile: path del CSV di accuratezza (valori 'NN%')
+        :param acceptedPercentage: percentuale minima di accuratezza
+        :return: (TrafficDataset)
+        '''
+        return self.selectKeys(readAccurateKeys(accuracyFile, acceptedPercentage, dateColumn, sensorColumn),
+                               dateColumn, sensorColumn)
+
+    def selectKeys(self, keys: pd.DataFrame, dateColumn: str = "data",
+                   sensorColumn: str = "codice_spira") -> "TrafficDataset":
+        '''
+        :param keys: coppie (data, spira) da tenere, come stringhe (vedi readAccurateKeys)
+        :return: (TrafficDataset) con le righe delle coppie indicate
+        '''
+        keys = keys.assign(**{dateColumn: pd.to_datetime(keys[dateColumn], format=self.dateFormat, errors="coerce")})
+        rows = self.frame[[dateColumn, sensorColumn]].astype({sensorColumn: str})
+        return self.select(semiJoin(rows, keys, [dateColumn, sensorColumn]))
+
+    def getEdgeCounts(self, date, timeSlot: str) -> pd.DataFrame:
+        '''
+        Conteggi usati da generateEdgeDataFile: veicoli per edge in una data e fascia oraria
+        :param date: data come stringa 'dd/mm/YYYY', datetime o Timestamp
+        :param timeSlot: fascia oraria 'hh:00-hh:00', anche di più ore (i conteggi orari vengono sommati)
+        :return: (pd.DataFrame) colonne edge_id e count, nell'ordine del file
+        '''
+        day = self.getDate(date).frame
+        first, last = int(timeSlot[:2]), int(timeSlot[6:8])
+        if last - first > 1:
+            count = day[[f"{hour:02d}:00-{(hour + 1) % 24:02d}:00" for hour in range(first, last)]].sum(axis=1)
+        else:
+            count = day[timeSlot]
+        return pd.DataFrame({"edge_id": day["edge_id"].astype(str), "count": count.astype("int64")})
+
+    def toCSV(self, outputFile: str, dateFormat: str = None, append: bool = False):
+        '''
+        Salva il dataset in CSV con separatore ';', riscrivendo le date nel formato del file di origine
+        :param outputFile: path del file da scrivere
+        :param dateFormat: formato delle date, se None quello del CSV di origine
+        :param append: se True le righe vengono aggiunte in fondo al file, senza intestazione (vedi iterCSV)
+        '''
+        os.makedirs(os.path.dirname(os.path.abspath(outputFile)), exist_ok=True)
+        self.frame.to_csv(outputFile, sep=';', index=False, date_format=dateFormat or self.dateFormat,
+                          mode='a' if append else 'w', header=not append)
+
+    def __len__(self):
+        return len(self.frame)
@@ -0,0 +1,81 @@
+import xml.etree.ElementTree as ET
+
+from libraries.utils.networkUtils import getNetwork
+
+
+class TrafficLightIndex:
+    '''
+    Indice statico lane --> TLS e detector --> TLS, costruito una sola volta per simulazione, così la ricerca dei
+    semafori collegati ad una spira non interroga più tutti i TLS ad ogni step.
+
+    Attributi della classe:
+    laneToTLS (dict) --> ID della lane: tupla degli ID dei TLS che la controllano
+    detectorToTLS (dict) --> ID della spira: tupla degli ID dei TLS collegati alla lane della spira
+    tlsIDs (tuple) --> ID di tutti i TLS
+    '''
+
+    def __init__(self, laneToTLS: dict, detectorLanes: dict, tlsIDs):
+
+        self.laneToTLS = {lane: tuple(sorted(tls)) for lane, tls in laneToTLS.items()}
+        self.detectorToTLS = {detectorID: self.laneToTLS.get(lane, ()) for detectorID, lane in detectorLanes.items()}
+        self.tlsIDs = tuple(tlsIDs)
+        self._tlsSet = set(self.tlsIDs)
+
+    @classmethod
+    def fromConnection(cls, connection, detectorIDs=None, detectorFile: str = None):
+        '''
+        Costruisce l'indice interrogando SUMO una volta sola (da chiamare dopo traci.start)
+        :param connection: connessione TraCI della simulazione
+        :param detectorIDs: ID delle spire, se None vengono letti con getIDList
+        :param detectorFile: file delle spire da cui leggere le lane invece di interrogare SUMO (necessario con il
+                             modello mesoscopico, in cui TraCI non espone la lane delle spire)
+        :return: (TrafficLightIndex)
+        '''
+        tlsIDs = connection.trafficlight.getIDList()
+        laneToTLS = {}
+        for tlsID in tlsIDs:
+            for lane in set(connection.trafficlight.getControlledLanes(tlsID)):
+                laneToTLS.setdefault(lane, set()).add(tlsID)
+        if detectorIDs is None:
+            detectorIDs = connection.inductionloop.getIDList()
+        if detectorFile:
+            lanes = {inductionLoop.get("id"): inductionLoop.get("lane")
+                     for inductionLoop in ET.parse(detectorFile).getroot().iter("inductionLoop")}
+            detectorLanes = {detectorID: lanes.get(detectorID) for detectorID in detectorIDs}
+        else:
+            detectorLanes = {detectorID: connection.inductionloop.getLaneID(detectorID) for detectorID in detectorIDs}
+        return cls(laneToTLS, detectorLanes, tlsIDs)
+
+    @classmethod
+    def fromFiles(cls, netFile: str, detectorFile: str):
+        '''
+        Costruisce l'indice senza avviare SUMO, dalle connessioni controllate dai semafori della rete e dalle lane
+        degli inductionLoop del file additional
+        :param netFile: path della rete SUMO (es. configs/joined_lanes.net.xml)
+        :param detectorFile: path del file delle spire (es. configs/detectors.add.xml)
+        :return: (TrafficLightIndex)
+        '''
+        net = getNetwork(netFile)
+        laneToTLS = {}
+        tlsIDs = []
+        for tls in net.getTrafficLights():
+            tlsIDs.append(tls.getID())
+            for inLane, _, _ in tls.getConnections():
+                laneToTLS.setdefault(inLane.getID(), set()).add(tls.getID())
+        detectorLanes = {inductionLoop.get("id"): inductionLoop.get("lane")
+                         for inductionLoop in ET.parse(detectorFile).getroot().iter("inductionLoop")}
+        return cls(laneToTLS, detectorLanes, sorted(tlsIDs))
+
+    def getLinkedTLS(self, detectorID: str) -> tuple:
+        '''
+        :param detectorID: ID della spira
+        :return: (tuple) ID dei TLS collegati alla spira
+        '''
+        return self.detectorToTLS.get(detectorID, ())
+
+    def hasTLS(self, tlsID: str) -> bool:
+        '''
+        :param tlsID: ID di un TLS
+        :return: (bool) True se il TLS esiste nella rete
+        '''
+        return tlsID in self._tlsSet
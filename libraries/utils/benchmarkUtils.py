@@ -0,0 +1,99 @@
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+import traci
+
+from libraries.classes.TrafficDataset import HOUR_COLUMNS
+
+# dataset reale delle spire da cui vengono generati i dataset sintetici (output di linkEdgeID)
+SOURCE_DATASET = "data/processed_traffic_flow.csv"
+
+
+def generateLoopData(outputDir: str, scale: int, seed: int = 0, sourceFile: str = SOURCE_DATASET,
+                     lowAccuracyShare: float = 0.02) -> dict:
+    '''
+    Genera i CSV sintetici delle spire replicando scale volte le righe del dataset reale: ogni copia ha codici spira
+    diversi (codice + " <copia>") ma stesse vie, geopoint ed edge, così il collegamento con data/road_names.csv e gli
+    edgedata restano validi e i conteggi per edge crescono con la scala.
+
+    :param outputDir: cartella in cui scrivere i file
+    :param scale: numero di copie delle righe di sourceFile (1 --> dimensione reale)
+    :param seed: seme delle percentuali di accuratezza casuali
+    :param sourceFile: dataset reale delle spire, con la colonna edge_id
+    :param lowAccuracyShare: probabilità che un'ora di una coppia (data, spira) abbia accuratezza sotto il 90%
+    :return: (dict) path dei file generati: "traffic" (dataset grezzo, senza edge_id, input di filterWithAccuracy e
+             linkEdgeID), "accuracy" (accuratezza per data, spira e ora) e "processed" (dataset con edge_id, input di
+             generateEdgeDataPerHour); "rows" numero di righe del dataset
+    '''
+    os.makedirs(outputDir, exist_ok=True)
+    base = pd.read_csv(sourceFile, sep=';')
+    copies = []
+    for copy in range(scale):
+        frame = base.copy()
+        frame["codice_spira"] = frame["codice_spira"] + f" {copy}"
+        copies.append(frame)
+    processed = pd.concat(copies, ignore_index=True)
+
+    rng = np.random.default_rng(seed)
+    accuracy = processed[["data", "codice_spira"]].drop_duplicates().reset_index(drop=True)
+    percentages = np.where(rng.random((len(accuracy), len(HOUR_COLUMNS))) < lowAccuracyShare, 85, 100)
+    for hour, column in enumerate(HOUR_COLUMNS):
+        accuracy[column] = pd.Series(percentages[:, hour]).astype(str) + "%"
+
+    files = {"traffic": os.path.join(outputDir, "traffic_flow.csv"),
+             "accuracy": os.path.join(outputDir, "accuracy_loops.csv"),
+             "processed": os.path.join(outputDir, "processed_traffic_flow.csv")}
+    processed.drop(columns=["edge_id"]).to_csv(files["traffic"], sep=';', index=False)
+    accuracy.to_csv(files["accuracy"], sep=';', index=False)
+    processed.to_csv(files["processed"], sep=';', index=False)
+    files["rows"] = len(processed)
+    return files
+
+
+def peakMegabytes() -> float:
+    '''
+    :return: (float) picco di memoria residente del processo in MB. Su Linux si legge VmHWM, perché ru_maxrss viene
+             conservato anche dopo exec e includerebbe il picco del processo che ha generato i dati
+    '''
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status", encoding="UTF-8") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1e3
+    import resource
+    # ru_maxrss è in byte su macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e6
+
+
+def timeCall(function, *args, repeat: int = 1, **kwargs) -> dict:
+    '''
+    Esegue più volte una funzione e ne misura la durata
+    :param function: funzione da misurare
+    :param repeat: numero di esecuzioni
+    :return: (dict) durata minima e mediana in secondi, secondi di ogni esecuzione e risultato dell'ultima
+    '''
+    runs = []
+    result = None
+    for _ in range(max(1, repeat)):
+        begin = time.perf_counter()
+        result = function(*args, **kwargs)
+        runs.append(time.perf_counter() - begin)
+    return {"seconds": min(runs), "median": float(np.median(runs)), "runs": runs, "result": result}
+
+
+def getEnvironment() -> dict:
+    '''
+    :return: (dict) commit corrente (None fuori da un repository git), versioni di Python e SUMO, piattaforma e CPU,
+             salvati con i risultati per confrontare esecuzioni su commit diversi
+    '''
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "sumo": getattr(traci, "__version__", None),
+            "platform": platform.platform(), "cpus": os.cpu_count(), "date": time.strftime("%Y-%m-%d %H:%M:%S")}
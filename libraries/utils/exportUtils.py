@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from libraries.classes.CampaignManifest import DONE, FAILED
+from libraries.utils.outputUtils import OUTPUT_SCHEMAS, iterOutputBatches, outputFiles
+
+# tabelle esportate --> tipo di output di SUMO da cui vengono lette
+EXPORT_TABLES = {"fcd": "fcd", "tripinfo": "tripinfo", "queue": "queue", "detector": "detector"}
+
+# colonne con gli ID di veicoli, lane, edge e tipi: poche stringhe distinte ripetute molte volte, quindi vengono
+# salvate con dictionary encoding
+DICTIONARY_COLUMNS = {"id", "lane", "edge", "type", "vType", "departLane", "arrivalLane"}
+
+# tabelle che hanno una colonna lane da cui ricavare l'edge
+EDGE_FROM_LANE = {"fcd", "queue"}
+
+MANIFEST_FILE = "_manifest.json"
+SCENARIO_PATTERN = re.compile(r"(\d{2})-(\d{2})-(\d{4})_(\d{2})-(\d{2})$")
+
+
+def arrowType(dtype, dictionary: bool):
+    '''
+    :param dtype: dtype NumPy di una colonna di OUTPUT_SCHEMAS
+    :param dictionary: se True le stringhe vengono codificate a dizionario
+    :return: (pa.DataType) tipo Arrow della colonna
+    '''
+    if dtype is object:
+        return pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def tableSchema(table: str) -> pa.Schema:
+    '''
+    :param table: nome della tabella (chiave di EXPORT_TABLES)
+    :return: (pa.Schema) schema Parquet della tabella
+    '''
+    fields = [pa.field(name, arrowType(dtype, name in DICTIONARY_COLUMNS))
+              for name, (_, _, dtype) in OUTPUT_SCHEMAS[EXPORT_TABLES[table]]["columns"].items()]
+    if table in EDGE_FROM_LANE:
+        fields.append(pa.field("edge", arrowType(object, True)))
+    return pa.schema(fields)
+
+
+def toRecordBatch(batch: dict, table: str, schema: pa.Schema) -> pa.RecordBatch:
+    '''
+    Converte un blocco di colonne di outputUtils in un RecordBatch con lo schema della tabella
+    '''
+    if table in EDGE_FROM_LANE:
+        # l'ID della lane è <edge>_<indice>
+        batch["edge"] = np.array([lane.rsplit("_", 1)[0] for lane in batch["lane"]], dtype=object)
+    arrays = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(batch[field.name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(batch[field.name], type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def scenarioPartition(scenario: str) -> str:
+    '''
+    :param scenario: nome della cartella dello scenario (dd-mm-YYYY_hh-mm)
+    :return: (str) partizione 'date=YYYY-mm-dd/hour=hh' dello scenario
+    '''
+    day, month, year, hour, _ = SCENARIO_PATTERN.match(scenario).groups()
+    return os.path.join(f"date={year}-{month}-{day}", f"hour={hour}")
+
+
+def scenarioSignature(scenarioFolder: str) -> dict:
+    '''
+    Firma degli output di uno scenario (dimensione e data di modifica di ogni file) e delle colonne delle tabelle,
+    usata per capire se lo scenario è cambiato dall'ultima esportazione o va riesportato con un nuovo schema
+    :param scenarioFolder: cartella dello scenario
+    :return: (dict) tipo di output --> [nome del file, dimensione, mtime in ns], "columns" --> colonne per tabella
+    '''
+    signature = {"columns": {table: tableSchema(table).names for table in EXPORT_TABLES}}
+    for outputType, path in outputFiles(scenarioFolder).items():
+        if outputType in EXPORT_TABLES.values():
+            stat = os.stat(path)
+            signature[outputType] = [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def exportScenario(task: dict) -> dict:
+    '''
+    Worker dell'esportazione: converte gli output di uno scenario in un file Parquet per tabella, nella partizione
+    <outputFolder>/<tabella>/date=YYYY-mm-dd/hour=hh/part-0.parquet.
+    Gli output vengono letti in streaming e scritti a blocchi, quindi la memoria non dipende dalla dimensione dei file.
+
+    :param task: dizionario con scenario, scenarioFolder, outputFolder, batchSize e signature
+    :return: (dict) scenario, righe esportate per tabella, tempo in secondi ed eventuale errore
+    '''
+    result = {"scenario": task["scenario"], "rows": {}, "seconds": 0.0, "error": None}
+    begin = time.perf_counter()
+    try:
+        files = outputFiles(task["scenarioFolder"])
+        partition = scenarioPartition(task["scenario"])
+        for table, outputType in EXPORT_TABLES.items():
+            partitionFolder = os.path.join(task["outputFolder"], table, partition)
+            if outputType not in files:
+                # output non più presente: la partizione viene rimossa
+                shutil.rmtree(partitionFolder, ignore_errors=True)
+                continue
+
+            os.makedirs(partitionFolder, exist_ok=True)
+            schema = tableSchema(table)
+            target = os.path.join(partitionFolder, "part-0.parquet")
+            temporary = target + ".tmp"
+            rows = 0
+            with pq.ParquetWriter(temporary, schema, compression="zstd") as writer:
+                for batch in iterOutputBatches(files[outputType], outputType, task["batchSize"]):
+                    recordBatch = toRecordBatch(batch, table, schema)
+                    writer.write_batch(recordBatch)
+                    rows += recordBatch.num_rows
+            # sostituzione atomica: una partizione non è mai lasciata a metà
+            os.replace(temporary, target)
+            result["rows"][table] = rows
+    except Exception as e:
+        result["error"] = repr(e)
+    result["seconds"] = time.perf_counter() - begin
+    return result
+
+
+def loadManifest(outputFolder: str) -> dict:
+    '''
+    :param outputFolder: cartella del dataset Parquet
+    :return: (dict) scenario --> firma degli output all'ultima esportazione riuscita
+    '''
+    path = os.path.join(outputFolder, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="UTF-8") as file:
+        return json.load(file)
+
+
+def saveManifest(outputFolder: str, manifest: dict):
+    '''
+    Salva il manifest in modo atomico
+    '''
+    path = os.path.join(outputFolder, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="UTF-8") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def exportScenarioCollection(collectionFolder: str = "configs/scenarioCollection",
+                             outputFolder: str = "configs/parquet", workers: int = os.cpu_count(),
+                             batchSize: int = 100000, force: bool = False, campaign=None) -> list:
+    '''
+    Esporta tutte le cartelle dd-mm-YYYY_hh-mm della collezione di scenari in dataset Parquet partizionati per data e
+    ora (fcd, tripinfo, queue, detector). L'esportazione è incrementale: vengono convertiti solo gli scenari nuovi o
+    i cui output sono cambiati dall'ultima esecuzione, distribuiti su un pool di processi.
+
+    :param collectionFolder: cartella con le cartelle degli scenari
+    :param outputFolder: cartella del dataset Parquet (una sottocartella per tabella)
+    :param workers: numero di processi del pool
+    :param batchSize: righe per blocco di lettura/scrittura
+    :param force: se True riesporta tutti gli scenari
+    :param campaign: manifest della campagna (CampaignManifest) in cui registrare la fase "export" di ogni scenario
+    :return: (list) risultati di exportScenario degli scenari esportati
+    '''
+    os.makedirs(outputFolder, exist_ok=True)
+    manifest = {} if force else loadManifest(outputFolder)
+
+    tasks = []
+    unchanged = 0
+    for scenario in sorted(os.listdir(collectionFolder)):
+        scenarioFolder = os.path.join(collectionFolder, scenario)
+        if not SCENARIO_PATTERN.match(scenario) or not os.path.isdir(scenarioFolder):
+            continue
+        signature = scenarioSignature(scenarioFolder)
+        if manifest.get(scenario) == signature:
+            unchanged += 1
+            continue
+        tasks.append({"scenario": scenario, "scenarioFolder": scenarioFolder, "outputFolder": outputFolder,
+                      "batchSize": batchSize, "signature": signature})
+    print(f"Scenari da esportare: {len(tasks)} (già aggiornati: {unchanged})")
+
+    results = []
+    begin = time.perf_counter()
+    signatures = {task["scenario"]: task["signature"] for task in tasks}
+    with ProcessPoolExecutor(max_workers=max(1, workers or 1)) as executor:
+        futures = [executor.submit(exportScenario, task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if campaign is not None:
+                partitions = [os.path.join(outputFolder, table, scenarioPartition(result["scenario"]))
+                              for table in EXPORT_TABLES]
+                campaign.record(result["scenario"], "export", FAILED if result["error"] else DONE,
+                                signatures[result["scenario"]], [] if result["error"] else partitions,
+                                result["seconds"], result["error"])
+            if result["error"]:
+                print(f"[{len(results)}/{len(tasks)}] {result['scenario']}: ERROR {result['error']}")
+                continue
+            manifest[result["scenario"]] = signatures[result["scenario"]]
+            rows = ", ".join(f"{table} {count}" for table, count in result["rows"].items())
+            print(f"[{len(results)}/{len(tasks)}] {result['scenario']}: {rows} rows in {result['seconds']:.1f}s")
+    saveManifest(outputFolder, manifest)
+
+    print(f"Esportazione completata in {time.perf_counter() - begin:.1f}s")
+    results.sort(key=lambda result: result["scenario"])
+    return results
@@ -0,0 +1,222 @@
+import os
+
+import numpy as np
+from libraries.utils.networkUtils import NetworkSnapshot, defaultCacheDir, fileHash, loadNetworkSnapshot
+
+# tipi di edge non percorribili dai veicoli, ignorati nell'associazione spira --> edge
+EXCLUDED_EDGE_TYPES = ["highway.pedestrian", "highway.track", "highway.footway", "highway.path",
+                       "highway.cycleway", "highway.steps"]
+
+
+class EdgeGridIndex:
+    '''
+    Indice spaziale a griglia uniforme sui segmenti delle shape degli edge di una rete SUMO.
+    Ogni segmento viene registrato in tutte le celle toccate dal suo bounding box, così la ricerca dei segmenti vicini
+    ad un punto si limita alle celle entro il raggio richiesto.
+
+    Attributi della classe:
+    edgeIDs, edgeNames, edgeTypes (np.ndarray) --> ID, nome e tipo di ogni edge
+    segments (np.ndarray) --> array (n, 4) con x1, y1, x2, y2 di ogni segmento
+    segmentEdge (np.ndarray) --> indice dell'edge a cui appartiene ogni segmento
+    cellSize (float) --> lato delle celle della griglia in metri
+    origin (np.ndarray) --> coordinate (x, y) dell'angolo in basso a sinistra della griglia
+    cellKeys, cellStart, cellSegments (np.ndarray) --> celle non vuote (ordinate) e segmenti contenuti in ciascuna
+    projParameter (str), netOffset (np.ndarray) --> proiezione della rete, per convertire lon/lat in x/y
+    '''
+
+    def __init__(self, arrays: dict):
+
+        self.edgeIDs = arrays["edgeIDs"]
+        self.edgeNames = arrays["edgeNames"]
+        self.edgeTypes = arrays["edgeTypes"]
+        self.segments = arrays["segments"]
+        self.segmentEdge = arrays["segmentEdge"]
+        self.cellSize = float(arrays["cellSize"])
+        self.origin = arrays["origin"]
+        self.columns = int(arrays["columns"])
+        self.cellKeys = arrays["cellKeys"]
+        self.cellStart = arrays["cellStart"]
+        self.cellSegments = arrays["cellSegments"]
+        self.projParameter = str(arrays["projParameter"])
+        self.netOffset = arrays["netOffset"]
+        self._proj = None
+
+    @classmethod
+    def fromSnapshot(cls, snapshot: NetworkSnapshot, cellSize: float = 50.0):
+        '''
+        Costruisce l'indice a partire dallo snapshot della rete, usando le shape degli edge comprese le giunzioni
+        (le stesse usate da net.getNeighboringEdges)
+        :param snapshot: snapshot della rete (vedi networkUtils.loadNetworkSnapshot)
+        :param cellSize: lato delle celle della griglia in metri
+        :return: (EdgeGridIndex)
+        '''
+        segments = []
+        segmentEdge = []
+        for edgeIndex in range(len(snapshot.edgeIDs)):
+            shape = snapshot.getShape(edgeIndex)
+            if len(shape) > 1:
+                segments.append(np.hstack([shape[:-1], shape[1:]]))
+                segmentEdge.append(np.full(len(shape) - 1, edgeIndex, dtype=np.int32))
+        segments = np.vstack(segments)
+        segmentEdge = np.concatenate(segmentEdge)
+
+        # celle coperte dal bounding box di ogni segmento
+        origin = np.minimum(segments[:, [0, 1]], segments[:, [2, 3]]).min(axis=0)
+        low = np.floor((np.minimum(segments[:, [0, 1]], segments[:, [2, 3]]) - origin) / cellSize).astype(np.int64)
+        high = np.floor((np.maximum(segments[:, [0, 1]], segments[:, [2, 3]]) - origin) / cellSize).astype(np.int64)
+        columns = int(high[:, 0].max()) + 1
+        keys = []
+        owners = []
+        for segmentIndex, (lowCell, highCell) in enumerate(zip(low, high)):
+            cx, cy = np.meshgrid(np.arange(lowCell[0], highCell[0] + 1), np.arange(lowCell[1], highCell[1] + 1))
+            cells = (cy * columns + cx).ravel()
+            keys.append(cells)
+            owners.append(np.full(len(cells), segmentIndex, dtype=np.int32))
+        keys = np.concatenate(keys)
+        owners = np.concatenate(owners)
+        order = np.argsort(keys, kind='stable')
+        cellKeys, cellStart = np.unique(keys[order], return_index=True)
+
+        return cls({
+            "edgeIDs": snapshot.edgeIDs,
+            "edgeNames": snapshot.edgeNames,
+            "edgeTypes": snapshot.edgeTypes,
+            "segments": segments,
+            "segmentEdge": segmentEdge,
+            "cellSize": cellSize,
+            "origin": origin,
+            "columns": columns,
+            "cellKeys": cellKeys,
+            "cellStart": np.append(cellStart, len(keys)),
+            "cellSegments": owners[order],
+            "projParameter": snapshot.projParameter,
+            "netOffset": snapshot.netOffset,
+        })
+
+    def save(self, path: str):
+        '''
+        Salva l'indice in formato binario compresso (.npz)
+        :param path: path del file di cache
+        '''
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, edgeIDs=self.edgeIDs, edgeNames=self.edgeNames, edgeTypes=self.edgeTypes,
+                            segments=self.segments, segmentEdge=self.segmentEdge, cellSize=self.cellSize,
+                            origin=self.origin, columns=self.columns, cellKeys=self.cellKeys,
+                            cellStart=self.cellStart, cellSegments=self.cellSegments,
+                            projParameter=self.projParameter, netOffset=self.netOffset)
+
+    @classmethod
+    def load(cls, path: str):
+        '''
+        :param path: path di un file salvato con save()
+        :return: (EdgeGridIndex)
+        '''
+        with np.load(path) as arrays:
+            return cls({key: arrays[key] for key in arrays.files})
+
+    def convertLonLat2XY(self, lons, lats):
+        '''
+        Versione vettoriale di net.convertLonLat2XY: proietta tutte le coordinate con una sola chiamata
+        :param lons: array delle longitudini
+        :param lats: array delle latitudini
+        :return: (tuple) array x e array y nelle coordinate della rete SUMO
+        '''
+        if self._proj is None:
+            import pyproj
+            self._proj = pyproj.Proj(projparams=self.projParameter)
+        x, y = self._proj(np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+        return np.asarray(x) + self.netOffset[0], np.asarray(y) + self.netOffset[1]
+
+    def candidateSegments(self, xs: np.ndarray, ys: np.ndarray, radius: float):
+        '''
+        Trova le coppie (punto, segmento) per i segmenti registrati nelle celle entro radius da ogni punto
+        :return: (tuple) array degli indici dei punti e array degli indici dei segmenti
+        '''
+        reach = int(np.ceil(radius / self.cellSize))
+        baseX = np.floor((xs - self.origin[0]) / self.cellSize).astype(np.int64)
+        baseY = np.floor((ys - self.origin[1]) / self.cellSize).astype(np.int64)
+        pointIndices = []
+        segmentIndices = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                cx = baseX + dx
+                cy = baseY + dy
+                valid = (cx >= 0) & (cx < self.columns) & (cy >= 0)
+                cells = cy * self.columns + cx
+                position = np.searchsorted(self.cellKeys, cells)
+                position = np.minimum(position, len(self.cellKeys) - 1)
+                found = np.flatnonzero(valid & (self.cellKeys[position] == cells))
+                starts = self.cellStart[position[found]]
+                counts = self.cellStart[position[found] + 1] - starts
+                # espande ogni cella trovata nell'elenco dei suoi segmenti
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                pointIndices.append(np.repeat(found, counts))
+                segmentIndices.append(self.cellSegments[np.repeat(starts, counts) + offsets])
+        pairs = np.unique(np.column_stack([np.concatenate(pointIndices), np.concatenate(segmentIndices)]), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+
+    def matchEdges(self, xs, ys, roadNames, radius: float = 25.0, excludedTypes: list = EXCLUDED_EDGE_TYPES):
+        '''
+        Associa ad ogni punto l'edge più vicino entro radius che abbia lo stesso nome della strada oppure un tipo
+        percorribile (non in excludedTypes). Tutti i punti vengono risolti in un unico passaggio vettoriale.
+
+        :param xs: array delle coordinate x dei punti
+        :param ys: array delle coordinate y dei punti
+        :param roadNames: nome della strada di ogni punto
+        :param radius: raggio di ricerca in metri
+        :param excludedTypes: tipi di edge scartati se il nome non coincide
+        :return: (np.ndarray) indice dell'edge associato ad ogni punto, -1 se non trovato
+        '''
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        roadNames = np.char.lower(np.asarray(roadNames, dtype=str))
+        match = np.full(len(xs), -1, dtype=np.int64)
+
+        points, segmentIndices = self.candidateSegments(xs, ys, radius)
+        if len(points) == 0:
+            return match
+
+        # distanza punto-segmento (proiezione limitata agli estremi del segmento)
+        segments = self.segments[segmentIndices]
+        start = segments[:, :2]
+        direction = segments[:, 2:] - start
+        relative = np.column_stack([xs[points], ys[points]]) - start
+        squaredLength = (direction ** 2).sum(axis=1)
+        safeLength = np.where(squaredLength > 0, squaredLength, 1.0)
+        u = np.where(squaredLength > 0, np.clip((relative * direction).sum(axis=1) / safeLength, 0.0, 1.0), 0.0)
+        distances = np.hypot(*(relative - u[:, None] * direction).T)
+
+        edges = self.segmentEdge[segmentIndices]
+        allowed = (np.char.lower(self.edgeNames[edges]) == roadNames[points]) | \
+            ~np.isin(self.edgeTypes[edges], excludedTypes)
+        keep = (distances < radius) & allowed
+        points, edges, distances = points[keep], edges[keep], distances[keep]
+
+        # per ogni punto tiene il segmento (quindi l'edge) a distanza minima
+        order = np.lexsort((distances, points))
+        points, edges = points[order], edges[order]
+        first = np.ones(len(points), dtype=bool)
+        first[1:] = points[1:] != points[:-1]
+        match[points[first]] = edges[first]
+        return match
+
+
+def loadEdgeIndex(netFile: str, cacheDir: str = None, cellSize: float = 50.0) -> EdgeGridIndex:
+    '''
+    Carica l'indice spaziale della rete dalla cache su disco, costruendolo (e salvandolo) solo se la rete è cambiata.
+    La cache è identificata dall'hash del file della rete.
+
+    :param netFile: path della rete SUMO (.net.xml)
+    :param cacheDir: cartella della cache, di default '.cache' accanto alla rete
+    :param cellSize: lato delle celle della griglia in metri
+    :return: (EdgeGridIndex)
+    '''
+    cacheDir = cacheDir or defaultCacheDir(netFile)
+    cachePath = os.path.join(cacheDir, f"edgeindex_{fileHash(netFile)}_{int(cellSize)}.npz")
+    if os.path.exists(cachePath):
+        return EdgeGridIndex.load(cachePath)
+
+    index = EdgeGridIndex.fromSnapshot(loadNetworkSnapshot(netFile, cacheDir), cellSize=cellSize)
+    index.save(cachePath)
+    print(f"Spatial index of '{netFile}' saved at '{cachePath}'")
+    return index
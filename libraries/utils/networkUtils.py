@@ -0,0 +1,170 @@
+import hashlib
+import os
+
+import numpy as np
+import sumolib
+
+# reti e snapshot già caricati nel processo corrente, indicizzati per (path assoluto, hash del file)
+_networks = {}
+_snapshots = {}
+
+
+def fileHash(path: str) -> str:
+    '''
+    Calcola l'hash SHA-256 del contenuto di un file, usato come chiave delle cache su disco
+    :param path: path del file
+    :return: (str) hash esadecimale
+    '''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def defaultCacheDir(netFile: str) -> str:
+    '''
+    :param netFile: path della rete SUMO
+    :return: (str) cartella '.cache' accanto al file della rete
+    '''
+    return os.path.join(os.path.dirname(os.path.abspath(netFile)), ".cache")
+
+
+class NetworkSnapshot:
+    '''
+    Copia compatta (array NumPy) di una rete SUMO: edge, lane, tipi, shape e connessioni tra edge.
+    Viene salvata in formato binario (.npz) e ricaricata senza rileggere l'XML della rete.
+
+    Attributi della classe:
+    edgeIDs, edgeNames, edgeTypes, edgeFunctions (np.ndarray) --> ID, nome, tipo e funzione di ogni edge
+    edgeFrom, edgeTo (np.ndarray) --> ID dei nodi di partenza e arrivo
+    edgeLengths, edgeSpeeds, edgePriorities, edgeLaneCount (np.ndarray) --> attributi numerici degli edge
+    edgeAllowsPassenger (np.ndarray) --> True se almeno una lane dell'edge è percorribile dalle auto
+    laneIDs, laneEdge, laneLengths (np.ndarray) --> ID, edge di appartenenza e lunghezza di ogni lane
+    shapeStart, shapePoints (np.ndarray) --> shape degli edge (comprese le giunzioni): i punti dell'edge i sono
+                                             shapePoints[shapeStart[i]:shapeStart[i + 1]]
+    successorStart, successors (np.ndarray) --> edge raggiungibili da ogni edge, nello stesso formato delle shape
+    projParameter (str), netOffset (np.ndarray) --> proiezione della rete
+    '''
+
+    def __init__(self, arrays: dict):
+
+        for key, value in arrays.items():
+            setattr(self, key, value)
+        self.projParameter = str(self.projParameter)
+        self._edgeIndex = None
+
+    @classmethod
+    def fromNet(cls, net):
+        '''
+        :param net: rete caricata con sumolib.net.readNet
+        :return: (NetworkSnapshot)
+        '''
+        edges = net.getEdges()
+        position = {edge.getID(): index for index, edge in enumerate(edges)}
+        lanes = [lane for edge in edges for lane in edge.getLanes()]
+
+        shapes = [np.asarray(edge.getShape(True), dtype=np.float64)[:, :2] for edge in edges]
+        successors = [sorted(position[target.getID()] for target in edge.getOutgoing() if target.getID() in position)
+                      for edge in edges]
+
+        location = net._location
+        return cls({
+            "edgeIDs": np.array([edge.getID() for edge in edges]),
+            "edgeNames": np.array([edge.getName() or "" for edge in edges]),
+            "edgeTypes": np.array([edge.getType() or "" for edge in edges]),
+            "edgeFunctions": np.array([edge.getFunction() or "" for edge in edges]),
+            "edgeFrom": np.array([edge.getFromNode().getID() for edge in edges]),
+            "edgeTo": np.array([edge.getToNode().getID() for edge in edges]),
+            "edgeLengths": np.array([edge.getLength() for edge in edges], dtype=np.float64),
+            "edgeSpeeds": np.array([edge.getSpeed() for edge in edges], dtype=np.float64),
+            "edgePriorities": np.array([edge.getPriority() for edge in edges], dtype=np.int32),
+            "edgeLaneCount": np.array([edge.getLaneNumber() for edge in edges], dtype=np.int32),
+            "edgeAllowsPassenger": np.array([edge.allows("passenger") for edge in edges]),
+            "laneIDs": np.array([lane.getID() for lane in lanes]),
+            "laneEdge": np.array([position[lane.getEdge().getID()] for lane in lanes], dtype=np.int32),
+            "laneLengths": np.array([lane.getLength() for lane in lanes], dtype=np.float64),
+            "shapeStart": np.cumsum([0] + [len(shape) for shape in shapes]),
+            "shapePoints": np.vstack(shapes),
+            "successorStart": np.cumsum([0] + [len(targets) for targets in successors]),
+            "successors": np.array([target for targets in successors for target in targets], dtype=np.int32),
+            "projParameter": location["projParameter"],
+            "netOffset": np.array(net.getLocationOffset(), dtype=np.float64),
+        })
+
+    def save(self, path: str):
+        '''
+        Salva lo snapshot in formato binario compresso (.npz)
+        :param path: path del file di cache
+        '''
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {key: value for key, value in vars(self).items() if not key.startswith('_')}
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str):
+        '''
+        :param path: path di un file salvato con save()
+        :return: (NetworkSnapshot)
+        '''
+        with np.load(path) as arrays:
+            return cls({key: arrays[key] for key in arrays.files})
+
+    def getEdgeIndex(self, edgeID: str) -> int:
+        '''
+        :param edgeID: ID di un edge della rete
+        :return: (int) posizione dell'edge negli array dello snapshot
+        '''
+        if self._edgeIndex is None:
+            self._edgeIndex = {edgeID: index for index, edgeID in enumerate(self.edgeIDs.tolist())}
+        return self._edgeIndex[edgeID]
+
+    def getShape(self, edgeIndex: int) -> np.ndarray:
+        '''
+        :param edgeIndex: posizione dell'edge
+        :return: (np.ndarray) punti (x, y) della shape dell'edge, comprese le giunzioni
+        '''
+        return self.shapePoints[self.shapeStart[edgeIndex]:self.shapeStart[edgeIndex + 1]]
+
+    def getSuccessors(self, edgeIndex: int) -> np.ndarray:
+        '''
+        :param edgeIndex: posizione dell'edge
+        :return: (np.ndarray) posizioni degli edge raggiungibili dall'edge
+        '''
+        return self.successors[self.successorStart[edgeIndex]:self.successorStart[edgeIndex + 1]]
+
+
+def loadNetworkSnapshot(netFile: str, cacheDir: str = None) -> NetworkSnapshot:
+    '''
+    Restituisce lo snapshot della rete, caricandolo solo al primo utilizzo nel processo.
+    Lo snapshot su disco è identificato dall'hash del file della rete, quindi viene ricostruito quando la rete cambia.
+
+    :param netFile: path della rete SUMO (.net.xml)
+    :param cacheDir: cartella della cache, di default '.cache' accanto alla rete
+    :return: (NetworkSnapshot)
+    '''
+    netHash = fileHash(netFile)
+    key = (os.path.abspath(netFile), netHash)
+    if key not in _snapshots:
+        cachePath = os.path.join(cacheDir or defaultCacheDir(netFile), f"network_{netHash}.npz")
+        if os.path.exists(cachePath):
+            _snapshots[key] = NetworkSnapshot.load(cachePath)
+        else:
+            _snapshots[key] = NetworkSnapshot.fromNet(getNetwork(netFile))
+            _snapshots[key].save(cachePath)
+            print(f"Network snapshot of '{netFile}' saved at '{cachePath}'")
+    return _snapshots[key]
+
+
+def getNetwork(netFile: str):
+    '''
+    Restituisce la rete sumolib completa, letta dall'XML una sola volta per processo e condivisa da tutti i
+    consumatori (ad esempio la generazione delle route di tutte le ore)
+
+    :param netFile: path della rete SUMO (.net.xml)
+    :return: (sumolib.net.Net)
+    '''
+    key = (os.path.abspath(netFile), fileHash(netFile))
+    if key not in _networks:
+        _networks[key] = sumolib.net.readNet(netFile)
+    return _networks[key]
@@ -0,0 +1,294 @@
+import gzip
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# Schema dei file di output di SUMO letti in streaming.
+# record --> tag di cui ogni elemento diventa una riga
+# context --> tag antenati i cui attributi vengono copiati in ogni riga (es. il tempo del timestep dell'FCD)
+# child --> tag figli del record i cui attributi vengono aggiunti alla riga (es. la route del vehroute)
+# columns --> colonna: (tag che contiene l'attributo, nome dell'attributo, dtype)
+# fallback (opzionale) --> colonna del record: attributi letti, in ordine, quando manca quello della colonna
+# missing (opzionale) --> colonna: valore usato quando l'attributo manca, al posto di quello di MISSING_VALUES
+OUTPUT_SCHEMAS = {
+    "fcd": {
+        "root": "fcd-export",
+        "record": "vehicle",
+        "context": ["timestep"],
+        "child": [],
+        "columns": {
+            "time": ("timestep", "time", np.float64),
+            "id": ("vehicle", "id", object),
+            "x": ("vehicle", "x", np.float64),
+            "y": ("vehicle", "y", np.float64),
+            "angle": ("vehicle", "angle", np.float32),
+            "type": ("vehicle", "type", object),
+            "speed": ("vehicle", "speed", np.float32),
+            "pos": ("vehicle", "pos", np.float32),
+            "lane": ("vehicle", "lane", object),
+            "slope": ("vehicle", "slope", np.float32),
+        },
+    },
+    "tripinfo": {
+        "root": "tripinfos",
+        "record": "tripinfo",
+        "context": [],
+        "child": [],
+        "columns": {
+            "id": ("tripinfo", "id", object),
+            "depart": ("tripinfo", "depart", np.float64),
+            "departLane": ("tripinfo", "departLane", object),
+            "departPos": ("tripinfo", "departPos", np.float32),
+            "departSpeed": ("tripinfo", "departSpeed", np.float32),
+            "departDelay": ("tripinfo", "departDelay", np.float32),
+            "arrival": ("tripinfo", "arrival", np.float64),
+            "arrivalLane": ("tripinfo", "arrivalLane", object),
+            "arrivalPos": ("tripinfo", "arrivalPos", np.float32),
+            "arrivalSpeed": ("tripinfo", "arrivalSpeed", np.float32),
+            "duration": ("tripinfo", "duration", np.float32),
+            "routeLength": ("tripinfo", "routeLength", np.float32),
+            "waitingTime": ("tripinfo", "waitingTime", np.float32),
+            "waitingCount": ("tripinfo", "waitingCount", np.int32),
+            "stopTime": ("tripinfo", "stopTime", np.float32),
+            "timeLoss": ("tripinfo", "timeLoss", np.float32),
+            "rerouteNo": ("tripinfo", "rerouteNo", np.int32),
+            "vType": ("tripinfo", "vType", object),
+            "speedFactor": ("tripinfo", "speedFactor", np.float32),
+        },
+    },
+    "queue": {
+        "root": "queue-export",
+        "record": "lane",
+        "context": ["data"],
+        "child": [],
+        "columns": {
+            "time": ("data", "timestep", np.float64),
+            "lane": ("lane", "id", object),
+            "queueingTime": ("lane", "queueing_time", np.float32),
+            "queueingLength": ("lane", "queueing_length", np.float32),
+            "queueingLengthExperimental": ("lane", "queueing_length_experimental", np.float32),
+        },
+    },
+    "summary": {
+        "root": "summary",
+        "record": "step",
+        "context": [],
+        "child": [],
+        "columns": {
+            "time": ("step", "time", np.float64),
+            "loaded": ("step", "loaded", np.int32),
+            "inserted": ("step", "inserted", np.int32),
+            "running": ("step", "running", np.int32),
+            "waiting": ("step", "waiting", np.int32),
+            "ended": ("step", "ended", np.int32),
+            "arrived": ("step", "arrived", np.int32),
+            "collisions": ("step", "collisions", np.int32),
+            "teleports": ("step", "teleports", np.int32),
+            "halting": ("step", "halting", np.int32),
+            "stopped": ("step", "stopped", np.int32),
+            "meanWaitingTime": ("step", "meanWaitingTime", np.float32),
+            "meanTravelTime": ("step", "meanTravelTime", np.float32),
+            "meanSpeed": ("step", "meanSpeed", np.float32),
+            "meanSpeedRelative": ("step", "meanSpeedRelative", np.float32),
+            "duration": ("step", "duration", np.int32),
+        },
+    },
+    "vehroute": {
+        "root": "routes",
+        "record": "vehicle",
+        "context": [],
+        "child": ["route"],
+        "columns": {
+            "id": ("vehicle", "id", object),
+            "depart": ("vehicle", "depart", np.float64),
+            "arrival": ("vehicle", "arrival", np.float64),
+            "edges": ("route", "edges", object),
+        },
+    },
+    "detector": {
+        "root": "detector",
+        "record": "interval",
+        "context": [],
+        "child": [],
+        "columns": {
+            "begin": ("interval", "begin", np.float64),
+            "end": ("interval", "end", np.float64),
+            "id": ("interval", "id", object),
+            "nVehContrib": ("interval", "nVehContrib", np.int32),
+            "flow": ("interval", "flow", np.float32),
+            "occupancy": ("interval", "occupancy", np.float32),
+            "speed": ("interval", "speed", np.float32),
+            "harmonicMeanSpeed": ("interval", "harmonicMeanSpeed", np.float32),
+            "length": ("interval", "length", np.float32),
+            "nVehEntered": ("interval", "nVehEntered", np.int32),
+            "entered": ("interval", "entered", np.int32),
+            "left": ("interval", "left", np.int32),
+        },
+        # con il modello mesoscopico le spire scrivono intervalli nel formato dei meandata: i veicoli sono in
+        # entered/left (-1 con il modello microscopico) e flow/occupancy mancano negli intervalli senza veicoli
+        "fallback": {"nVehContrib": ["entered"], "nVehEntered": ["entered"]},
+        "missing": {"flow": "0", "occupancy": "0"},
+    },
+}
+
+# valore usato quando un attributo manca nel file
+MISSING_VALUES = {np.float64: "nan", np.float32: "nan", np.int32: "-1", object: ""}
+
+
+def openOutput(path: str):
+    '''
+    :param path: path di un file di output di SUMO, anche compresso (.gz)
+    :return: file binario aperto in lettura
+    '''
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def detectOutputType(path: str) -> str:
+    '''
+    Riconosce il tipo di output dal tag radice del file
+    :param path: path di un file di output di SUMO
+    :return: (str) chiave di OUTPUT_SCHEMAS
+    '''
+    roots = {schema["root"]: outputType for outputType, schema in OUTPUT_SCHEMAS.items()}
+    with openOutput(path) as source:
+        for _, element in ET.iterparse(source, events=('start',)):
+            if element.tag in roots:
+                return roots[element.tag]
+            break
+    raise ValueError(f"Unknown SUMO output format: '{path}'")
+
+
+def _toColumns(rows: dict, columns: dict) -> dict:
+    '''
+    Converte le liste di stringhe accumulate in array NumPy tipizzati (conversione vettoriale, non riga per riga)
+    '''
+    batch = {}
+    for name, (_, _, dtype) in columns.items():
+        if dtype is object:
+            batch[name] = np.array(rows[name], dtype=object)
+        else:
+            batch[name] = np.array(rows[name]).astype(np.float64).astype(dtype)
+    return batch
+
+
+def iterOutputBatches(path: str, outputType: str = None, batchSize: int = 100000):
+    '''
+    Legge in streaming un file di output di SUMO e restituisce le righe a blocchi di colonne NumPy tipizzate.
+    Il file viene letto con iterparse (parser expat in C) e ogni elemento viene cancellato appena letto, quindi la
+    memoria usata dipende solo da batchSize e non dalla dimensione del file.
+
+    :param path: path del file (fcd.xml, tripinfos.xml, queue.xml, summary.xml, vehroute.xml, output delle spire),
+                 anche compresso (.xml.gz)
+    :param outputType: chiave di OUTPUT_SCHEMAS, se None viene riconosciuto dal tag radice
+    :param batchSize: numero massimo di righe per blocco
+    :return: (generator) dizionari {colonna: np.ndarray}
+    '''
+    outputType = outputType or detectOutputType(path)
+    schema = OUTPUT_SCHEMAS[outputType]
+    columns = schema["columns"]
+    record = schema["record"]
+    context = set(schema["context"])
+    child = set(schema["child"])
+
+    missingValues = {name: schema.get("missing", {}).get(name, MISSING_VALUES[dtype])
+                     for name, (_, _, dtype) in columns.items()}
+    attributes = {tag: [] for tag in {record} | context | child}
+    for name, (tag, attribute, dtype) in columns.items():
+        attributes[tag].append((name, attribute, missingValues[name]))
+    fallbacks = [(name, columns[name][1], alternatives) for name, alternatives in schema.get("fallback", {}).items()]
+
+    rows = {name: [] for name in columns}
+    contextValues = {name: missingValues[name] for name, (tag, _, _) in columns.items() if tag in context}
+    childValues = {}
+    count = 0
+    root = None
+    depth = 0
+
+    with openOutput(path) as source:
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                if root is None:
+                    root = element
+                depth += 1
+                if tag in context:
+                    for name, attribute, missing in attributes[tag]:
+                        contextValues[name] = element.get(attribute, missing)
+                elif tag == record:
+                    childValues = {}
+                continue
+
+            depth -= 1
+            if tag in child:
+                # se ci sono più figli (es. routeDistribution) vale l'ultimo, cioè la route effettivamente percorsa
+                for name, attribute, missing in attributes[tag]:
+                    childValues[name] = element.get(attribute, missing)
+            elif tag == record:
+                for name, attribute, missing in attributes[tag]:
+                    rows[name].append(element.get(attribute, missing))
+                for name, attribute, alternatives in fallbacks:
+                    if attribute not in element.attrib:
+                        rows[name][-1] = next((element.get(alternative) for alternative in alternatives
+                                               if alternative in element.attrib), rows[name][-1])
+                for name, value in contextValues.items():
+                    rows[name].append(value)
+                for childTag in child:
+                    for name, _, missing in attributes[childTag]:
+                        rows[name].append(childValues.get(name, missing))
+                count += 1
+                element.clear()
+                if count == batchSize:
+                    yield _toColumns(rows, columns)
+                    rows = {name: [] for name in columns}
+                    count = 0
+            if depth == 1:
+                # elemento figlio diretto della radice concluso: la radice non deve trattenerne i riferimenti
+                root.clear()
+
+    if count > 0:
+        yield _toColumns(rows, columns)
+
+
+def toArrow(batch: dict):
+    '''
+    Converte un blocco restituito da iterOutputBatches in un pyarrow.RecordBatch (richiede pyarrow)
+    :param batch: dizionario {colonna: np.ndarray}
+    :return: (pyarrow.RecordBatch)
+    '''
+    import pyarrow as pa
+    return pa.RecordBatch.from_arrays([pa.array(values) for values in batch.values()], names=list(batch))
+
+
+def readOutput(path: str, outputType: str = None, batchSize: int = 100000):
+    '''
+    Legge un intero file di output in un DataFrame, passando comunque dal parser in streaming
+    :param path: path del file di output
+    :param outputType: chiave di OUTPUT_SCHEMAS, se None viene riconosciuto dal tag radice
+    :param batchSize: numero massimo di righe per blocco
+    :return: (pd.DataFrame)
+    '''
+    import pandas as pd
+    outputType = outputType or detectOutputType(path)
+    frames = [pd.DataFrame(batch) for batch in iterOutputBatches(path, outputType, batchSize)]
+    if not frames:
+        return pd.DataFrame({name: np.array([], dtype=dtype)
+                             for name, (_, _, dtype) in OUTPUT_SCHEMAS[outputType]["columns"].items()})
+    return pd.concat(frames, ignore_index=True)
+
+
+def outputFiles(scenarioFolder: str) -> dict:
+    '''
+    :param scenarioFolder: cartella di uno scenario di configs/scenarioCollection
+    :return: (dict) tipo di output --> path del file, per gli output presenti nella cartella
+    '''
+    names = {"fcd": "fcd", "tripinfo": "tripinfos", "queue": "queue", "summary": "summary", "vehroute": "vehroute",
+             "detector": "e1_output"}
+    found = {}
+    for outputType, name in names.items():
+        for extension in (".xml", ".xml.gz"):
+            path = os.path.join(scenarioFolder, name + extension)
+            if os.path.exists(path):
+                found[outputType] = path
+                break
+    return found
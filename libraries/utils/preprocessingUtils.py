@@ -1,13 +1,19 @@
 import pandas as pd
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import sumolib
+from xml.sax.saxutils import escape
 import os
+from libraries.classes.TrafficDataset import HOUR_COLUMNS, TrafficDataset, readAccurateKeys
+from libraries.utils import mapMatchingUtils
+
+# stessi caratteri sostituiti da ElementTree nei valori degli attributi
+XML_ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
 
 
 
 def filterWithAccuracy(file_input: str, file_accuracy: str, date_column: str, sensor_id_column: str, output_file: str,
-                       accepted_percentage: int):
+                       accepted_percentage: int, chunksize: int = None):
     '''
        A partire dal dataset di traffico, rilevato dalle spire, (file_input) e dal dataset di accuratezza (file_accuracy)
        di rilevamento delle spire, viene generato un file filtrato (output filters) contenente il dataset con una certa
@@ -19,107 +25,70 @@ def filterWithAccuracy(file_input: str, file_accuracy: str, date_column: str, se
        :param sensor_id_column: Nome della colonna SENSOR ID in entrambi i file
        :param output_file: Path del file di output
        :param accepted_percentage: Percentuale minima di accuratezza per il filtraggio
+       :param chunksize: se specificato, il file_input viene letto e scritto a blocchi di chunksize righe (vedi
+                         TrafficDataset.iterCSV), così la memoria usata non dipende dalla dimensione del dataset.
+                         Il file scritto è lo stesso della lettura completa
        :return:
        '''
-    # Load the input data and accuracy data from the specified file paths
-    df_input = pd.read_csv(file_input, sep=';', encoding="UTF-8")
-    df_accuracy = pd.read_csv(file_accuracy, sep=';', encoding="UTF-8")
-
-    # Clean and filter the accuracy data to only include measurements above `accepted_percentage`
-    for ind, column in enumerate(df_accuracy.columns):
-        if ind > 1:  # Ignore the first two columns, assumed to be `date_column` and `sensor_id_column`
-            # Remove '%' and convert to integers
-            df_accuracy[column] = df_accuracy[column].str.replace('%', '').astype(int)
-            # Drop rows where the accuracy is below `accepted_percentage`
-            df_accuracy = df_accuracy[df_accuracy[column] >= accepted_percentage]
-
-    # Extract date and sensor ID columns as an identifier for filtering
-    identifier = df_accuracy[[date_column, sensor_id_column]]
-    keys = list(identifier.columns)
-
-    # Create indices based on the date and sensor ID columns for both dataframes
-    i1 = df_input.set_index(keys).index
-    i2 = df_accuracy.set_index(keys).index
-
-    # Filter `df_input` to include only rows that match the high-accuracy entries in `df_accuracy`
-    filtered_df = df_input[i1.isin(i2)]
-
     # Ensure the output directory exists
     output_dir = os.path.dirname(output_file)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Directory '{output_dir}' created for the output file.")
 
-    # Save the filtered data to the specified output file
-    filtered_df.to_csv(output_file, sep=';', index=False)
+    if chunksize is None:
+        # Load the input data (once per process, see TrafficDataset) and keep the rows of accurate (date, sensor) pairs
+        filtered = TrafficDataset.load(file_input).filterWithAccuracy(file_accuracy, accepted_percentage, date_column,
+                                                                      sensor_id_column)
+        filtered.toCSV(output_file)
+    else:
+        # Stream the input file in chunks, appending the rows of accurate (date, sensor) pairs to the output file
+        accurate = readAccurateKeys(file_accuracy, accepted_percentage, date_column, sensor_id_column, chunksize)
+        for index, chunk in enumerate(TrafficDataset.iterCSV(file_input, chunksize)):
+            chunk.selectKeys(accurate, date_column, sensor_id_column).toCSV(output_file, append=index > 0)
     print(f"Output with filtered accuracy created at '{output_file}'.")
 
 
 def generateRoadNamesFile (inputFile: str, sumoNetFile: str, detectorFilePath: str, roadNamesFilePath: str):
     '''
-    Associa le strade ad un EDGE ID della rete SUMO usando le coordinate GPS delle strade
+    Associa le strade ad un EDGE ID della rete SUMO usando le coordinate GPS delle strade.
+    Le coordinate vengono proiettate tutte insieme e associate all'edge percorribile più vicino (entro 25 metri) con
+    l'indice spaziale della rete, salvato su disco e ricostruito solo quando cambia il file della rete.
         :param inputFile: PATH con i nomi delle strade e le coordinate GPS
         :param sumoNetFile: Il file con gli ID della rete SUMO
         :param detectorFilePath: Path del file output contendnete la definizione dei sensori di traffico (inductionLoop) per SUMO
         :param roadNamesFilePath: Path del file csv contente i nomi delle strade e gli edgeID associati
         :return:
     '''
-    #Load the SUMO network using sumolib
-    net=sumolib.net.readNet(sumoNetFile)
+    # Load the spatial index of the SUMO network (cached on disk, keyed by the net file hash)
+    index = mapMatchingUtils.loadEdgeIndex(sumoNetFile)
 
     # Load input data and filter unique road names and geopoints
     input_df = pd.read_csv(inputFile, sep=';')
     df_unique = input_df[['Nome via', 'geopoint']].drop_duplicates()
 
-    # Create the root element for the XML file
-    root = ET.Element('additional')
+    # Extract latitude and longitude from the geopoints and convert them to SUMO's (x, y) coordinates
+    coordinates = df_unique['geopoint'].str.split(',', expand=True).astype(float)
+    x, y = index.convertLonLat2XY(coordinates[1].to_numpy(), coordinates[0].to_numpy())
 
-    for index, row in df_unique.iterrows():
-        # Extract latitude and longitude from the geopoint
-        coord = row['geopoint']
-        lat, lon = map(float, coord.split(','))
-
-        # Convert geographic coordinates to SUMO's (x, y) coordinates
-        x, y = net.convertLonLat2XY(lon, lat)
-        print(f"SUMO reference coordinates (x, y): ({x}, {y})")
-
-        # Find neighboring edges within a 25m radius, sorted by distance
-        candidate_edges = net.getNeighboringEdges(x, y, r=25)
-        edges_and_dist = sorted(candidate_edges, key=lambda edge: edge[1])
-
-        # Attempt to find the closest edge that matches the road name or is suitable
-        closest_edge = None
-        if edges_and_dist:
-            for edge, dist in edges_and_dist:
-                edge_name = edge.getName().lower()
-                road_name = row["Nome via"].lower()
-
-                # Check if the edge name matches the road name, or find a suitable edge type
-                if edge_name == road_name or edge.getType() not in ["highway.pedestrian", "highway.track",
-                                                                    "highway.footway", "highway.path",
-                                                                    "highway.cycleway", "highway.steps"]:
-                    closest_edge = edge
-                    break
-            else:
-                # If no matching edge is found, set closest_edge to the first suitable edge
-                closest_edge = next((edge for edge, dist in edges_and_dist if
-                                     edge.getType() not in ["highway.pedestrian", "highway.track", "highway.footway",
-                                                            "highway.path", "highway.cycleway", "highway.steps"]), None)
-
-        if closest_edge:
-            print(f"Name: {closest_edge.getName()}")
-            print(f"Edge ID: {closest_edge.getID()}")
-
-            # Assign the closest edge ID to the row in df_unique
-            df_unique.at[index, 'edge_id'] = closest_edge.getID()
-
-            # Add an induction loop element to the XML structure
-            ET.SubElement(root, 'inductionLoop', id=f"{index}_0", lane=f"{closest_edge.getID()}_0", pos="-5",
-                          freq="1800", file="e1_real_output.xml")
-        else:
-            # Drop rows where no suitable edge is found within the network
-            print(f"No suitable edge found for road '{row['Nome via']}' at coordinates ({lat}, {lon}).")
-            df_unique.drop(index, inplace=True)
+    # Find the closest edge within 25m that matches the road name or has a suitable type, for all geopoints at once
+    match = index.matchEdges(x, y, df_unique['Nome via'].to_numpy(), radius=25)
+    found = match >= 0
+    df_unique['edge_id'] = None
+    df_unique.loc[found, 'edge_id'] = index.edgeIDs[match[found]]
+
+    for _, row in df_unique[~found].iterrows():
+        print(f"No suitable edge found for road '{row['Nome via']}' at coordinates ({row['geopoint']}).")
+
+    # Drop rows where no suitable edge is found within the network
+    df_unique = df_unique[found]
+    print(f"Edge IDs linked for {len(df_unique)} of {len(found)} road geopoints")
+
+    # Create the root element for the XML file, with an induction loop for every linked geopoint
+    root = ET.Element('additional')
+    for index_row, edgeID in df_unique['edge_id'].items():
+        ET.SubElement(root, 'inductionLoop', id=f"{index_row}_0", lane=f"{edgeID}_0", pos="-5",
+                      freq="1800", file="e1_real_output.xml")
 
     # Ensure the directory for the XML output file exists
     os.makedirs(os.path.dirname(detectorFilePath), exist_ok=True)
@@ -137,13 +106,14 @@ def generateRoadNamesFile (inputFile: str, sumoNetFile: str, detectorFilePath: s
     df_unique.to_csv(roadNamesFilePath, sep=';', index=False)
     print(f"CSV file with road names and edge IDs saved at '{roadNamesFilePath}'")
 
-def fillMissingEdgeId(roadnameFile: str):
+def fillMissingEdgeId(roadnameFile: str, outputFile: str = None):
     '''
     Funzione che cerca nel roadnamefile le entry dei nomi delle strade alle quali non è associato un EDGE_ID.
     Per tali entry tenta di trovare un'altra voce che ha lo stesso nome_via e con EDGE_ID valido, se lo trava
     assegna tale valore alla strada con EDGE_ID mancante. La funzione segnala la strada per la quale non si riesce ad
     assegnare un EDGE_ID.
     :param roadnameFile:
+    :param outputFile: file in cui salvare il risultato, se None viene sovrascritto il roadnameFile
     :return:
     '''
     # Load the road names data from the specified file
@@ -164,43 +134,43 @@ def fillMissingEdgeId(roadnameFile: str):
 
     # Report the number of roads without an edge ID
     print("Roads without edge ID: " + str(empty))
-    # Save the updated DataFrame back to the CSV file
-    df.to_csv(roadnameFile, sep=';', index=False)
+    # Save the updated DataFrame back to the CSV file (or to outputFile)
+    df.to_csv(outputFile or roadnameFile, sep=';', index=False)
 
-def linkEdgeID(inputFile: str, roadNamesFile: str, outputFile: str):
+def linkEdgeID(inputFile: str, roadNamesFile: str, outputFile: str, chunksize: int = None):
     '''
         Funzione che collega gli EDGE_ID di SUMO alle strade. Per ogni riga dell'inputFile, trova il corrispondente EDGE_ID
         nel roadnameFile e lo assegna.
+        Il collegamento è un join sulle colonne ('Nome via', 'geopoint'): le righe senza corrispondenza vengono scartate
+        e, se nel roadnameFile ci sono più righe con la stessa chiave, viene usata la prima.
         :param inputFile:
         :param roadnaleFile:
         :param outputFile:
+        :param chunksize: se specificato, l'inputFile viene letto e scritto a blocchi di chunksize righe (vedi
+                          TrafficDataset.iterCSV), così la memoria usata non dipende dalla dimensione del dataset.
+                          Il file scritto è lo stesso della lettura completa
         :return:
     '''
-    # Load input and road names data
-    df = pd.read_csv(inputFile, sep=';')
-    dfRoadnames = pd.read_csv(roadNamesFile, sep=';')
+    keys = ['Nome via', 'geopoint']
 
+    # Load road names data, keeping only the first edge_id for each (road name, geopoint) pair
+    dfRoadnames = pd.read_csv(roadNamesFile, sep=';')
+    dfRoadnames = dfRoadnames.drop_duplicates(subset=keys)[keys + ['edge_id']]
+
+    def link(df: pd.DataFrame) -> pd.DataFrame:
+        # Inner join on the keys: rows without a matching road name and geopoint are dropped
+        columns = list(df.columns)
+        linked = df.drop(columns=['edge_id'], errors='ignore').merge(dfRoadnames, on=keys, how='inner')
+        # Keep the position of an already existing edge_id column, otherwise append it as the last one
+        return linked[columns if 'edge_id' in columns else columns + ['edge_id']]
+
+    if chunksize is None:
+        link(pd.read_csv(inputFile, sep=';')).to_csv(outputFile, sep=';', index=False)
+    else:
+        # Stream the input file in chunks (with the dtypes of the whole file), appending every linked chunk to the output
+        for index, chunk in enumerate(TrafficDataset.iterCSV(inputFile, chunksize)):
+            TrafficDataset(link(chunk.frame), chunk.dateFormat).toCSV(outputFile, append=index > 0)
 
-    # Iterate over each row in the input DataFrame to find and link edge IDs
-    for index, row in df.iterrows():
-        print(f"Processing row {index}: Nome via = {row['Nome via']}, Geopoint = {row['geopoint']}")  # DEBUG 1
-        # Find matching edge_id in the road names file based on road name and geopoint
-        edge = dfRoadnames.loc[
-            (dfRoadnames['Nome via'] == row['Nome via']) &
-            (dfRoadnames['geopoint'] == row['geopoint']),
-            'edge_id'
-        ]
-        print(f"Found edges: {edge.values}")  # DEBUG 2: Mostra i valori trovati
-
-
-        # If no matching edge_id is found, remove the row; otherwise, link the edge_id
-        if len(edge) == 0:
-            df.drop(index, inplace=True)
-            continue
-        df.at[index, 'edge_id'] = edge.values[0]  # Assign the first match
-
-    # Save the modified DataFrame to the output file
-    df.to_csv(outputFile, sep=';', index=False)
     print(f"Updated file with linked edge IDs saved at '{outputFile}'")
 
 def generateEdgeDataFile(input_file: str,  outputFile: str, date: str = "01/02/2024", time_slot: str = "00:00-01:00", duration: str = '3600'):
@@ -220,24 +190,12 @@ def generateEdgeDataFile(input_file: str,  outputFile: str, date: str = "01/02/2
     root = ET.Element('data')
     interval = ET.SubElement(root, 'interval', begin='0', end=duration)
 
-    # Load and filter data based on the specified date
-    df = pd.read_csv(input_file, sep=';')
-    df = df[df['data'].str.contains(date)]
-
-    for index, row in df.iterrows():
-        edge_id = str(row['edge_id'])
-        first = int(time_slot[:2])
-        last = int(time_slot[6:8])
-
-        # Calculate the vehicle count for the specified time slot
-        if last - first > 1:  # If the time slot spans multiple hours
-            total_count = sum(row[f"{hour:02d}:00-{(hour + 1) % 24:02d}:00"] for hour in range(first, last))
-            count = str(total_count)
-        else:
-            count = str(row[time_slot])
+    # Vehicle count of every edge on the specified date and time slot (summed if the slot spans multiple hours)
+    counts = TrafficDataset.load(input_file).getEdgeCounts(date, time_slot)
 
+    for edge_id, count in zip(counts['edge_id'], counts['count']):
         # Add the edge element to the XML with the calculated count
-        ET.SubElement(interval, 'edge', id=edge_id, entered=count)
+        ET.SubElement(interval, 'edge', id=edge_id, entered=str(count))
 
     # Ensure the directory for the output file exists
     os.makedirs(os.path.dirname(outputFile), exist_ok=True)
@@ -255,11 +213,8 @@ def dailyFilter(inputFilePath: str, date: str):
     :param date:
     :return:
     '''
-    # Load the input CSV file
-    df = pd.read_csv(inputFilePath, sep=';')
-
     # Filter data by the specified date
-    df_filtered = df[df['data'].str.contains(date)]
+    dataset = TrafficDataset.load(inputFilePath).getDate(date)
 
     #crea un nome file corretto, sostituendo "/" con "-"
     safe_date = date.replace("/", "-")
@@ -269,7 +224,7 @@ def dailyFilter(inputFilePath: str, date: str):
     os.makedirs(os.path.dirname(outputFile), exist_ok=True)
 
     # Save the filtered data to the daily traffic flow file path
-    df_filtered.to_csv(outputFile, sep=';', index=False)
+    dataset.toCSV(outputFile)
     print(f"Filtered data for date '{date}' saved in {outputFile}")
 
 
@@ -280,17 +235,11 @@ def reorderDataset(inputFilePath: str, outputFilePath: str):
     :param outputFilePath:
     :return:
     '''
-    # Load the dataset
-    df = pd.read_csv(inputFilePath, sep=';')
-
-    # Ensure `data` column is in datetime format
-    df['data'] = pd.to_datetime(df['data'], format='%Y-%m-%d')
+    # Sort the dataset by date (already parsed by TrafficDataset)
+    dataset = TrafficDataset.load(inputFilePath).sortedByDate()
 
-    # Sort the dataset by date
-    df_sorted = df.sort_values(by='data')
-
-    # Save the reordered dataset
-    df_sorted.to_csv(outputFilePath, sep=';', index=False)
+    # Save the reordered dataset, with the dates as 'yyyy-mm-dd'
+    dataset.toCSV(outputFilePath, dateFormat='%Y-%m-%d')
     print(f"Dataset reordered by date and saved at '{outputFilePath}'")
 
 def filteringDataset(inputFilePath: str, start_date: str, end_date: str, outputFilePath: str):
@@ -302,34 +251,33 @@ def filteringDataset(inputFilePath: str, start_date: str, end_date: str, outputF
     :param outputFilePath:
     :return:
     '''
-    # Load the dataset
-    df = pd.read_csv(inputFilePath, sep=';')
-
-    # Convert `start_date` and `end_date` from 'mm/dd/yyyy' to 'yyyy-mm-dd' format for consistent comparison
-    start_date = datetime.strptime(start_date, '%m/%d/%Y').strftime('%Y-%m-%d')
-    end_date = datetime.strptime(end_date, '%m/%d/%Y').strftime('%Y-%m-%d')
-
-    # Ensure `data` column is parsed as datetime in 'dd/mm/yyyy' format
-    df['data'] = pd.to_datetime(df['data'], format='%d/%m/%Y')
+    # Convert `start_date` and `end_date` from 'mm/dd/yyyy' for the comparison with the parsed `data` column
+    start = datetime.strptime(start_date, '%m/%d/%Y')
+    end = datetime.strptime(end_date, '%m/%d/%Y')
+    start_date, end_date = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
 
     # Filter the dataset for the specified date range
-    mask = (df['data'] >= start_date) & (df['data'] <= end_date)
-    filtered_df = df.loc[mask]
+    dataset = TrafficDataset.load(inputFilePath).between(start, end)
 
-    # Save the filtered dataset
-    filtered_df.to_csv(outputFilePath, sep=';', index=False)
+    # Save the filtered dataset, with the dates as 'yyyy-mm-dd'
+    dataset.toCSV(outputFilePath, dateFormat='%Y-%m-%d')
     print(f"Filtered data from {start_date} to {end_date} saved at '{outputFilePath}'")
 
 
-def generateEdgeDataPerHour(inputFile: str, outputDir: str, startData: str, endData: str, duration: str='3600'):
+def generateEdgeDataPerHour(inputFile: str, outputDir: str, startData: str, endData: str, duration: str='3600',
+                            workers: int = os.cpu_count()):
     '''
     Genera automaticamente edgedata.xml per ogni ora e per ogni giorno in un range di date.
     il file input.csv ha colonna date con formato dd/mm/YYYY. StartData e endData vuole formato data dd/mm/YYYY
+    Le colonne orarie vengono trasformate una sola volta in una tabella lunga (data, ora, edge, conteggio), raggruppata
+    per (data, ora); ogni gruppo viene scritto direttamente come testo XML, senza costruire un albero ElementTree.
+    Il contenuto dei file è identico a quello prodotto dalla versione basata su iterrows.
     :param inputFile: processed_traffic_flow.csv (output della funzione linkEdgeID)
     :param outputDir: directory dove salvare i file generati
     :param startData: inizio range di data
     :param endData: fine del range
     :param duration:
+    :param workers: numero di thread usati per scrivere i file dei diversi giorni in parallelo
     :return:
     la Funzione ritorna un file edgedata_dd/mm/YYYY_hh.xml per ogni ora del range di date inserito in ingresso
     '''
@@ -337,66 +285,40 @@ def generateEdgeDataPerHour(inputFile: str, outputDir: str, startData: str, endD
     #creazione della directory di output se non esiste
     os.makedirs(outputDir, exist_ok=True)
 
-    #caricamento del dataset
-    df = pd.read_csv(inputFile, sep=';')
-
-    #conversione del campo data nel formato datetime
-    df['data'] = pd.to_datetime(df['data'], format='%d/%m/%Y')
-
     # Conversione delle date di inizio e fine in datetime
     startDt = datetime.strptime(startData, '%d/%m/%Y')
     endDt = datetime.strptime(endData, '%d/%m/%Y')
 
-    #loop su ogni giorno nel range di date
-    currentDate = startDt
-    while currentDate <= endDt:
-        #dateStr = currentDate.strftime('%d/%m/%Y')
-        dfDay = df[df['data'] == currentDate]
+    #caricamento del dataset (date già convertite, vedi TrafficDataset) e filtro sul range di date
+    df = TrafficDataset.load(inputFile).between(startDt, endDt).frame
 
+    #le colonne orarie mancanti valgono 0, come nella versione precedente
+    missing = [time_slot for time_slot in HOUR_COLUMNS if time_slot not in df.columns]
+    for time_slot in missing:
+        print(f"Colonna '{time_slot}' non trovata")
+    df = df.assign(**dict.fromkeys(missing, 0))
 
-        #loop su ogni ora del giorno
-        for hour in range(24):
-            if hour == 23:
-                time_slot = "23:00-24:00"
-            else:
-                time_slot = f"{hour:02d}:00-{(hour + 1) % 24:02d}:00"
+    #tabella lunga: una riga per (data, edge, ora); melt mantiene l'ordine delle righe all'interno di ogni ora
+    long = df[['data', 'edge_id'] + HOUR_COLUMNS].melt(id_vars=['data', 'edge_id'], var_name='time_slot',
+                                                       value_name='count')
+    edgeIDs = long['edge_id'].astype(str).str.strip().map(lambda edgeID: escape(edgeID, XML_ATTRIBUTE_ENTITIES))
+    long['line'] = '    <edge id="' + edgeIDs + '" entered="' + long['count'].astype('int64').astype(str) + '" />'
 
+    # contenuto di ogni file (data, ora) --> righe <edge> già formattate
+    groups = {key: "\n".join(group) for key, group in long.groupby(['data', 'time_slot'], sort=False)['line']}
 
+    def writeDay(currentDate: datetime):
+        for hour, time_slot in enumerate(HOUR_COLUMNS):
             file_name = f"edgedata_{currentDate.strftime('%d-%m-%Y')}_{hour:02d}.xml"
-            outputfile = os.path.join(outputDir, file_name)
-
-            #creazione del file xml
-            root = ET.Element('data')
-            interval = ET.SubElement(root, 'interval', begin='0', end=str(duration))
-
-
-            #filtraggio dei dati per l'ora specificata
-            for index, row in dfDay.iterrows():
-                edgeID = str(row['edge_id']).strip()
-
-                #verifica se la colonna oraria esiste
-                if time_slot not in df.columns:
-                    print(f"Colonna '{time_slot}' non trovata")
-                    count = "0"
+            lines = groups.get((pd.Timestamp(currentDate), time_slot))
+            with open(os.path.join(outputDir, file_name), 'w', encoding='UTF-8', newline='\n') as outputfile:
+                outputfile.write("<?xml version='1.0' encoding='UTF-8'?>\n<data>\n")
+                if lines:
+                    outputfile.write(f'  <interval begin="0" end="{duration}">\n{lines}\n  </interval>\n</data>')
                 else:
-                    count= str(int(row[time_slot]))
-                #first = int(time_slot[:2])
-                #last = int(time_slot[6:8])
-                #edgeID = str(row['edge_id'])
-                #count = str(row.get(time_slot, 0))
-
-                #count = str(row[time_slot])
-                # Stampa di debug per verificare i valori prima della scrittura nel file XML
-                #print(f"DEBUG: Edge {edgeID}, Time Slot {time_slot}, Count {count}")
-                #Aggiunta dell'elemento edge
-                ET.SubElement(interval, 'edge', id=edgeID, entered=count)
-
-
-            # Scrittura del file XML
-            tree = ET.ElementTree(root)
-            ET.indent(tree, '  ')
-            tree.write(outputfile, encoding="UTF-8", xml_declaration=True)
-            #print(f"File {outputfile} generato.")
-
-        #passa al giorno successivo
-        currentDate += timedelta(days=1)
+                    outputfile.write(f'  <interval begin="0" end="{duration}" />\n</data>')
+
+    #un task per ogni giorno nel range di date
+    days = [startDt + timedelta(days=offset) for offset in range((endDt - startDt).days + 1)]
+    with ThreadPoolExecutor(max_workers=max(1, workers or 1)) as executor:
+        list(executor.map(writeDay, days))
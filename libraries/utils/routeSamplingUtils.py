@@ -0,0 +1,174 @@
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import sumolib
+from scipy import sparse
+from scipy.optimize import linprog
+
+from libraries.utils.networkUtils import NetworkSnapshot
+
+
+class RoutePool:
+    '''
+    Pool di route candidate tenuto in memoria e condiviso da tutte le ore, con la matrice di incidenza
+    route x edge (sparsa, formato CSR) calcolata una sola volta per rete.
+
+    Attributi della classe:
+    routes (list) --> tuple di ID degli edge di ogni route candidata
+    edgeIDs (np.ndarray) --> ID degli edge della rete, nell'ordine delle colonne della matrice di incidenza
+    incidence (scipy.sparse.csr_matrix) --> incidence[r, e] = 1 se la route r attraversa l'edge e
+    '''
+
+    def __init__(self, routes: list, snapshot: NetworkSnapshot):
+
+        self.routes = routes
+        self.edgeIDs = snapshot.edgeIDs
+        rows = []
+        columns = []
+        for routeIndex, edges in enumerate(routes):
+            indices = sorted({snapshot.getEdgeIndex(edgeID) for edgeID in edges})
+            rows.extend([routeIndex] * len(indices))
+            columns.extend(indices)
+        self.incidence = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, columns)),
+                                           shape=(len(routes), len(self.edgeIDs)))
+
+    @classmethod
+    def fromRouteFile(cls, routeFile: str, snapshot: NetworkSnapshot):
+        '''
+        Carica in memoria le route di un file .rou.xml (ad esempio l'output di randomTrips)
+        :param routeFile: file delle route candidate
+        :param snapshot: snapshot della rete su cui sono definite le route
+        :return: (RoutePool)
+        '''
+        routes = [tuple(route.edges.split()) for route in sumolib.xml.parse_fast(routeFile, 'route', ['edges'])]
+        return cls(routes, snapshot)
+
+    def readEdgeCounts(self, edgefile: str):
+        '''
+        Legge i conteggi di un file edgedata. I conteggi dello stesso edge vengono sommati, come fa routeSampler.
+
+        :param edgefile: path del file edgedata_*.xml
+        :return: (tuple) indici degli edge con un conteggio (colonne della matrice di incidenza) e conteggi
+        '''
+        position = {edgeID: index for index, edgeID in enumerate(self.edgeIDs.tolist())}
+        counts = {}
+        for edge in ET.parse(edgefile).getroot().iter('edge'):
+            edgeID = edge.get('id')
+            if edgeID not in position:
+                print(f"Warning: edge '{edgeID}' of '{edgefile}' is not part of the network")
+                continue
+            counts[position[edgeID]] = counts.get(position[edgeID], 0) + int(float(edge.get('entered', 0)))
+        locations = np.array(sorted(counts), dtype=np.int64)
+        return locations, np.array([counts[location] for location in locations], dtype=np.int64)
+
+    def sample(self, locations: np.ndarray, counts: np.ndarray, totalVehicles: int, minLoops: int = 1,
+               optimize: bool = True, rng: np.random.Generator = None) -> np.ndarray:
+        '''
+        Sceglie quante volte usare ogni route candidata per riprodurre i conteggi.
+        Prima campiona le route come routeSampler (a caso tra quelle che non passano da conteggi già esauriti), poi,
+        se optimize è True, risolve il problema lineare che minimizza lo scarto assoluto dai conteggi con esattamente
+        totalVehicles veicoli.
+
+        :param locations: indici degli edge con un conteggio
+        :param counts: conteggi dei veicoli sugli edge
+        :param totalVehicles: numero totale di veicoli da generare
+        :param minLoops: numero minimo di punti di conteggio che una route deve attraversare
+        :param optimize: se True ottimizza il campionamento con programmazione lineare
+        :param rng: generatore di numeri casuali
+        :return: (np.ndarray) numero di veicoli per ogni route del pool
+        '''
+        rng = rng or np.random.default_rng()
+        routeCounts = np.zeros(len(self.routes), dtype=np.int64)
+        loops = self.incidence[:, locations].tocsr()
+        candidates = np.flatnonzero(np.asarray(loops.sum(axis=1)).ravel() >= max(minLoops, 1))
+        if len(candidates) == 0:
+            print("Warning: no candidate route passes the requested number of counting locations")
+            return routeCounts
+
+        # campionamento: le route che attraversano un conteggio esaurito vengono bloccate
+        loopRoutes = loops.tocsc()
+        openCounts = counts.copy()
+        blocked = np.zeros(len(self.routes), dtype=bool)
+        blocked[loopRoutes[:, openCounts <= 0].indices] = True
+        while routeCounts.sum() < totalVehicles:
+            openRoutes = candidates[~blocked[candidates]]
+            if len(openRoutes) == 0:
+                break
+            route = rng.choice(openRoutes)
+            routeCounts[route] += 1
+            passed = loops.indices[loops.indptr[route]:loops.indptr[route + 1]]
+            openCounts[passed] -= 1
+            for location in passed[openCounts[passed] <= 0]:
+                blocked[loopRoutes.indices[loopRoutes.indptr[location]:loopRoutes.indptr[location + 1]]] = True
+
+        if optimize:
+            routeCounts = self.optimize(loops, candidates, counts, totalVehicles, routeCounts)
+        elif routeCounts.sum() < totalVehicles:
+            # conteggi esauriti prima di totalVehicles: i veicoli mancanti seguono le route già scelte
+            weights = routeCounts[candidates] if routeCounts.sum() > 0 else np.ones(len(candidates))
+            extra = rng.choice(candidates, size=totalVehicles - routeCounts.sum(), p=weights / weights.sum())
+            np.add.at(routeCounts, extra, 1)
+        return routeCounts
+
+    @staticmethod
+    def optimize(loops, candidates: np.ndarray, counts: np.ndarray, totalVehicles: int,
+                 initialCounts: np.ndarray) -> np.ndarray:
+        '''
+        Risolve min sum(|loops^T x - counts|) con sum(x) = totalVehicles e x >= 0 sulle route candidate, poi arrotonda
+        la soluzione ad interi mantenendo il totale (metodo dei resti più grandi).
+        Se il solver fallisce restituisce initialCounts.
+        '''
+        matrix = loops[candidates].T.tocsr()
+        locationNumber, routeNumber = matrix.shape
+        identity = sparse.identity(locationNumber, format='csr')
+        # variabili: [x (route), sovrastima, sottostima] per ogni punto di conteggio
+        equalities = sparse.vstack([
+            sparse.hstack([matrix, -identity, identity]),
+            sparse.hstack([sparse.csr_matrix(np.ones((1, routeNumber))),
+                           sparse.csr_matrix((1, 2 * locationNumber))]),
+        ]).tocsr()
+        cost = np.concatenate([np.zeros(routeNumber), np.ones(2 * locationNumber)])
+        result = linprog(cost, A_eq=equalities, b_eq=np.append(counts, totalVehicles).astype(np.float64),
+                         bounds=(0, None), method='highs')
+        if not result.success:
+            print(f"Warning: route count optimization failed ({result.message})")
+            return initialCounts
+
+        solution = result.x[:routeNumber]
+        rounded = np.floor(solution + 1e-9).astype(np.int64)
+        missing = totalVehicles - rounded.sum()
+        if missing > 0:
+            rounded[np.argsort(-(solution - rounded), kind='stable')[:missing]] += 1
+        routeCounts = np.zeros(len(initialCounts), dtype=np.int64)
+        routeCounts[candidates] = rounded
+        return routeCounts
+
+    def writeRoutes(self, routeCounts: np.ndarray, outputFile: str, begin: float = 0, end: float = 3600,
+                    rng: np.random.Generator = None):
+        '''
+        Scrive il file delle route della simulazione: un veicolo per ogni uso di una route, con partenza casuale
+        nell'intervallo [begin, end) e veicoli ordinati per tempo di partenza.
+
+        :param routeCounts: numero di veicoli per ogni route del pool
+        :param outputFile: path del file .rou.xml da scrivere
+        :param begin: inizio dell'intervallo delle partenze in secondi
+        :param end: fine dell'intervallo delle partenze in secondi
+        :param rng: generatore di numeri casuali
+        '''
+        rng = rng or np.random.default_rng()
+        routeIndices = np.repeat(np.arange(len(self.routes)), routeCounts)
+        departs = rng.uniform(begin, end, size=len(routeIndices))
+        order = np.argsort(departs, kind='stable')
+
+        os.makedirs(os.path.dirname(os.path.abspath(outputFile)), exist_ok=True)
+        with open(outputFile, 'w', encoding='UTF-8') as routes:
+            routes.write('<?xml version="1.0" encoding="UTF-8"?>\n\n')
+            routes.write('<routes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                         'xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/routes_file.xsd">\n')
+            routes.write(f'<!-- begin="{float(begin)}" end="{float(end)}" -->\n')
+            for vehicleID, index in enumerate(order):
+                routes.write(f'    <vehicle id="{vehicleID}" depart="{departs[index]:.2f}">\n')
+                routes.write(f'        <route edges="{" ".join(self.routes[routeIndices[index]])}"/>\n')
+                routes.write('    </vehicle>\n')
+            routes.write('</routes>\n')
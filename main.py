@@ -1,4 +1,5 @@
 from libraries.classes.Planner import *
+from libraries.classes.CampaignManifest import CampaignManifest
 from data import preprocessingSetup
 
 """
@@ -11,32 +12,40 @@ Esegue in sequenza tutte le operazioni necessarie per lanciare una simulazione S
 4. Generazione dei file di rotta (routes) per ogni ora del giorno
 5. Avvio delle simulazioni 
 
+Le fasi completate vengono registrate in configs/scenarioCollection/campaign.jsonl: rilanciando lo script dopo
+un'interruzione vengono eseguite solo le fasi mancanti o i cui input sono cambiati.
+
 """
 
-preprocessingSetup.run() #Richiama le funzioni utili al preprocessing del Dataset
+# il preprocessing usa un pool di processi: con lo start method "spawn" (Windows) i worker reimportano questo modulo
+if __name__ == "__main__":
+    #manifest della campagna, condiviso da preprocessing e Planner
+    campaign = CampaignManifest("configs/scenarioCollection/campaign.jsonl")
+
+    preprocessingSetup.run(campaign) #Richiama le funzioni utili al preprocessing del Dataset
 
-# Definisco la cartella con gli edgedata.xml
-baseFolder = "configs/test"
-#creo istanza del simulatore SUMO
-simulator = Simulator(configurationPath="configs", logFile="sumo_log.txt")
+    # Definisco la cartella con gli edgedata.xml
+    baseFolder = "configs/test"
+    #creo istanza del simulatore SUMO
+    simulator = Simulator(configurationPath="configs", logFile="sumo_log.txt")
 
 
-#creo istanza Planner, che gestisce la simulazione
-planner = Planner(simulator=simulator)
+    #creo istanza Planner, che gestisce la simulazione
+    planner = Planner(simulator=simulator, campaign=campaign)
 
 
-totalVehicles = 500  # Numero totale di veicoli nella simulazione
-minLoops = 2  # Numero minimo di loops o punti di conteggio attraversati dai veicoli
-congestioned = True  # Cambia a True per simulare traffico congestionato
-activeGui = False  # Se True, avvia SUMO con interfaccia grafica
+    totalVehicles = 500  # Numero totale di veicoli nella simulazione
+    minLoops = 2  # Numero minimo di loops o punti di conteggio attraversati dai veicoli
+    congestioned = True  # Cambia a True per simulare traffico congestionato
+    activeGui = False  # Se True, avvia SUMO con interfaccia grafica
 
-scenario_folder = planner.generateRoutesFilesForAllHours(
-    baseFolder=baseFolder,
-    totalVehicles=100,
-    minLoops=2,
-    congestioned=False,
-    activeGui=False
+    scenario_folder = planner.generateRoutesFilesForAllHours(
+        baseFolder=baseFolder,
+        totalVehicles=100,
+        minLoops=2,
+        congestioned=False,
+        activeGui=False
 
-    )
+        )
 
-print("Esecuzione Completata")
\ No newline at end of file
+    print("Esecuzione Completata")
\ No newline at end of file
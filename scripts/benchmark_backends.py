@@ -0,0 +1,71 @@
+'''
+Benchmark dei backend di Simulator (traci e libsumo) sulla rete di Bologna.
+Esegue gli stessi scenari orari (route già generate in configs/scenarioCollection) fino alla fine con la politica
+"step" e riporta gli step/secondo di ogni backend e lo speed-up di libsumo.
+Ogni esecuzione avviene in un processo separato, perché libsumo può caricare una sola simulazione per processo.
+
+Esempio:
+    python scripts/benchmark_backends.py --scenarios configs/scenarioCollection/01-02-2024_05-00 \
+        configs/scenarioCollection/01-02-2024_08-00 --collection-mode subscription
+'''
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.Planner import Planner
+from libraries.classes.SumoSimulator import Simulator
+from libraries.utils.outputUtils import readOutput
+
+
+def runBackend(backend: str, scenarioFolder: str, collectionMode: str) -> dict:
+    '''
+    Esegue lo scenario con il backend indicato, scrivendo gli output in una cartella temporanea
+    :param backend: "traci" oppure "libsumo"
+    :param scenarioFolder: cartella dello scenario con generatedRoutes.rou.xml
+    :param collectionMode: modalità di raccolta delle metriche dei veicoli
+    :return: dizionario con backend, scenario, step simulati, tempo e step/secondo
+    '''
+    with tempfile.TemporaryDirectory() as workDir:
+        shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), workDir)
+        simulator = Simulator(configurationPath="configs", logFile=None, collectionMode=collectionMode,
+                              backend=backend)
+        begin = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            simulator.start(activeGui=False, simulationPath=workDir)
+        elapsed = time.perf_counter() - begin
+        # un elemento <step> del summary per ogni step simulato
+        steps = len(readOutput(os.path.join(workDir, "summary.xml"), "summary"))
+    return {"backend": backend, "scenario": os.path.basename(os.path.normpath(scenarioFolder)), "steps": steps,
+            "seconds": elapsed, "stepsPerSecond": steps / elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark traci vs libsumo")
+    parser.add_argument("--scenarios", nargs="+", help="cartelle degli scenari (default: le prime --count)")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--collection-mode", default="subscription")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios or Planner.getScenarioFolders()[:args.count]
+    totals = {}
+    for scenario in scenarios:
+        for backend in ("traci", "libsumo"):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(runBackend, backend, scenario, args.collection_mode).result()
+            print(f"{result['scenario']} {backend:>8}: {result['steps']} steps in {result['seconds']:.2f}s "
+                  f"-> {result['stepsPerSecond']:.1f} steps/s")
+            steps, seconds = totals.get(backend, (0, 0.0))
+            totals[backend] = (steps + result["steps"], seconds + result["seconds"])
+
+    rates = {backend: steps / seconds for backend, (steps, seconds) in totals.items()}
+    for backend, rate in rates.items():
+        print(f"{backend:>8}: {rate:.1f} steps/s")
+    print(f"Speed-up libsumo: {rates['libsumo'] / rates['traci']:.2f}x")
@@ -0,0 +1,70 @@
+'''
+Benchmark della lettura delle spire in Simulator.
+Confronta gli step/secondo di getInductionLoopSummary() chiamata ad ogni step (getIDList() più tre chiamate TraCI per
+spira) con il DetectorMonitor (subscription fatte una volta all'avvio e campionamento ogni --interval secondi).
+
+Esempio:
+    python scripts/benchmark_detector_monitor.py --scenario configs/scenarioCollection/01-02-2024_05-00 --interval 300
+'''
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import traci
+from libraries.classes.SumoSimulator import Simulator
+
+
+def runMode(mode: str, scenarioFolder: str, steps: int, interval: float) -> dict:
+    '''
+    Esegue lo scenario leggendo le spire con il metodo indicato
+    :param mode: "polling" (getInductionLoopSummary ad ogni step) oppure "monitor" (DetectorMonitor)
+    :param scenarioFolder: cartella dello scenario con generatedRoutes.rou.xml
+    :param steps: numero massimo di step simulati
+    :param interval: intervallo di campionamento del DetectorMonitor in secondi
+    :return: dizionario con step eseguiti, tempo totale e step/secondo
+    '''
+    with tempfile.TemporaryDirectory() as workDir:
+        shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), workDir)
+        simulator = Simulator(configurationPath="configs", logFile=os.path.join(workDir, "trace.txt"),
+                              label=mode, detectorSamplingInterval=interval)
+        traci.start(["sumo", "-c", os.path.join(simulator.configurationPath, "run.sumocfg"), "--no-warnings"]
+                    + simulator.getScenarioArguments(workDir), label=simulator.label)
+        simulator.connection = traci.getConnection(simulator.label)
+        if mode == "monitor":
+            simulator.detectorMonitor.start(simulator.connection)
+
+        executed = 0
+        begin = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            while executed < steps and simulator.getRemainingVehicles() > 0:
+                simulator.connection.simulationStep()
+                if mode == "monitor":
+                    simulator.detectorMonitor.update(simulator.connection.simulation.getTime())
+                else:
+                    simulator.getInductionLoopSummary()
+                executed += 1
+        elapsed = time.perf_counter() - begin
+        simulator.connection.close()
+
+    return {"mode": mode, "steps": executed, "seconds": elapsed, "stepsPerSecond": executed / elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark getInductionLoopSummary vs DetectorMonitor")
+    parser.add_argument("--scenario", default="configs/scenarioCollection/01-02-2024_05-00")
+    parser.add_argument("--steps", type=int, default=3600)
+    parser.add_argument("--interval", type=float, default=300)
+    args = parser.parse_args()
+
+    results = [runMode(mode, args.scenario, args.steps, args.interval) for mode in ("polling", "monitor")]
+    for result in results:
+        print(f"{result['mode']:>8}: {result['steps']} steps in {result['seconds']:.2f}s "
+              f"-> {result['stepsPerSecond']:.1f} steps/s")
+    print(f"Speed-up: {results[1]['stepsPerSecond'] / results[0]['stepsPerSecond']:.2f}x")
@@ -0,0 +1,110 @@
+'''
+Benchmark di preprocessingUtils.filterWithAccuracy su dati sintetici.
+Il dataset delle spire viene generato replicando --scale volte le righe di data/processed_traffic_flow.csv (ogni copia
+con codici spira diversi) e il file di accuratezza con percentuali casuali per ogni (data, spira) e ora.
+Confronta la versione precedente (filtro colonna per colonna e isin su due MultiIndex) con quella vettorizzata,
+completa e a blocchi, verificando che scrivano lo stesso file. Ogni metodo viene eseguito in un processo nuovo, di
+cui si riporta anche il picco di memoria residente (VmHWM su Linux, ru_maxrss su macOS).
+
+Esempio:
+    python scripts/benchmark_filter_accuracy.py --scale 10 --chunksize 50000
+'''
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.utils.benchmarkUtils import generateLoopData, peakMegabytes
+from libraries.utils.preprocessingUtils import filterWithAccuracy
+
+
+def legacyFilterWithAccuracy(file_input: str, file_accuracy: str, date_column: str, sensor_id_column: str,
+                             output_file: str, accepted_percentage: int):
+    '''
+    Versione precedente di filterWithAccuracy, usata come riferimento
+    '''
+    df_input = pd.read_csv(file_input, sep=';', encoding="UTF-8")
+    df_accuracy = pd.read_csv(file_accuracy, sep=';', encoding="UTF-8")
+    for ind, column in enumerate(df_accuracy.columns):
+        if ind > 1:
+            df_accuracy[column] = df_accuracy[column].str.replace('%', '').astype(int)
+            df_accuracy = df_accuracy[df_accuracy[column] >= accepted_percentage]
+    keys = [date_column, sensor_id_column]
+    i1 = df_input.set_index(keys).index
+    i2 = df_accuracy.set_index(keys).index
+    df_input[i1.isin(i2)].to_csv(output_file, sep=';', index=False)
+
+
+def generateData(workDir: str, scale: int, seed: int = 0) -> tuple:
+    '''
+    Genera il dataset delle spire e il file di accuratezza sintetici (vedi benchmarkUtils.generateLoopData)
+    :param workDir: cartella in cui scrivere i file
+    :param scale: numero di copie delle righe di data/processed_traffic_flow.csv
+    :return: (tuple) path del dataset e del file di accuratezza
+    '''
+    files = generateLoopData(workDir, scale, seed)
+    os.remove(files["processed"])
+    return files["traffic"], files["accuracy"]
+
+
+def runMethod(method: str, trafficFile: str, accuracyFile: str, outputFile: str, threshold: int,
+              chunksize: int) -> dict:
+    '''
+    Esegue il filtro con il metodo indicato; viene chiamata in un processo nuovo, così il picco di memoria residente
+    è solo quello del metodo
+    :param method: "legacy", "vectorized" oppure "chunked"
+    :return: dizionario con metodo, secondi, righe scritte e picco di memoria residente in MB
+    '''
+    begin = time.perf_counter()
+    if method == "legacy":
+        legacyFilterWithAccuracy(trafficFile, accuracyFile, "data", "codice_spira", outputFile, threshold)
+    else:
+        filterWithAccuracy(trafficFile, accuracyFile, "data", "codice_spira", outputFile, threshold,
+                           chunksize=chunksize if method == "chunked" else None)
+    seconds = time.perf_counter() - begin
+    rows = sum(1 for _ in open(outputFile, encoding="UTF-8")) - 1
+    return {"method": method, "seconds": seconds, "rows": rows, "peakMegabytes": peakMegabytes()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark di filterWithAccuracy su dati sintetici")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--threshold", type=int, default=90)
+    args = parser.parse_args()
+
+    workDir = tempfile.mkdtemp()
+    try:
+        trafficFile, accuracyFile = generateData(workDir, args.scale)
+        print(f"Dataset sintetico: {os.path.getsize(trafficFile) / 1e6:.1f} MB, "
+              f"{sum(1 for _ in open(trafficFile, encoding='UTF-8')) - 1} righe")
+        outputs = {method: os.path.join(workDir, f"{method}.csv") for method in ("legacy", "vectorized", "chunked")}
+        results = []
+        for method, outputFile in outputs.items():
+            # la copia Feather di TrafficDataset viene cancellata: si misura sempre la prima lettura del CSV
+            shutil.rmtree(os.path.join(workDir, ".cache"), ignore_errors=True)
+            # "spawn": il processo non eredita la memoria del processo che ha generato i dati
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                results.append(executor.submit(runMethod, method, trafficFile, accuracyFile, outputFile,
+                                               args.threshold, args.chunksize).result())
+
+        with open(outputs["legacy"], "rb") as file:
+            reference = file.read()
+        baseline = results[0]["seconds"]
+        for result in results:
+            with open(outputs[result["method"]], "rb") as file:
+                same = file.read() == reference
+            print(f"{result['method']:>10}: {result['rows']} rows in {result['seconds']:.2f}s -> "
+                  f"speed-up {baseline / result['seconds']:.2f}x, peak RSS {result['peakMegabytes']:.0f} MB "
+                  f"({'same file' if same else 'DIFFERENT'})")
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
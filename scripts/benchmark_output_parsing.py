@@ -0,0 +1,78 @@
+'''
+Benchmark della lettura degli output di SUMO (fcd, tripinfos, queue, summary, vehroute).
+Per ogni tipo di file misura il throughput in MB/s del parser in streaming di outputUtils e, come riferimento, di
+xml.etree.ElementTree.parse (che carica tutto l'albero in memoria). Con --memory misura anche il picco di memoria
+allocata (tracemalloc) dei due metodi.
+
+Esempio:
+    python scripts/benchmark_output_parsing.py --scenario configs/scenarioCollection/01-02-2024_05-00 --memory
+'''
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.utils.outputUtils import iterOutputBatches, outputFiles
+
+
+def streamingParse(path: str, outputType: str, batchSize: int) -> int:
+    '''
+    :return: (int) numero di righe lette con il parser in streaming
+    '''
+    return sum(len(batch[next(iter(batch))]) for batch in iterOutputBatches(path, outputType, batchSize))
+
+
+def treeParse(path: str, outputType: str, batchSize: int) -> int:
+    '''
+    :return: (int) numero di elementi dell'albero caricato con ElementTree.parse
+    '''
+    return sum(1 for _ in ET.parse(path).getroot().iter())
+
+
+def measure(method, paths: list, outputType: str, batchSize: int, memory: bool) -> dict:
+    '''
+    Esegue il metodo di lettura su tutti i file e misura tempo, MB/s e (opzionalmente) il picco di memoria
+    '''
+    size = sum(os.path.getsize(path) for path in paths)
+    begin = time.perf_counter()
+    rows = sum(method(path, outputType, batchSize) for path in paths)
+    elapsed = time.perf_counter() - begin
+
+    result = {"rows": rows, "megabytes": size / 1e6, "seconds": elapsed, "megabytesPerSecond": size / 1e6 / elapsed}
+    if memory:
+        # misura separata: tracemalloc rallenta la lettura e falserebbe il throughput
+        tracemalloc.start()
+        for path in paths:
+            method(path, outputType, batchSize)
+        result["peakMegabytes"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del parser in streaming degli output di SUMO")
+    parser.add_argument("--scenario", nargs="+", default=["configs/scenarioCollection/01-02-2024_05-00"],
+                        help="cartelle degli scenari da leggere")
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--memory", action="store_true", help="misura anche il picco di memoria")
+    args = parser.parse_args()
+
+    files = {}
+    for scenario in args.scenario:
+        for outputType, path in outputFiles(scenario).items():
+            files.setdefault(outputType, []).append(path)
+
+    for outputType, paths in files.items():
+        streaming = measure(streamingParse, paths, outputType, args.batch_size, args.memory)
+        tree = measure(treeParse, paths, outputType, args.batch_size, args.memory)
+        line = (f"{outputType:>9}: {streaming['megabytes']:8.1f} MB, {streaming['rows']:9d} rows | "
+                f"streaming {streaming['megabytesPerSecond']:6.1f} MB/s | "
+                f"ElementTree.parse {tree['megabytesPerSecond']:6.1f} MB/s")
+        if args.memory:
+            line += f" | peak {streaming['peakMegabytes']:.1f} MB vs {tree['peakMegabytes']:.1f} MB"
+        print(line)
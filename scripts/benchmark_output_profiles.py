@@ -0,0 +1,70 @@
+'''
+Benchmark dei profili di output di Simulator (vedi OUTPUT_PROFILES e Simulator.setOutputProfile).
+Esegue in batch lo stesso scenario orario con ogni profilo, in una cartella temporanea, e riporta per ogni profilo i
+byte scritti dagli output di SUMO, il tempo reale e il risparmio rispetto al profilo "full".
+I profili sono applicati da riga di comando: run.sumocfg non viene modificato.
+
+Esempio:
+    python scripts/benchmark_output_profiles.py --scenario configs/scenarioCollection/01-02-2024_05-00 \
+        --profiles full compressed light --repeat 3
+'''
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.SumoSimulator import BATCH_ENGINES, OUTPUT_PROFILES, Simulator
+
+# file della cartella dello scenario che non sono output della simulazione
+INPUT_FILES = ("generatedRoutes.rou.xml", "detectors.add.xml", "fcd_edges.txt", "sumo_run.log")
+
+
+def runProfile(profile: str, scenarioFolder: str, engine: str) -> dict:
+    '''
+    Esegue lo scenario in batch con il profilo indicato, scrivendo gli output in una cartella temporanea
+    :param profile: nome di un profilo di OUTPUT_PROFILES
+    :param scenarioFolder: cartella dello scenario con generatedRoutes.rou.xml
+    :param engine: "sumo" oppure "libsumo"
+    :return: dizionario con profilo, tempo in secondi, byte scritti in totale e per file
+    '''
+    with tempfile.TemporaryDirectory() as workDir:
+        shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), workDir)
+        simulator = Simulator(configurationPath="configs", logFile=None, steppingPolicy="batch", batchEngine=engine,
+                              outputProfile=profile)
+        result = simulator.runBatch(simulator.getBatchCommand(workDir))
+        if result["exitCode"] != 0:
+            raise RuntimeError(f"Profile '{profile}' failed: {result['stderr'].strip()}")
+        files = {name: os.path.getsize(os.path.join(workDir, name)) for name in sorted(os.listdir(workDir))
+                 if name not in INPUT_FILES}
+    return {"profile": profile, "seconds": result["seconds"], "bytes": sum(files.values()), "files": files}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dei profili di output")
+    parser.add_argument("--scenario", default="configs/scenarioCollection/01-02-2024_05-00")
+    parser.add_argument("--profiles", nargs="+", choices=OUTPUT_PROFILES, default=list(OUTPUT_PROFILES))
+    parser.add_argument("--engine", choices=BATCH_ENGINES, default="sumo")
+    parser.add_argument("--repeat", type=int, default=1, help="esecuzioni per profilo, si tiene la più veloce")
+    parser.add_argument("--report", help="file JSON con i risultati per profilo")
+    args = parser.parse_args()
+
+    profiles = ["full"] + [profile for profile in args.profiles if profile != "full"]
+    results = []
+    for profile in profiles:
+        runs = [runProfile(profile, args.scenario, args.engine) for _ in range(max(1, args.repeat))]
+        results.append(min(runs, key=lambda run: run["seconds"]))
+
+    baseline = results[0]
+    for result in results:
+        result["bytesSaved"] = baseline["bytes"] - result["bytes"]
+        result["secondsSaved"] = baseline["seconds"] - result["seconds"]
+        print(f"{result['profile']:>10}: {result['bytes'] / 1e6:7.2f} MB in {result['seconds']:.2f}s -> "
+              f"saved {result['bytesSaved'] / baseline['bytes']:.0%} bytes, {result['secondsSaved']:+.2f}s")
+    if args.report:
+        with open(args.report, "w", encoding="UTF-8") as report:
+            json.dump(results, report, indent=1)
@@ -0,0 +1,91 @@
+'''
+Benchmark del riuso della sessione di SUMO tra gli scenari orari (vedi Simulator, parametro reuseSession).
+Esegue in sequenza gli stessi scenari (route già generate in configs/scenarioCollection) avviando SUMO per ogni
+scenario ("restart") oppure ricaricando lo stesso processo con traci.load ("session"), per ogni backend.
+Riporta il tempo di avvio misurato da start (Simulator.startupSeconds), il tempo totale e il risparmio per scenario,
+calcolato sul tempo totale: con traci.load SUMO risponde prima di aver ricaricato la rete, quindi parte del caricamento
+finisce nel primo step. Verifica anche che i tripinfo delle due modalità coincidano.
+Ogni combinazione viene eseguita in un processo separato, perché libsumo può caricare una sola simulazione per processo.
+
+Esempio:
+    python scripts/benchmark_sessions.py --count 6 --backends traci libsumo
+'''
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.Planner import Planner
+from libraries.classes.SumoSimulator import BACKENDS, Simulator
+from libraries.utils.outputUtils import readOutput
+
+
+def runScenarios(backend: str, reuseSession: bool, scenarioFolders: list, steppingPolicy: str) -> dict:
+    '''
+    Simula in sequenza gli scenari con lo stesso Simulator, scrivendo gli output in cartelle temporanee
+    :param backend: "traci" oppure "libsumo"
+    :param reuseSession: True per ricaricare la stessa istanza di SUMO, False per avviarne una per scenario
+    :param scenarioFolders: cartelle degli scenari con generatedRoutes.rou.xml
+    :param steppingPolicy: "step" oppure "interval"
+    :return: dizionario con modalità, tempi di avvio per scenario, tempo totale e tripinfo di ogni scenario
+    '''
+    with tempfile.TemporaryDirectory() as workDir:
+        simulator = Simulator(configurationPath="configs", logFile=None, backend=backend,
+                              steppingPolicy=steppingPolicy, reuseSession=reuseSession)
+        folders = []
+        for scenarioFolder in scenarioFolders:
+            folder = os.path.join(workDir, os.path.basename(os.path.normpath(scenarioFolder)))
+            os.makedirs(folder)
+            shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), folder)
+            folders.append(folder)
+
+        startup = []
+        begin = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for folder in folders:
+                simulator.start(activeGui=False, simulationPath=folder)
+                startup.append(simulator.startupSeconds)
+            if simulator.isConnected():
+                simulator.end()
+        seconds = time.perf_counter() - begin
+        # tripinfo ordinati per veicolo, per confrontare le due modalità
+        trips = [readOutput(os.path.join(folder, "tripinfos.xml"), "tripinfo").sort_values("id")
+                 .reset_index(drop=True) for folder in folders]
+    return {"mode": f"{backend}/{'session' if reuseSession else 'restart'}", "startup": startup,
+            "seconds": seconds, "trips": trips}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del riuso della sessione di SUMO")
+    parser.add_argument("--scenarios", nargs="*", help="cartelle degli scenari (default: le prime --count)")
+    parser.add_argument("--count", type=int, default=6)
+    parser.add_argument("--backends", nargs="+", choices=[b for b in BACKENDS if b != "auto"],
+                        default=["traci", "libsumo"])
+    parser.add_argument("--stepping-policy", choices=("step", "interval"), default="interval")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios or Planner.getScenarioFolders()[:args.count]
+    for backend in args.backends:
+        results = []
+        for reuseSession in (False, True):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results.append(executor.submit(runScenarios, backend, reuseSession, scenarios,
+                                               args.stepping_policy).result())
+        restart, session = results
+        same = all(a.equals(b) for a, b in zip(restart["trips"], session["trips"]))
+        for result in results:
+            # il primo scenario avvia comunque SUMO: la media riguarda gli scenari successivi
+            following = result["startup"][1:] or result["startup"]
+            print(f"{result['mode']:>16}: startup {result['startup'][0]:.3f}s first, "
+                  f"{sum(following) / len(following):.3f}s next | total {result['seconds']:.1f}s "
+                  f"for {len(scenarios)} scenarios")
+        saved = restart["seconds"] - session["seconds"]
+        print(f"{backend:>16}: saved {saved / len(scenarios):+.3f}s per scenario, {saved:+.1f}s in total "
+              f"({'same tripinfos' if same else 'DIFFERENT tripinfos'})")
@@ -0,0 +1,114 @@
+'''
+Benchmark dei modelli di simulazione di Simulator (vedi SIMULATION_MODELS e Simulator.setSimulationModel).
+Esegue in batch le stesse ore (route già generate in configs/scenarioCollection) con il modello microscopico e con
+quello mesoscopico, in cartelle temporanee, e riporta per ogni ora il tempo reale e la divergenza del mesoscopico
+rispetto al microscopico:
+- conteggi delle spire: veicoli totali per spira (e1_output.xml), differenza relativa del totale, errore medio
+  assoluto per spira e correlazione. Con il modello mesoscopico le spire scrivono intervalli nel formato dei meandata,
+  letti da outputUtils.readOutput con nVehContrib ricavato da entered;
+- tempi di viaggio: durata dei viaggi dello stesso veicolo (tripinfos.xml), differenza relativa della media ed errore
+  relativo medio per veicolo.
+I modelli sono applicati da riga di comando: run.sumocfg non viene modificato.
+
+Esempio:
+    python scripts/benchmark_simulation_models.py --count 4 --engine libsumo --report models.json
+'''
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.Planner import Planner
+from libraries.classes.SumoSimulator import BATCH_ENGINES, DETECTOR_OUTPUT_FILE, Simulator
+from libraries.utils.outputUtils import readOutput
+
+
+def detectorCounts(path: str) -> pd.Series:
+    '''
+    :param path: file di output delle spire
+    :return: (pd.Series) ID della spira --> veicoli totali
+    '''
+    return readOutput(path, "detector").groupby("id")["nVehContrib"].sum().astype(float)
+
+
+def runModel(model: str, scenarioFolder: str, engine: str) -> dict:
+    '''
+    Esegue l'ora in batch con il modello indicato, in una cartella temporanea; viene chiamata in un processo separato
+    perché libsumo può caricare una sola simulazione per processo
+    :param model: nome di un profilo di SIMULATION_MODELS
+    :param scenarioFolder: cartella dello scenario con generatedRoutes.rou.xml
+    :param engine: "sumo" oppure "libsumo"
+    :return: dizionario con tempo in secondi, veicoli per spira e durata dei viaggi per veicolo
+    '''
+    with tempfile.TemporaryDirectory() as workDir:
+        shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), workDir)
+        simulator = Simulator(configurationPath="configs", logFile=None, steppingPolicy="batch", batchEngine=engine,
+                              simulationModel=model)
+        result = simulator.runBatch(simulator.getBatchCommand(workDir))
+        if result["exitCode"] != 0:
+            raise RuntimeError(f"Model '{model}' failed: {result['stderr'].strip()}")
+        counts = detectorCounts(os.path.join(workDir, DETECTOR_OUTPUT_FILE))
+        trips = readOutput(os.path.join(workDir, "tripinfos.xml"), "tripinfo")
+    return {"seconds": result["seconds"], "counts": counts,
+            "durations": trips.set_index("id")["duration"].astype(float)}
+
+
+def compareModels(micro: dict, meso: dict) -> dict:
+    '''
+    :param micro: risultato di runModel con il modello microscopico
+    :param meso: risultato di runModel con il modello mesoscopico
+    :return: (dict) tempi, speed-up e divergenza di conteggi delle spire e tempi di viaggio
+    '''
+    counts = micro["counts"].to_frame("micro").join(meso["counts"].rename("meso"), how="outer").fillna(0)
+    durations = micro["durations"].to_frame("micro").join(meso["durations"].rename("meso"), how="inner")
+    return {
+        "microSeconds": micro["seconds"],
+        "mesoSeconds": meso["seconds"],
+        "speedUp": micro["seconds"] / meso["seconds"],
+        "detectorCountDiff": (counts["meso"].sum() - counts["micro"].sum()) / max(1, counts["micro"].sum()),
+        "detectorCountMAE": float((counts["meso"] - counts["micro"]).abs().mean()),
+        "detectorCountCorrelation": float(counts["micro"].corr(counts["meso"])),
+        "travelTimeDiff": float(durations["meso"].mean() / durations["micro"].mean() - 1),
+        "travelTimeMAPE": float(((durations["meso"] - durations["micro"]).abs() / durations["micro"]).mean()),
+        "tripsMicro": len(micro["durations"]),
+        "tripsMeso": len(meso["durations"]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dei modelli di simulazione microscopico e mesoscopico")
+    parser.add_argument("--scenarios", nargs="*", help="cartelle degli scenari (default: le prime --count)")
+    parser.add_argument("--count", type=int, default=4)
+    parser.add_argument("--engine", choices=BATCH_ENGINES, default="sumo")
+    parser.add_argument("--report", help="file JSON con i risultati per ora")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios or Planner.getScenarioFolders()[:args.count]
+    results = {}
+    for scenarioFolder in scenarios:
+        runs = {}
+        for model in ("micro", "meso"):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                runs[model] = executor.submit(runModel, model, scenarioFolder, args.engine).result()
+        result = compareModels(runs["micro"], runs["meso"])
+        results[os.path.basename(os.path.normpath(scenarioFolder))] = result
+        print(f"{os.path.basename(os.path.normpath(scenarioFolder))}: micro {result['microSeconds']:.2f}s, "
+              f"meso {result['mesoSeconds']:.2f}s ({result['speedUp']:.1f}x) | detector counts "
+              f"{result['detectorCountDiff']:+.1%} (MAE {result['detectorCountMAE']:.1f}, "
+              f"r={result['detectorCountCorrelation']:.2f}) | travel time {result['travelTimeDiff']:+.1%} "
+              f"(MAPE {result['travelTimeMAPE']:.1%})")
+
+    microSeconds = sum(result["microSeconds"] for result in results.values())
+    mesoSeconds = sum(result["mesoSeconds"] for result in results.values())
+    print(f"Totale: micro {microSeconds:.1f}s, meso {mesoSeconds:.1f}s ({microSeconds / mesoSeconds:.1f}x)")
+    if args.report:
+        with open(args.report, "w", encoding="UTF-8") as report:
+            json.dump(results, report, indent=1)
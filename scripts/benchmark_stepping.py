@@ -0,0 +1,54 @@
+'''
+Benchmark delle politiche di avanzamento di Simulator (vedi Simulator.setSteppingPolicy).
+Esegue lo stesso scenario orario fino alla fine con "step", "interval" (salti di --interval secondi) e "batch"
+(SUMO senza TraCI) e riporta il tempo reale di ogni politica e lo speed-up rispetto a "step".
+
+Esempio:
+    python scripts/benchmark_stepping.py --scenario configs/scenarioCollection/01-02-2024_05-00 --interval 60
+'''
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.SumoSimulator import Simulator, STEPPING_POLICIES
+
+
+def runPolicy(steppingPolicy: str, scenarioFolder: str, interval: float, collectionMode: str) -> dict:
+    '''
+    Esegue lo scenario con la politica indicata, scrivendo gli output in una cartella temporanea
+    :param steppingPolicy: una tra STEPPING_POLICIES
+    :param scenarioFolder: cartella dello scenario con generatedRoutes.rou.xml
+    :param interval: secondi di ogni salto con la politica "interval"
+    :param collectionMode: modalità di raccolta delle metriche dei veicoli
+    :return: dizionario con politica e tempo reale in secondi
+    '''
+    with tempfile.TemporaryDirectory() as workDir:
+        shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), workDir)
+        simulator = Simulator(configurationPath="configs", logFile=os.path.join(workDir, "trace.txt"),
+                              collectionMode=collectionMode, label=steppingPolicy, steppingPolicy=steppingPolicy,
+                              stepInterval=interval)
+        begin = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            simulator.start(activeGui=False, simulationPath=workDir)
+        elapsed = time.perf_counter() - begin
+    return {"policy": steppingPolicy, "seconds": elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark delle politiche di avanzamento di Simulator")
+    parser.add_argument("--scenario", default="configs/scenarioCollection/01-02-2024_05-00")
+    parser.add_argument("--interval", type=float, default=60)
+    parser.add_argument("--collection-mode", default="subscription")
+    args = parser.parse_args()
+
+    results = [runPolicy(policy, args.scenario, args.interval, args.collection_mode) for policy in STEPPING_POLICIES]
+    baseline = results[0]["seconds"]
+    for result in results:
+        print(f"{result['policy']:>8}: {result['seconds']:.2f}s -> speed-up {baseline / result['seconds']:.2f}x")
@@ -0,0 +1,274 @@
+'''
+Suite di benchmark della catena di generazione dei dati, su dataset sintetici delle spire a più scale (vedi
+benchmarkUtils.generateLoopData: 1 --> dimensione di data/processed_traffic_flow.csv, 10 e 100 --> 10 e 100 copie).
+Per ogni scala misura:
+- preprocessingUtils.filterWithAccuracy, linkEdgeID e generateEdgeDataPerHour;
+- ScenarioGenerator.generateRoutes sulle prime --hours ore di edgedata generate (il caricamento del pool di route
+  candidate viene misurato a parte, una volta per scala);
+e una volta sola, sulla rete di Bologna in configs/ con le route generate alla prima scala, gli step/secondo di
+Simulator.step con entrambe le modalità di raccolta delle metriche.
+Ogni misura viene eseguita in un processo nuovo ("spawn"), di cui si riporta anche il picco di memoria residente.
+I risultati vengono salvati in JSON insieme a commit, versioni e piattaforma; con --compare vengono confrontati con
+quelli di un'esecuzione precedente (es. su un altro commit).
+
+Esempio:
+    python scripts/benchmark_suite.py --scales 1 10 100 --output benchmarks/HEAD.json --compare benchmarks/main.json
+'''
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.Planner import Planner, ScenarioGenerator, getSumoToolsPath
+from libraries.classes.SumoSimulator import COLLECTION_MODES, Simulator
+from libraries.utils import preprocessingUtils
+from libraries.utils.benchmarkUtils import generateLoopData, getEnvironment, peakMegabytes, timeCall
+
+
+def benchFilterWithAccuracy(files: dict, workDir: str, repeat: int) -> dict:
+    '''
+    :param files: file sintetici della scala (vedi benchmarkUtils.generateLoopData)
+    :param workDir: cartella della scala
+    :return: (dict) misura di filterWithAccuracy con soglia del 90%
+    '''
+    outputFile = os.path.join(workDir, "accurate_traffic_flow.csv")
+
+    def run():
+        # la copia Feather di TrafficDataset viene cancellata: si misura sempre la lettura del CSV
+        shutil.rmtree(os.path.join(workDir, ".cache"), ignore_errors=True)
+        preprocessingUtils.filterWithAccuracy(files["traffic"], files["accuracy"], "data", "codice_spira",
+                                              outputFile, 90)
+
+    measure = timeCall(run, repeat=repeat)
+    measure["rows"] = sum(1 for _ in open(outputFile, encoding="UTF-8")) - 1
+    return measure
+
+
+def benchLinkEdgeID(files: dict, workDir: str, repeat: int) -> dict:
+    '''
+    :return: (dict) misura di linkEdgeID con data/road_names.csv
+    '''
+    outputFile = os.path.join(workDir, "linked_traffic_flow.csv")
+    measure = timeCall(preprocessingUtils.linkEdgeID, files["traffic"], "data/road_names.csv", outputFile,
+                       repeat=repeat)
+    measure["rows"] = sum(1 for _ in open(outputFile, encoding="UTF-8")) - 1
+    return measure
+
+
+def benchGenerateEdgeDataPerHour(files: dict, workDir: str, repeat: int, startDate: str, endDate: str) -> dict:
+    '''
+    :param startDate: primo giorno degli edgedata (dd/mm/YYYY)
+    :param endDate: ultimo giorno degli edgedata (dd/mm/YYYY)
+    :return: (dict) misura di generateEdgeDataPerHour sul dataset con edge_id
+    '''
+    outputDir = os.path.join(workDir, "edgedata")
+
+    def run():
+        shutil.rmtree(outputDir, ignore_errors=True)
+        shutil.rmtree(os.path.join(workDir, ".cache"), ignore_errors=True)
+        preprocessingUtils.generateEdgeDataPerHour(files["processed"], outputDir, startDate, endDate)
+
+    measure = timeCall(run, repeat=repeat)
+    measure["files"] = len(os.listdir(outputDir))
+    return measure
+
+
+def benchGenerateRoutes(workDir: str, hours: int, vehicles: int, routeEngine: str) -> dict:
+    '''
+    Genera le route delle prime ore di edgedata della scala (vedi benchGenerateEdgeDataPerHour) in
+    <workDir>/scenarios, con un solo ScenarioGenerator come fa il Planner
+    :param hours: numero di ore (file edgedata) per cui generare le route
+    :param vehicles: veicoli per ora
+    :param routeEngine: motore di generazione delle route (vedi ScenarioGenerator)
+    :return: (dict) secondi del caricamento del pool e della generazione di ogni ora
+    '''
+    scenarios = Planner.getScenarioList(os.path.join(workDir, "edgedata"))[:hours]
+    generator = ScenarioGenerator(sumocfg="run.sumocfg", sim=None, routeEngine=routeEngine)
+    netFile = os.path.abspath("configs/joined_lanes.net.xml")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        begin = time.perf_counter()
+        if routeEngine == "inprocess":
+            generator.getRoutePool(getSumoToolsPath(), netFile)
+        else:
+            generator.getRoutePoolFile(getSumoToolsPath(), netFile)
+        poolSeconds = time.perf_counter() - begin
+        runs = []
+        for edgedata, timestamp in scenarios:
+            folder = os.path.join(workDir, "scenarios", timestamp)
+            os.makedirs(folder, exist_ok=True)
+            begin = time.perf_counter()
+            generator.generateRoutes(edgefile=edgedata, folderPath=folder, totalVehicles=vehicles, minLoops=2)
+            runs.append(time.perf_counter() - begin)
+    return {"seconds": sum(runs) / max(1, len(runs)), "runs": runs, "poolSeconds": poolSeconds,
+            "hours": len(runs)}
+
+
+def benchSimulatorStep(scenarioFolder: str, collectionMode: str, steps: int, backend: str) -> dict:
+    '''
+    Esegue Simulator.step (raccolta delle metriche, controllo dei TLS e spire ad ogni step) per al massimo steps
+    step, con gli output di SUMO in una cartella temporanea
+    :param scenarioFolder: cartella con generatedRoutes.rou.xml
+    :param collectionMode: "polling" oppure "subscription"
+    :param steps: numero massimo di step
+    :param backend: "traci" oppure "libsumo"
+    :return: (dict) step eseguiti, secondi e step/secondo
+    '''
+    with tempfile.TemporaryDirectory() as simulationPath:
+        shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), simulationPath)
+        simulator = Simulator(configurationPath="configs", logFile=None, collectionMode=collectionMode,
+                              backend=backend)
+        command = ["sumo", "-c", os.path.join(simulator.configurationPath, "run.sumocfg"), "--no-warnings"] + \
+            simulator.getScenarioArguments(simulationPath)
+        simulator.openConnection(command, simulator.getBackend())
+        simulator.detectorMonitor.start(simulator.connection)
+        simulator.buildTLSIndex()
+        first = simulator.connection.simulation.getTime()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            begin = time.perf_counter()
+            simulator.step(steps)
+            seconds = time.perf_counter() - begin
+        executed = round((simulator.connection.simulation.getTime() - first) /
+                         simulator.connection.simulation.getDeltaT())
+        simulator.closeConnection()
+    return {"seconds": seconds, "steps": executed, "stepsPerSecond": executed / seconds}
+
+
+def runIsolated(function, *args) -> dict:
+    '''
+    Esegue una misura in un processo nuovo ("spawn"), che non eredita memoria né cache del processo principale
+    :return: (dict) risultato della misura con il picco di memoria residente del processo
+    '''
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measureIsolated, function, *args).result()
+
+
+def measureIsolated(function, *args) -> dict:
+    '''
+    Worker di runIsolated
+    '''
+    measure = function(*args)
+    measure.pop("result", None)
+    measure["peakMegabytes"] = peakMegabytes()
+    return measure
+
+
+def measuredSeconds(result: dict) -> float:
+    '''
+    :return: (float) tempo confrontabile tra esecuzioni: secondi per step per Simulator.step (il numero di step può
+             cambiare con --steps o con le route), secondi della misura per gli altri benchmark
+    '''
+    return result["seconds"] / result["steps"] if result.get("steps") else result["seconds"]
+
+
+def compareResults(results: list, baselineFile: str, tolerance: float = 0.1):
+    '''
+    Stampa il rapporto tra i tempi di questa esecuzione e quelli di un file JSON precedente, per le misure presenti
+    in entrambi (stesso benchmark, scala e variante)
+    :param results: risultati di questa esecuzione
+    :param baselineFile: file JSON scritto da una esecuzione precedente della suite
+    :param tolerance: rallentamento relativo oltre il quale una misura viene segnalata
+    '''
+    with open(baselineFile, encoding="UTF-8") as file:
+        baseline = json.load(file)
+    previous = {(result["benchmark"], result.get("scale"), result.get("variant")): result
+                for result in baseline["results"]}
+    print(f"\n Confronto con {baselineFile} (commit {baseline['environment'].get('commit')})")
+    for result in results:
+        before = previous.get((result["benchmark"], result.get("scale"), result.get("variant")))
+        if before is None:
+            continue
+        ratio = measuredSeconds(result) / measuredSeconds(before)
+        flag = "  <-- più lento" if ratio > 1 + tolerance else ""
+        unit = "s/step" if result.get("steps") else "s"
+        print(f"{describe(result):>45}: {measuredSeconds(before):.4f}{unit} -> {measuredSeconds(result):.4f}{unit} "
+              f"({ratio:.2f}x){flag}")
+
+
+def describe(result: dict) -> str:
+    '''
+    :return: (str) nome della misura: benchmark, scala e variante
+    '''
+    name = result["benchmark"]
+    if result.get("scale") is not None:
+        name += f" {result['scale']}x"
+    if result.get("variant"):
+        name += f" [{result['variant']}]"
+    return name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite di benchmark di preprocessing, route e simulazione")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3, help="esecuzioni per misura, si tiene la più veloce")
+    parser.add_argument("--start-date", default="01/02/2024", help="primo giorno degli edgedata (dd/mm/YYYY)")
+    parser.add_argument("--end-date", default="07/02/2024", help="ultimo giorno degli edgedata (dd/mm/YYYY)")
+    parser.add_argument("--hours", type=int, default=3, help="ore per cui generare le route ad ogni scala")
+    parser.add_argument("--vehicles", type=int, default=100, help="veicoli per ora nelle route generate")
+    parser.add_argument("--route-engine", choices=("inprocess", "routeSampler"), default="inprocess")
+    parser.add_argument("--steps", type=int, default=1800, help="step massimi per la misura di Simulator.step")
+    parser.add_argument("--backend", choices=("traci", "libsumo"), default="traci")
+    parser.add_argument("--output", default="benchmark_results.json", help="file JSON dei risultati")
+    parser.add_argument("--compare", help="file JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="rallentamento segnalato nel confronto")
+    parser.add_argument("--keep", action="store_true", help="non cancella i dati sintetici generati")
+    args = parser.parse_args()
+
+    results = []
+
+    def record(benchmark: str, measure: dict, scale: int = None, variant: str = None):
+        result = {"benchmark": benchmark, "scale": scale, "variant": variant, **measure}
+        results.append(result)
+        extra = ", ".join(f"{key} {value}" for key, value in measure.items() if key in ("rows", "files", "hours"))
+        print(f"{describe(result):>45}: {result['seconds']:.3f}s"
+              + (f" ({result['stepsPerSecond']:.0f} steps/s)" if "stepsPerSecond" in result else "")
+              + (f" | {extra}" if extra else "") + f" | peak RSS {result['peakMegabytes']:.0f} MB")
+
+    workRoot = tempfile.mkdtemp(prefix="benchmark_suite_")
+    try:
+        stepScenario = None
+        for scale in args.scales:
+            workDir = os.path.join(workRoot, f"scale_{scale}")
+            begin = time.perf_counter()
+            files = generateLoopData(workDir, scale)
+            print(f"Scala {scale}x: {files['rows']} righe, {os.path.getsize(files['traffic']) / 1e6:.1f} MB "
+                  f"(generati in {time.perf_counter() - begin:.1f}s)")
+
+            record("filterWithAccuracy", runIsolated(benchFilterWithAccuracy, files, workDir, args.repeat), scale)
+            record("linkEdgeID", runIsolated(benchLinkEdgeID, files, workDir, args.repeat), scale)
+            record("generateEdgeDataPerHour", runIsolated(benchGenerateEdgeDataPerHour, files, workDir, args.repeat,
+                                                          args.start_date, args.end_date), scale)
+            measure = runIsolated(benchGenerateRoutes, workDir, args.hours, args.vehicles, args.route_engine)
+            record("generateRoutes", measure, scale, args.route_engine)
+            record("routePool", {"seconds": measure.pop("poolSeconds"), "peakMegabytes": measure["peakMegabytes"]},
+                   scale, args.route_engine)
+            if stepScenario is None and measure["hours"]:
+                stepScenario = Planner.getScenarioFolders(os.path.join(workDir, "scenarios"))[0]
+
+        if stepScenario is not None:
+            for collectionMode in COLLECTION_MODES:
+                runs = [runIsolated(benchSimulatorStep, stepScenario, collectionMode, args.steps, args.backend)
+                        for _ in range(max(1, args.repeat))]
+                record("Simulator.step", min(runs, key=lambda run: run["seconds"]),
+                       variant=f"{args.backend}/{collectionMode}")
+
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="UTF-8") as output:
+            json.dump({"environment": getEnvironment(), "arguments": vars(args), "results": results}, output,
+                      indent=1)
+        print(f"Risultati salvati in {args.output}")
+        if args.compare:
+            compareResults(results, args.compare, args.tolerance)
+    finally:
+        if args.keep:
+            print(f"Dati sintetici in {workRoot}")
+        else:
+            shutil.rmtree(workRoot, ignore_errors=True)
@@ -0,0 +1,69 @@
+'''
+Benchmark della raccolta delle metriche dei veicoli in Simulator.
+Confronta gli step/secondo della modalità "polling" (cinque chiamate TraCI per veicolo) con la modalità
+"subscription" (una getAllSubscriptionResults() per step) sullo stesso scenario orario.
+
+Esempio:
+    python scripts/benchmark_vehicle_summary.py --scenario configs/scenarioCollection/01-02-2024_05-00 --steps 1800
+'''
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import traci
+from libraries.classes.SumoSimulator import Simulator, COLLECTION_MODES
+
+
+def runMode(collectionMode: str, scenarioFolder: str, steps: int) -> dict:
+    '''
+    Esegue lo scenario per un numero massimo di step con la modalità di raccolta indicata
+    :param collectionMode: "polling" oppure "subscription"
+    :param scenarioFolder: cartella dello scenario con generatedRoutes.rou.xml
+    :param steps: numero massimo di step simulati
+    :return: dizionario con step eseguiti, tempo totale e step/secondo
+    '''
+    with tempfile.TemporaryDirectory() as workDir:
+        # gli output di SUMO vengono scritti in una cartella temporanea per non sporcare lo scenario
+        shutil.copy(os.path.join(scenarioFolder, "generatedRoutes.rou.xml"), workDir)
+        simulator = Simulator(configurationPath="configs", logFile=os.path.join(workDir, "trace.txt"),
+                              collectionMode=collectionMode)
+        simulator.changeRoutePath(routePath=workDir)
+        traci.start(["sumo", "-c", os.path.join(simulator.configurationPath, "run.sumocfg"),
+                     "--log", os.path.join(workDir, "sumo_log.txt"), "--no-warnings"], label=simulator.label)
+        simulator.connection = traci.getConnection(simulator.label)
+
+        executed = 0
+        begin = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            while executed < steps and simulator.getRemainingVehicles() > 0:
+                simulator.connection.simulationStep()
+                if collectionMode == "subscription":
+                    simulator.subscribeDepartedVehicles()
+                    simulator.getVehiclesSummarySubscribed()
+                else:
+                    simulator.getVehiclesSummary()
+                executed += 1
+        elapsed = time.perf_counter() - begin
+        simulator.connection.close()
+
+    return {"mode": collectionMode, "steps": executed, "seconds": elapsed, "stepsPerSecond": executed / elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark polling vs subscription per getVehiclesSummary")
+    parser.add_argument("--scenario", default="configs/scenarioCollection/01-02-2024_05-00")
+    parser.add_argument("--steps", type=int, default=3600)
+    args = parser.parse_args()
+
+    results = [runMode(mode, args.scenario, args.steps) for mode in COLLECTION_MODES]
+    for result in results:
+        print(f"{result['mode']:>12}: {result['steps']} steps in {result['seconds']:.2f}s "
+              f"-> {result['stepsPerSecond']:.1f} steps/s")
+    print(f"Speed-up: {results[1]['stepsPerSecond'] / results[0]['stepsPerSecond']:.2f}x")
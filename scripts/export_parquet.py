@@ -0,0 +1,29 @@
+'''
+Esporta gli output degli scenari di configs/scenarioCollection in dataset Parquet partizionati per data e ora
+(vedi libraries/utils/exportUtils.py). Solo gli scenari nuovi o modificati vengono convertiti.
+
+Esempio:
+    python scripts/export_parquet.py --output configs/parquet --workers 8
+'''
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.utils.exportUtils import exportScenarioCollection
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Esportazione Parquet della collezione di scenari")
+    parser.add_argument("--collection", default="configs/scenarioCollection")
+    parser.add_argument("--output", default="configs/parquet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--force", action="store_true", help="riesporta tutti gli scenari")
+    args = parser.parse_args()
+
+    results = exportScenarioCollection(args.collection, args.output, workers=args.workers,
+                                       batchSize=args.batch_size, force=args.force)
+    sys.exit(1 if any(result["error"] for result in results) else 0)
@@ -0,0 +1,38 @@
+'''
+Esegue in batch (senza TraCI) gli scenari indicati, o tutti quelli di configs/scenarioCollection con le route già
+generate, su un pool limitato di worker. Con --report salva codice di uscita, stderr e durata di ogni scenario in JSON.
+
+Esempio:
+    python scripts/run_batch.py configs/scenarioCollection/01-02-2024_05-00 --workers 4 --engine libsumo
+'''
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.Planner import BatchRunner, Planner
+from libraries.classes.SumoSimulator import BATCH_ENGINES, OUTPUT_PROFILES, SIMULATION_MODELS
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Esecuzione batch degli scenari, senza TraCI")
+    parser.add_argument("scenarios", nargs="*", help="cartelle degli scenari (default: tutta la collezione)")
+    parser.add_argument("--collection", default="configs/scenarioCollection")
+    parser.add_argument("--configuration", default="configs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--engine", choices=BATCH_ENGINES, default="sumo")
+    parser.add_argument("--output-profile", choices=OUTPUT_PROFILES, default="full")
+    parser.add_argument("--simulation-model", choices=SIMULATION_MODELS, default="micro")
+    parser.add_argument("--report", help="file JSON con i risultati per scenario")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios or Planner.getScenarioFolders(args.collection)
+    results = BatchRunner(args.configuration, workers=args.workers, engine=args.engine,
+                          outputProfile=args.output_profile, simulationModel=args.simulation_model).run(scenarios)
+    if args.report:
+        with open(args.report, "w", encoding="UTF-8") as report:
+            json.dump(results, report, indent=1)
+    sys.exit(0 if all(result["exitCode"] == 0 for result in results) else 1)
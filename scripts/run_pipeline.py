@@ -0,0 +1,55 @@
+'''
+Esegue la campagna come pipeline (vedi Planner.PipelineRunner): copia dell'edgedata, campionamento delle route,
+simulazione ed esportazione Parquet di ogni scenario orario si sovrappongono, con un numero di worker configurabile per
+fase e code limitate tra le fasi. Al termine stampa utilizzo e profondità delle code di ogni fase; con --report salva
+le metriche in JSON.
+
+Esempio:
+    python scripts/run_pipeline.py configs/Test --route-workers 1 --simulation-workers 3 --export configs/parquet
+'''
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.classes.CampaignManifest import CampaignManifest
+from libraries.classes.Planner import PIPELINE_WORKERS, Planner
+from libraries.classes.SumoSimulator import OUTPUT_PROFILES, SIMULATION_MODELS, Simulator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Esecuzione della campagna come pipeline a fasi")
+    parser.add_argument("baseFolder", help="cartella con i file edgedata_dd-mm-yyyy_hh.xml")
+    parser.add_argument("--configuration", default="configs")
+    parser.add_argument("--vehicles", type=int, default=100)
+    parser.add_argument("--min-loops", type=int, default=2)
+    parser.add_argument("--congestioned", action="store_true")
+    parser.add_argument("--route-workers", type=int, default=PIPELINE_WORKERS["sampledRoutes"])
+    parser.add_argument("--simulation-workers", type=int, default=PIPELINE_WORKERS["simulation"])
+    parser.add_argument("--export-workers", type=int, default=PIPELINE_WORKERS["export"])
+    parser.add_argument("--queue-size", type=int, default=2, help="scenari in attesa al massimo tra due fasi")
+    parser.add_argument("--stepping-policy", choices=("step", "interval", "batch"), default="batch")
+    parser.add_argument("--output-profile", choices=OUTPUT_PROFILES, default="full")
+    parser.add_argument("--simulation-model", choices=SIMULATION_MODELS, default="micro")
+    parser.add_argument("--export", metavar="FOLDER", help="cartella del dataset Parquet (default: nessun export)")
+    parser.add_argument("--campaign", default="configs/scenarioCollection/campaign.jsonl",
+                        help="manifest della campagna, '' per non saltare le fasi già eseguite")
+    parser.add_argument("--report", help="file JSON con le metriche della pipeline")
+    args = parser.parse_args()
+
+    simulator = Simulator(configurationPath=args.configuration, logFile=None, steppingPolicy=args.stepping_policy,
+                          outputProfile=args.output_profile, simulationModel=args.simulation_model)
+    planner = Planner(simulator=simulator, campaign=CampaignManifest(args.campaign or None))
+    report = planner.generateRoutesFilesForAllHoursPipelined(
+        args.baseFolder, totalVehicles=args.vehicles, minLoops=args.min_loops, congestioned=args.congestioned,
+        workers={"sampledRoutes": args.route_workers, "simulation": args.simulation_workers,
+                 "export": args.export_workers},
+        queueSize=args.queue_size, outputFolder=args.export)
+    if args.report:
+        with open(args.report, "w", encoding="UTF-8") as file:
+            json.dump(report, file, indent=1)
+    failed = any(status == "failed" for stages in report["scenarios"].values() for status in stages.values())
+    sys.exit(1 if failed else 0)
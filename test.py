@@ -7,22 +7,23 @@ from libraries.classes.SumoSimulator import Simulator
 from libraries.classes.Planner import Planner
 
 # Inizializza il simulatore
-#simulator = Simulator()
+simulator = Simulator(configurationPath="configs", logFile=None)
 
 # Crea un'istanza di Planner
-planner = Planner()
+planner = Planner(simulator=simulator)
 
 # Definisce la cartella con gli edgedata.xml
-baseFolder = "configs/prova"
+baseFolder = "configs/Test"
 
-# Testa la generazione dei file `generatedRoutes.rou.xml` senza eseguire SUMO
+# Testa la generazione dei file `generatedRoutes.rou.xml` e la simulazione di ogni ora, senza GUI
 print(" Avvio test: generazione dei file di route...")
 
-planner.generateRouteFilesForAllHours(
+planner.generateRoutesFilesForAllHours(
     baseFolder=baseFolder,
     totalVehicles=500,
     minLoops=2,
-    congestioned=False
+    congestioned=False,
+    activeGui=False
 )
 
-print("Test completato: verifica i file `generatedRoutes.rou.xml` nelle cartelle di scenario!")
\ No newline at end of file
+print("Test completato: verifica i file `generatedRoutes.rou.xml` nelle cartelle di scenario!")
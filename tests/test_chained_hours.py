@@ -0,0 +1,55 @@
+'''
+Test delle ore concatenate (vedi Simulator.setTimeWindow): i veicoli ripristinati dallo stato dell'ora precedente
+vengono sottoscritti con collectionMode "subscription"
+'''
+
+import os
+import shutil
+
+import pytest
+
+from libraries.classes.Planner import Planner, applyTimeWindow
+from libraries.classes.SumoSimulator import Simulator
+
+SCENARIOS = ["configs/scenarioCollection/01-02-2024_00-00", "configs/scenarioCollection/01-02-2024_01-00"]
+
+
+@pytest.fixture
+def scenarioFolders(tmp_path):
+    '''
+    :return: (list) copie delle due ore consecutive, con le sole route, e finestre temporali delle ore concatenate
+    '''
+    folders = []
+    for scenario in SCENARIOS:
+        folder = tmp_path / scenario
+        folder.mkdir(parents=True)
+        shutil.copy(os.path.join(scenario, "generatedRoutes.rou.xml"), folder)
+        folders.append(str(folder))
+    windows = Planner.getTimeWindows([(None, os.path.basename(folder)) for folder in folders])
+    for window in windows.values():
+        for key in ("loadState", "saveState"):
+            if window[key]:
+                window[key] = str(tmp_path / window[key])
+    return folders, windows
+
+
+def test_loadedVehiclesAreSubscribed(scenarioFolders, monkeypatch):
+    folders, windows = scenarioFolders
+    simulator = Simulator(configurationPath="configs", logFile=None, backend="traci", collectionMode="subscription")
+    applyTimeWindow(simulator, windows[os.path.basename(folders[0])])
+    simulator.start(activeGui=False, simulationPath=folders[0])
+    assert os.path.exists(windows[os.path.basename(folders[1])]["loadState"])
+
+    # seconda ora: si ferma subito dopo l'avvio per controllare le subscription
+    monkeypatch.setattr(simulator, "resume", lambda: None)
+    applyTimeWindow(simulator, windows[os.path.basename(folders[1])])
+    simulator.start(activeGui=False, simulationPath=folders[1])
+    try:
+        for _ in range(2):
+            vehicles = simulator.connection.vehicle.getIDList()
+            assert len(vehicles) > 0
+            assert set(simulator.connection.vehicle.getAllSubscriptionResults()) == set(vehicles)
+            simulator.step()
+        assert simulator.getVehiclesSummarySubscribed() is not None
+    finally:
+        simulator.end()
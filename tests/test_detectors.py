@@ -0,0 +1,46 @@
+'''
+Test delle letture delle spire con i modelli microscopico e mesoscopico: output e1 letto da outputUtils e istanti di
+campionamento del DetectorMonitor
+'''
+
+from libraries.classes.DetectorMonitor import DetectorMonitor
+from libraries.utils.outputUtils import readOutput
+
+MICRO_OUTPUT = '''<detector>
+    <interval begin="0.00" end="1800.00" id="7_0" nVehContrib="0" flow="0.00" occupancy="0.00" speed="-1.00" harmonicMeanSpeed="-1.00" length="-1.00" nVehEntered="0"/>
+    <interval begin="0.00" end="1800.00" id="10_0" nVehContrib="28" flow="56.00" occupancy="0.63" speed="12.92" harmonicMeanSpeed="12.35" length="5.00" nVehEntered="28"/>
+</detector>
+'''
+MESO_OUTPUT = '''<detector>
+    <interval begin="0.00" end="900.00" id="7_0" sampledSeconds="0.00" departed="0" arrived="0" entered="0" left="0" distance="0.00"/>
+    <interval begin="0.00" end="900.00" id="10_0" sampledSeconds="119.75" occupancy="0.20" speed="13.60" departed="0" arrived="15" entered="15" left="0" flow="60.00" distance="1628.70"/>
+</detector>
+'''
+
+
+def test_microscopicDetectorOutput(tmp_path):
+    path = tmp_path / "e1_output.xml"
+    path.write_text(MICRO_OUTPUT)
+    frame = readOutput(str(path))
+    assert frame["nVehContrib"].tolist() == [0, 28]
+    assert frame["flow"].tolist() == [0, 56]
+    assert frame["entered"].tolist() == [-1, -1]
+
+
+def test_mesoscopicDetectorOutput(tmp_path):
+    path = tmp_path / "e1_output.xml"
+    path.write_text(MESO_OUTPUT)
+    frame = readOutput(str(path))
+    assert frame["nVehContrib"].tolist() == [0, 15]
+    assert frame["nVehEntered"].tolist() == [0, 15]
+    assert frame["flow"].tolist() == [0, 60]
+    assert frame["occupancy"].tolist()[0] == 0
+    assert frame["entered"].tolist() == [0, 15] and frame["left"].tolist() == [0, 0]
+
+
+def test_mesoscopicSamplesBeforePeriodEnd():
+    monitor = DetectorMonitor(period=1800, samplingInterval=600)
+    assert monitor.getNextSample(0) == 600
+    monitor.mesoscopic = True
+    # il confine del periodo viene anticipato di uno step, prima che SUMO azzeri i valori dell'intervallo
+    assert [monitor.getNextSample(time) for time in (0, 600, 1200, 1799, 3600)] == [600, 1200, 1799, 2400, 4200]
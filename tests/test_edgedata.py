@@ -0,0 +1,30 @@
+'''
+Test di regressione di preprocessingUtils.generateEdgeDataPerHour: i file rigenerati da data/processed_traffic_flow.csv
+devono essere identici, byte per byte, a quelli di configs/TestData_UnMese
+'''
+
+import os
+import shutil
+
+import pytest
+
+from libraries.utils.preprocessingUtils import generateEdgeDataPerHour
+
+DATASET = "data/processed_traffic_flow.csv"
+REFERENCE_FOLDER = "configs/TestData_UnMese"
+
+
+@pytest.mark.parametrize("startData, endData, days", [("01/02/2024", "02/02/2024", 2),
+                                                      ("29/02/2024", "02/03/2024", 3)])
+def test_edgeDataMatchesReference(tmp_path, startData, endData, days):
+    # copia del dataset: la cache di TrafficDataset viene scritta accanto al CSV
+    inputFile = str(tmp_path / "processed_traffic_flow.csv")
+    shutil.copy(DATASET, inputFile)
+    outputDir = tmp_path / "edgedata"
+    generateEdgeDataPerHour(inputFile, str(outputDir), startData, endData)
+
+    generated = sorted(os.listdir(outputDir))
+    assert len(generated) == 24 * days
+    for name in generated:
+        with open(os.path.join(REFERENCE_FOLDER, name), "rb") as reference:
+            assert (outputDir / name).read_bytes() == reference.read(), name
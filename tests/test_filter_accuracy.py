@@ -0,0 +1,66 @@
+'''
+Test di preprocessingUtils.filterWithAccuracy: la lettura completa (TrafficDataset) e quella a blocchi scrivono lo
+stesso file, con la formattazione della versione originale (pd.read_csv e to_csv con i tipi di default)
+'''
+
+import pandas as pd
+import pytest
+
+from libraries.classes.TrafficDataset import HOUR_COLUMNS
+from libraries.utils.preprocessingUtils import filterWithAccuracy
+
+DATASET = "data/processed_traffic_flow.csv"
+
+
+def writeData(folder, missingValue: bool) -> tuple:
+    '''
+    Scrive un estratto del dataset delle spire e il file di accuratezza: una coppia (data, spira) sotto il 90%
+    :return: (tuple) path del dataset e del file di accuratezza
+    '''
+    lines = open(DATASET, encoding="UTF-8").read().splitlines()[:13]
+    if missingValue:
+        # un conteggio mancante nell'ultima riga: i conteggi diventano float solo in quella parte del file
+        fields = lines[-1].split(';')
+        fields[2] = ""
+        lines[-1] = ';'.join(fields)
+    trafficFile = folder / "traffic.csv"
+    trafficFile.write_text("\n".join(lines) + "\n", encoding="UTF-8")
+
+    accuracy = pd.read_csv(trafficFile, sep=';', dtype=str)[["data", "codice_spira"]].drop_duplicates()
+    for column in HOUR_COLUMNS:
+        accuracy[column] = "100%"
+    accuracy.iloc[1, 5] = "85%"
+    accuracyFile = folder / "accuracy.csv"
+    accuracy.to_csv(accuracyFile, sep=';', index=False)
+    return str(trafficFile), str(accuracyFile)
+
+
+def legacyFilter(trafficFile: str, accuracyFile: str, outputFile: str):
+    '''
+    Formattazione della versione originale: tipi di default di pandas per tutto il file
+    '''
+    traffic = pd.read_csv(trafficFile, sep=';')
+    accuracy = pd.read_csv(accuracyFile, sep=';')
+    accuracy = accuracy[accuracy[HOUR_COLUMNS].apply(lambda column: column.str.rstrip('%').astype(int)).min(axis=1)
+                        >= 90]
+    keys = ["data", "codice_spira"]
+    traffic[traffic.set_index(keys).index.isin(accuracy.set_index(keys).index)].to_csv(outputFile, sep=';',
+                                                                                       index=False)
+
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+@pytest.mark.parametrize("missingValue", [False, True])
+def test_chunkedOutputMatchesFullRead(tmp_path, missingValue):
+    trafficFile, accuracyFile = writeData(tmp_path, missingValue)
+    outputs = {}
+    for chunksize in (None, 2, 5):
+        outputFile = tmp_path / f"filtered_{chunksize}.csv"
+        filterWithAccuracy(trafficFile, accuracyFile, "data", "codice_spira", str(outputFile), 90,
+                           chunksize=chunksize)
+        outputs[chunksize] = outputFile.read_bytes()
+    legacyFilter(trafficFile, accuracyFile, str(tmp_path / "legacy.csv"))
+
+    assert outputs[2] == outputs[None]
+    assert outputs[5] == outputs[None]
+    assert outputs[None] == (tmp_path / "legacy.csv").read_bytes()
+    assert len(outputs[None].splitlines()) < 13
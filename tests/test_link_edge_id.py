@@ -0,0 +1,32 @@
+'''
+Test di preprocessingUtils.linkEdgeID: la lettura completa e quella a blocchi scrivono lo stesso file, anche quando
+mancano dei conteggi solo in alcuni blocchi
+'''
+
+import pandas as pd
+import pytest
+
+from libraries.utils.preprocessingUtils import linkEdgeID
+
+DATASET = "data/processed_traffic_flow.csv"
+ROAD_NAMES = "data/road_names.csv"
+
+
+@pytest.mark.parametrize("missingValue", [False, True])
+def test_chunkedOutputMatchesFullRead(tmp_path, missingValue):
+    traffic = pd.read_csv(DATASET, sep=';', dtype=str, keep_default_na=False, nrows=40).drop(columns=["edge_id"])
+    if missingValue:
+        # un conteggio mancante in una sola riga: con la lettura completa la colonna diventa float
+        traffic.iloc[33, 2] = ""
+    inputFile = tmp_path / "traffic.csv"
+    traffic.to_csv(inputFile, sep=';', index=False)
+
+    outputs = {}
+    for chunksize in (None, 5, 16):
+        outputFile = tmp_path / f"linked_{chunksize}.csv"
+        linkEdgeID(str(inputFile), ROAD_NAMES, str(outputFile), chunksize=chunksize)
+        outputs[chunksize] = outputFile.read_bytes()
+
+    assert outputs[5] == outputs[None]
+    assert outputs[16] == outputs[None]
+    assert len(outputs[None].splitlines()) > 1
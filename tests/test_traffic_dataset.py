@@ -0,0 +1,48 @@
+'''
+Test di TrafficDataset.load: copia Feather scritta anche da più processi contemporaneamente e dataset già caricati
+nel processo riconosciuti senza ricalcolare l'hash del CSV
+'''
+
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from libraries.classes import TrafficDataset as trafficDatasetModule
+from libraries.classes.TrafficDataset import TrafficDataset
+from libraries.utils.networkUtils import fileHash
+
+DATASET = "data/processed_traffic_flow.csv"
+
+
+def loadRows(csvFile: str) -> int:
+    return len(TrafficDataset.load(csvFile).frame)
+
+
+def test_concurrentCacheWriters(tmp_path):
+    csvFile = str(tmp_path / "traffic.csv")
+    shutil.copy(DATASET, csvFile)
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        rows = list(executor.map(loadRows, [csvFile] * 6))
+
+    cacheFiles = os.listdir(tmp_path / ".cache")
+    assert len(set(rows)) == 1
+    assert len(cacheFiles) == 1 and cacheFiles[0].endswith(".feather")
+    assert loadRows(csvFile) == rows[0]
+
+
+def test_loadSkipsHashWhenUnchanged(tmp_path, monkeypatch):
+    csvFile = str(tmp_path / "traffic.csv")
+    shutil.copy(DATASET, csvFile)
+    hashed = []
+    monkeypatch.setattr(trafficDatasetModule, "fileHash", lambda path: hashed.append(path) or fileHash(path))
+
+    first = TrafficDataset.load(csvFile)
+    assert TrafficDataset.load(csvFile) is first
+    assert hashed == [csvFile]
+
+    # un CSV modificato viene riletto
+    with open(csvFile, 'a') as file:
+        file.write("\n")
+    os.utime(csvFile, ns=(0, os.stat(csvFile).st_mtime_ns + 1))
+    assert TrafficDataset.load(csvFile) is not first
+    assert len(hashed) == 2
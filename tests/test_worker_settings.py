@@ -0,0 +1,67 @@
+'''
+Test dei worker del Planner: i parametri del simulatore che cambiano gli output arrivano al Simulator creato in ogni
+processo (runScenario, runScenarioSession e simulateScenario)
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from libraries.classes import Planner
+
+SETTINGS = {"steppingPolicy": "interval", "stepInterval": 30, "outputProfile": "minimal", "simulationModel": "meso",
+            "adaptiveTLS": True, "collectionMode": "subscription", "tlsCooldown": 120, "detectorSamplingInterval": 60,
+            "backend": "traci", "batchEngine": "libsumo"}
+
+
+class RecordingSimulator:
+    '''
+    Simulator finto: registra i parametri del costruttore senza avviare SUMO
+    '''
+    created = []
+
+    def __init__(self, configurationPath, logFile, **settings):
+        self.settings = settings
+        self.startupSeconds = 0.0
+        RecordingSimulator.created.append(settings)
+
+    def setTimeWindow(self, *args):
+        pass
+
+    def start(self, **kwargs):
+        return None
+
+    def isConnected(self):
+        return False
+
+
+@pytest.fixture
+def recordingSimulator(monkeypatch):
+    RecordingSimulator.created = []
+    monkeypatch.setattr(Planner, "Simulator", RecordingSimulator)
+    # i worker girano in thread dello stesso processo, così vedono il Simulator finto
+    monkeypatch.setattr(Planner, "ProcessPoolExecutor", ThreadPoolExecutor)
+    return RecordingSimulator
+
+
+@pytest.mark.parametrize("reuseSession", [False, True])
+def test_parallelRunnerPassesSettings(tmp_path, recordingSimulator, reuseSession):
+    scenarios = [{"edgedata": None, "timestamp": f"01-02-2024_0{hour}-00", "scenarioFolder": str(tmp_path),
+                  "generateRoutes": False} for hour in range(2)]
+    runner = Planner.ParallelRunner(configurationPath="configs", workers=1, reuseSession=reuseSession,
+                                    **SETTINGS)
+    results = runner.run(str(tmp_path), totalVehicles=0, minLoops=1, congestioned=False, scenarios=scenarios)
+
+    assert all(result["error"] is None for result in results)
+    assert recordingSimulator.created
+    for settings in recordingSimulator.created:
+        assert {key: settings[key] for key in SETTINGS} == SETTINGS
+
+
+def test_simulateScenarioPassesSettings(tmp_path, recordingSimulator):
+    task = {"scenarioFolder": str(tmp_path), "timestamp": "01-02-2024_00-00", "configurationPath": "configs",
+            **SETTINGS}
+    Planner.simulateScenario(task)
+
+    assert len(recordingSimulator.created) == 1
+    assert {key: recordingSimulator.created[0][key] for key in SETTINGS} == SETTINGS